@@ -2,12 +2,41 @@ import digitalio
 import time
 
 
+def _reverse_bits(b):
+    r = 0
+    for i in range(8):
+        if b & (1 << i):
+            r |= 0x80 >> i
+    return r
+
+
+# SPI shifts the most significant bit of each byte first; write()
+# shifts bit 0 first, so bytes are bit-reversed through this table
+_reversed = bytes(_reverse_bits(b) for b in range(256))
+
+
 class TLC5916:
     def index_mask(i):
         return (i // 8, 1 << (i % 8))
 
     def __init__(self, clk_pin, le_pin, sdi_pin, oe_pin, n):
         self.ba = bytearray(n)
+        # True when ba differs from what was last latched
+        self.dirty = True
+        self.spi = None
+        self._clk_pin = clk_pin
+        self._sdi_pin = sdi_pin
+        self._spi_buf = bytearray(n)
+        # shift order, flattened: bit i goes out from byte
+        # _order[i] under mask _masks[i]
+        self._order = bytearray(8 * n)
+        self._masks = bytearray(8 * n)
+        for i in range(8 * n):
+            self._order[i], self._masks[i] = TLC5916.index_mask(i)
+        # last value driven onto sdi, so unchanged bits aren't rewritten
+        self._sdi_level = None
+        # optional profiler histogram (see profiler) timing each write
+        self.timing = None
         self.clk = digitalio.DigitalInOut(clk_pin)
         self.clk.direction = digitalio.Direction.OUTPUT
         self.le = digitalio.DigitalInOut(le_pin)
@@ -19,15 +48,22 @@ class TLC5916:
         self.oe.value = False
 
     def __setitem__(self, i, b):
-        index, mask = TLC5916.index_mask(i)
+        # not index_mask(): that builds a tuple per bit
+        index = i >> 3
+        mask = 1 << (i & 7)
         if index < len(self.ba):
+            old = self.ba[index]
             if b:
-                self.ba[index] |= mask
+                new = old | mask
             else:
-                self.ba[index] &= ~mask
+                new = old & ~mask
+            if new != old:
+                self.ba[index] = new
+                self.dirty = True
 
     def __getitem__(self, i):
-        index, mask = TLC5916.index_mask(i)
+        index = i >> 3
+        mask = 1 << (i & 7)
         if index < len(self.ba):
             return self.ba[index] & mask != 0
         return False
@@ -37,12 +73,57 @@ class TLC5916:
         time.sleep(0.00001)
         self.le.value = False
 
+    def use_spi(self, spi_class, baudrate=1_000_000):
+        """
+        hands the clock and data pins to an SPI bus (busio.SPI or
+        bitbangio.SPI) so write() shifts whole bytes. write_config()
+        bit-bangs the clock, so call it before this.
+        """
+        self.clk.deinit()
+        self.sdi.deinit()
+        self.spi = spi_class(clock=self._clk_pin, MOSI=self._sdi_pin)
+        while not self.spi.try_lock():
+            pass
+        self.spi.configure(baudrate=baudrate, polarity=0, phase=0)
+        self.spi.unlock()
+        self.dirty = True
+
     def write(self):
-        for i in range(8 * len(self.ba)):
-            self.sdi.value = self[i]
-            self.clk.value = True
-            self.clk.value = False
+        """shifts out and latches the frame; no-op if nothing changed"""
+        if not self.dirty:
+            return
+        timing = self.timing
+        if timing is not None:
+            timing.start()
+        ba = self.ba
+        if self.spi is not None:
+            buf = self._spi_buf
+            for j in range(len(ba)):
+                buf[j] = _reversed[ba[j]]
+            while not self.spi.try_lock():
+                pass
+            try:
+                self.spi.write(buf)
+            finally:
+                self.spi.unlock()
+        else:
+            order = self._order
+            masks = self._masks
+            sdi = self.sdi
+            clk = self.clk
+            level = self._sdi_level
+            for i in range(len(order)):
+                bit = ba[order[i]] & masks[i] != 0
+                if bit != level:
+                    sdi.value = bit
+                    level = bit
+                clk.value = True
+                clk.value = False
+            self._sdi_level = level
         self.latch()
+        self.dirty = False
+        if timing is not None:
+            timing.stop()
 
     def set_special_mode(self, val):
         self.clk.value = False
@@ -73,6 +154,7 @@ class TLC5916:
         self.oe.value = False
 
     def write_config(self, value):
+        self._sdi_level = None
         self.set_special_mode(True)
         for j in range(len(self.ba)):
             for i in range(8):
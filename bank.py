@@ -0,0 +1,243 @@
+import struct
+from array import array
+from bitarray import bitarray
+from pattern import pattern
+from lanes import lanes, read_record
+
+# format of a saved bank:
+# < -- little-endian
+# B -- number of patterns
+# B -- number of voices per pattern
+# B -- number of steps per pattern
+# then an H per pattern: offset of its data from the end of the index
+# then the patterns, each voice in the bitarray.save layout
+#
+# the lanes, when saved, follow as a separate section (see save_lanes):
+# B -- number of lanes saved
+# then each lane in the lanes.save layout
+_bank_format = "<BBB"
+_bank_header_size = struct.calcsize(_bank_format)
+
+
+def read_shape(data, start: int = 0):
+    """gives (count, voices, steps) of the bank saved in data at start"""
+    return struct.unpack_from(_bank_format, data, start)
+
+
+class pattern_bank:
+    """
+    A bank of patterns kept packed in a bytearray, with an index of
+    where each pattern's data starts so finding pattern N is a lookup.
+
+    Patterns are decoded on demand into a small LRU cache of preallocated
+    pattern objects; edits are made on the cached objects and packed
+    back by save(). queue() decodes the next pattern ahead of time, so
+    take_pending() -- called by the playback tick at the loop boundary
+    -- is a reference swap with nothing decoded or allocated.
+
+    The per-step lanes (see lanes) aren't packed: a pattern's lanes
+    object is made by lanes_for() when first needed and kept, and the
+    cached pattern objects refer to it.
+    """
+
+    def __init__(self, count, voices, steps, cache_size=4):
+        self.count = count
+        self.voices = voices
+        self.steps = steps
+        self.voice_bytes = bitarray(steps).bytelen()
+        self.pattern_bytes = voices * self.voice_bytes
+        self.index = array("H", [n * self.pattern_bytes for n in range(count)])
+        self.data = bytearray(count * self.pattern_bytes)
+        # each pattern's lanes, or None while it has none
+        self.lanes = [None] * count
+
+        self._cache = [
+            pattern([bitarray(steps) for _ in range(voices)])
+            for _ in range(cache_size)
+        ]
+        # pattern number held by each cache slot (-1 when empty)
+        self._cached = array("h", [-1] * cache_size)
+        self._used = array("L", [0] * cache_size)
+        self._uses = 0
+
+        self.active = 0
+        self.pending = None
+
+    def _slot(self, number):
+        for slot in range(len(self._cache)):
+            if self._cached[slot] == number:
+                return slot
+        return -1
+
+    def get(self, number: int):
+        """gives the pattern object for pattern number, decoding it if needed"""
+        if number < 0 or number >= self.count:
+            raise IndexError()
+        slot = self._slot(number)
+        if slot < 0:
+            slot = self._evict()
+            self._cached[slot] = number
+            self._unpack(slot)
+        self._uses += 1
+        self._used[slot] = self._uses
+        return self._cache[slot]
+
+    def _evict(self):
+        # least recently used slot which is neither playing nor queued
+        victim = -1
+        for slot in range(len(self._cache)):
+            number = self._cached[slot]
+            if number < 0:
+                return slot
+            if number == self.active or number == self.pending:
+                continue
+            if victim < 0 or self._used[slot] < self._used[victim]:
+                victim = slot
+        self._pack(victim)
+        return victim
+
+    def _unpack(self, slot):
+        p = self._cache[slot]
+        p.lanes = self.lanes[self._cached[slot]]
+        offset = self.index[self._cached[slot]]
+        # each load re-indexes its voice's column of step masks
+        for seq in p.sequences:
+            seq.load(self.data, offset)
+            offset += self.voice_bytes
+
+    def _pack(self, slot):
+        number = self._cached[slot]
+        if number < 0:
+            return
+        offset = self.index[number]
+        for seq in self._cache[slot].sequences:
+            seq.save(self.data, offset)
+            offset += self.voice_bytes
+
+    def lanes_for(self, number: int):
+        """gives the lanes of pattern number, making them if needed"""
+        if number < 0 or number >= self.count:
+            raise IndexError()
+        found = self.lanes[number]
+        if found is None:
+            found = lanes(self.voices, self.steps)
+            self.lanes[number] = found
+            slot = self._slot(number)
+            if slot >= 0:
+                self._cache[slot].lanes = found
+        return found
+
+    def clear_lanes(self) -> None:
+        """drops the lanes of every pattern"""
+        for number in range(self.count):
+            self.lanes[number] = None
+        for p in self._cache:
+            p.lanes = None
+
+    def queue(self, number: int) -> None:
+        """decodes pattern number now and makes it pending"""
+        self.get(number)
+        self.pending = number
+
+    def take_pending(self):
+        """
+        makes the pending pattern active and returns it, or returns
+        None if nothing is pending
+        """
+        number = self.pending
+        if number is None:
+            return None
+        self.pending = None
+        self.active = number
+        return self._cache[self._slot(number)]
+
+    def size(self) -> int:
+        """gives the number of bytes save() needs"""
+        return _bank_header_size + 2 * self.count + len(self.data)
+
+    def save(self, data: bytearray, start: int = 0) -> None:
+        """packs the cached patterns back and stores the bank in data"""
+        if start + self.size() > len(data):
+            raise IndexError()
+        for slot in range(len(self._cache)):
+            self._pack(slot)
+        struct.pack_into(
+            _bank_format, data, start, self.count, self.voices, self.steps
+        )
+        start += _bank_header_size
+        for number in range(self.count):
+            struct.pack_into("<H", data, start, self.index[number])
+            start += 2
+        data[start : start + len(self.data)] = self.data
+
+    def lanes_size(self) -> int:
+        """gives the number of bytes save_lanes() needs; 0 if no lanes"""
+        size = 0
+        for found in self.lanes:
+            if found is not None:
+                size += found.present() * found.record_size()
+        if size:
+            size += 1
+        return size
+
+    def save_lanes(self, data: bytearray, start: int = 0) -> None:
+        """stores the lanes holding values in data"""
+        if start + self.lanes_size() > len(data):
+            raise IndexError()
+        saved = 0
+        offset = start + 1
+        for number in range(self.count):
+            found = self.lanes[number]
+            if found is not None:
+                saved += found.present()
+                offset += found.save(number, data, offset)
+        data[start] = saved
+
+    def load_lanes(self, data: bytearray, start: int = 0) -> int:
+        """
+        restores the lanes from data; returns where the lanes end, or
+        -1 (with no lanes left) if it doesn't hold lanes for this bank
+        """
+        self.clear_lanes()
+        if start >= len(data):
+            return -1
+        record_size = lanes(self.voices, self.steps).record_size()
+        offset = start + 1
+        for _ in range(data[start]):
+            if offset + record_size > len(data):
+                self.clear_lanes()
+                return -1
+            number, lane, values = read_record(data, offset)
+            if number >= self.count or lane >= lanes.count:
+                self.clear_lanes()
+                return -1
+            self.lanes_for(number).load(lane, data, values)
+            offset += record_size
+        return offset
+
+    def load(self, data: bytearray, start: int = 0) -> bool:
+        """
+        restores the bank from data; returns False (leaving the bank
+        alone) if data holds a bank of another shape
+        """
+        if start + self.size() > len(data):
+            return False
+        count, voices, steps = read_shape(data, start)
+        if count != self.count or voices != self.voices or steps != self.steps:
+            return False
+        start += _bank_header_size
+        # every offset is checked before any is taken
+        for number in range(self.count):
+            (offset,) = struct.unpack_from("<H", data, start + 2 * number)
+            if offset + self.pattern_bytes > len(self.data):
+                return False
+        for number in range(self.count):
+            (self.index[number],) = struct.unpack_from("<H", data, start)
+            start += 2
+        self.data[:] = data[start : start + len(self.data)]
+        # decode the cached patterns again, in place, since the
+        # firmware holds references to their bitarrays
+        for slot in range(len(self._cache)):
+            if self._cached[slot] >= 0:
+                self._unpack(slot)
+        return True
@@ -0,0 +1,171 @@
+# Host-side benchmark: per-bit loops over bitarray (as the firmware used
+# to do them) vs. the whole-byte bulk operations, for 8, 64 and 256-step
+# patterns. First checks every bulk operation against the same thing
+# done a bit at a time, on random contents of odd lengths (where the
+# last byte is part used); exits with status 1 if any differs.
+#
+# run from the repo root with:
+#   python benchmarks/bench_bitarray.py
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bitarray import bitarray  # noqa: E402
+
+
+def old_construct(data):
+    # the original constructor: one next() per bit, a byte at a time
+    result = bitarray(len(data))
+    dataiter = iter(data)
+    for byteindex in range(len(result._bytes)):
+        byte = 0
+        try:
+            for bit in range(8):
+                if next(dataiter):
+                    byte |= 1 << bit
+        except StopIteration:
+            break
+        finally:
+            result._bytes[byteindex] = byte
+    return result
+
+
+def old_repr(b):
+    return f"bitarray(({','.join(['1' if b[i] else '0' for i in range(len(b))])}))"
+
+
+def old_count(b):
+    return sum(1 for i in range(len(b)) if b[i])
+
+
+def old_rotate(b, count):
+    n = len(b)
+    bits = [b[i] for i in range(n)]
+    for i in range(n):
+        b[(i + count) % n] = bits[i]
+
+
+def old_reverse(b):
+    n = len(b)
+    bits = [b[i] for i in range(n)]
+    for i in range(n):
+        b[i] = bits[n - 1 - i]
+
+
+def old_or(a, b):
+    for i in range(len(a)):
+        if b[i]:
+            a[i] = True
+
+
+def bits_of(b):
+    return [b[i] for i in range(len(b))]
+
+
+def tail_clear(b):
+    """True if the unused bits of the last byte are clear"""
+    extra = 8 * b.bytelen() - len(b)
+    return not extra or not b._bytes[-1] >> (8 - extra)
+
+
+def check(lengths=(1, 7, 8, 9, 16, 65), trials=50, seed=2):
+    """gives the names of the operations which differ from per-bit ones"""
+    rng = random.Random(seed)
+    bad = set()
+
+    def expect(name, b, want):
+        if bits_of(b) != want or not tail_clear(b):
+            bad.add(name)
+
+    for n in lengths:
+        for _ in range(trials):
+            bits = [rng.random() < 0.5 for _ in range(n)]
+            other = [rng.random() < 0.5 for _ in range(n)]
+            b = bitarray(bits)
+            expect("construct", b, bits)
+            value = sum(1 << i for i in range(n) if bits[i])
+            # bits past nbits are dropped
+            expect("from_int", bitarray.from_int(value | 1 << n + 3, n), bits)
+            if b.count() != sum(bits):
+                bad.add("count")
+            if b.any() != any(bits):
+                bad.add("any")
+            if list(b.set_indices()) != [i for i in range(n) if bits[i]]:
+                bad.add("set_indices")
+            if repr(bitarray(bits)) != old_repr(bitarray(bits)):
+                bad.add("repr")
+            for count in range(-n - 9, n + 10):
+                b = bitarray(bits)
+                b.shift(count)
+                want = [
+                    0 <= i - count < n and bits[i - count] for i in range(n)
+                ]
+                expect("shift", b, want)
+                b = bitarray(bits)
+                b.rotate(count)
+                expect("rotate", b, [bits[(i - count) % n] for i in range(n)])
+            b = bitarray(bits)
+            b.reverse()
+            expect("reverse", b, bits[::-1])
+            for name, op, want in (
+                ("|=", "__ior__", [x or y for x, y in zip(bits, other)]),
+                ("&=", "__iand__", [x and y for x, y in zip(bits, other)]),
+                ("^=", "__ixor__", [x != y for x, y in zip(bits, other)]),
+            ):
+                b = bitarray(bits)
+                getattr(b, op)(bitarray(other))
+                expect(name, b, want)
+            data = bytearray(b.bytelen() + 2)
+            b = bitarray(bits)
+            b.save(data, 1)
+            loaded = bitarray(n)
+            loaded.load(data, 1)
+            expect("save/load", loaded, bits)
+    return sorted(bad)
+
+
+def timed(fn, b, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(b)
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def main(repeat=2000):
+    bad = check()
+    print(f"bulk operations {'ok' if not bad else 'DIFFER: ' + ', '.join(bad)}")
+    rng = random.Random(1)
+    for steps in (8, 64, 256):
+        bits = [rng.random() < 0.3 for _ in range(steps)]
+        other = bitarray([rng.random() < 0.3 for _ in range(steps)])
+        value = int.from_bytes(bytes(bitarray(bits)._bytes), "little")
+        # each case times both paths on copies of the same bits
+        cases = (
+            ("construct", lambda _: old_construct(bits), lambda _: bitarray(bits)),
+            (
+                "from int",
+                lambda _: old_construct([value >> i & 1 for i in range(steps)]),
+                lambda _: bitarray.from_int(value, steps),
+            ),
+            ("repr", old_repr, repr),
+            ("count", old_count, lambda b: b.count()),
+            ("rotate", lambda b: old_rotate(b, 3), lambda b: b.rotate(3)),
+            ("reverse", old_reverse, lambda b: b.reverse()),
+            ("or", lambda b: old_or(b, other), lambda b: b.__ior__(other)),
+        )
+        print(f"{steps} steps")
+        for label, old, new in cases:
+            old_us = timed(old, bitarray(bits), repeat)
+            new_us = timed(new, bitarray(bits), repeat)
+            print(
+                f"  {label:9} per-bit {old_us:8.2f} us"
+                f"  bulk {new_us:8.2f} us  ({old_us / new_us:5.1f}x)"
+            )
+    return not bad
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,42 @@
+# Host-side benchmark: how long after power-up the sequencer can play.
+# Boots code.py in the simulator with a step already set, presses start
+# as soon as the engine's tasks run, and reports (in virtual time) when
+# the tasks started, when the I2C display and encoders came up, and
+# when the first MIDI note went out.
+#
+# run from the repo root with:
+#   python benchmarks/bench_boot.py
+
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+
+
+def main():
+    # the firmware prints; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+        s.press_key(0, at=0)
+        s.start(at=0.01)
+        s.run(3)
+    engine = s.engine
+    since_boot = s.boot_ns / 1e6
+    print(f"  constructed         {since_boot:8.1f} ms")
+    print(f"  tasks running       {since_boot + engine.boot_ms():8.1f} ms")
+    if engine.i2c_ready_ticks is not None:
+        ms = since_boot + (engine.i2c_ready_ticks - engine.ready_ticks)
+        print(f"  display + encoders  {ms:8.1f} ms")
+    if s.midi.times:
+        print(f"  first MIDI note     {(s.midi.times[0] - s.boot_start) / 1e6:8.1f} ms")
+    else:
+        print("  first MIDI note     none")
+    s.close()
+
+
+if __name__ == "__main__":
+    main()
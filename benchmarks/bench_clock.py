@@ -0,0 +1,176 @@
+# Host-side check of the step clock against simulated ticks: runs 100k
+# steps with random loop latency and reports cumulative drift of the
+# step_clock vs. the old "last_step = now - late_time // 2" correction.
+# Then runs it at MIDI clock rate with swing, as the sequencer does, and
+# checks every odd step's first pulse is delayed by the swing, every
+# even one is on time and the pulses stay in order; and plays a swung
+# pattern in the simulator to check the firmware's notes swing too.
+#
+# run from the repo root with:
+#   python benchmarks/bench_clock.py
+
+import contextlib
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from adafruit_ticks import ticks_add, ticks_diff  # noqa: E402
+from clock import step_clock  # noqa: E402
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+
+
+class fake_ticks:
+    """a ticks_ms source which only moves when told to"""
+
+    def __init__(self, start=0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, ticks):
+        self.now = ticks
+
+
+def run_clock(bpm, steps, max_latency, seed):
+    rng = random.Random(seed)
+    # start near the wrap-around point to exercise it
+    ticks = fake_ticks((1 << 29) - 5000)
+    clock = step_clock(bpm, ticks=ticks)
+    start = ticks()
+    fired = 0
+    while fired < steps:
+        # the main loop polls some time after the deadline passes
+        ticks.set(ticks_add(clock.deadline, rng.randint(0, max_latency)))
+        if clock.due():
+            fired += 1
+    # step N (counted from 0) is ideally due at N * 60000 / (bpm * 4) ms
+    ideal = steps * 60_000 // (bpm * 4)
+    return ticks_diff(clock.deadline, start) - ideal, clock
+
+
+def run_old(bpm, steps, max_latency, seed):
+    rng = random.Random(seed)
+    ticks = fake_ticks((1 << 29) - 5000)
+    steps_millis = 60 / bpm * 1000 / 4
+    start = ticks()
+    last_step = int(ticks_add(start, -steps_millis))
+    first_step = None
+    fired = 0
+    while fired < steps:
+        ticks.set(
+            ticks_add(
+                last_step, int(steps_millis + 0.999) + rng.randint(0, max_latency)
+            )
+        )
+        now = ticks()
+        diff = ticks_diff(now, last_step)
+        if diff >= steps_millis:
+            late_time = ticks_diff(int(diff), int(steps_millis))
+            last_step = ticks_add(now, -late_time // 2)
+            if first_step is None:
+                first_step = now
+            fired += 1
+    ideal = (steps - 1) * 60_000 / (bpm * 4)
+    return ticks_diff(last_step, first_step) - ideal
+
+
+def run_swing(bpm, swing, steps, max_latency, seed, pulses_per_step=6):
+    """(steps off their swung time, pulses out of order, clock)"""
+    rng = random.Random(seed)
+    ticks = fake_ticks((1 << 29) - 5000)
+    clock = step_clock(
+        bpm,
+        4 * pulses_per_step,
+        swing=swing,
+        ticks=ticks,
+        max_behind=pulses_per_step,
+        swing_steps=pulses_per_step,
+    )
+    start = ticks()
+    swing_ms = 60_000 * swing // (100 * bpm * 4)
+    off = 0
+    unordered = 0
+    last = None
+    for pulse in range(steps * pulses_per_step):
+        deadline = clock.deadline
+        if last is not None and ticks_diff(deadline, last) < 0:
+            unordered += 1
+        last = deadline
+        ticks.set(ticks_add(deadline, rng.randint(0, max_latency)))
+        assert clock.due()
+        if pulse % pulses_per_step == 0:
+            step = pulse // pulses_per_step
+            due = step * 60_000 // (bpm * 4) + (swing_ms if step & 1 else 0)
+            if abs(ticks_diff(deadline, start) - due) > 1:
+                off += 1
+    return off, unordered, clock
+
+
+def firmware_swing(swing, steps=32):
+    """gaps in ms between the first voice's notes, playing every step"""
+    log.set_level(log.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    engine = s.engine
+    for step in range(engine.num_steps):
+        engine.drums[0].sequence[step] = 1
+    engine.set_swing(swing)
+    s.start(at=0.1)
+    step_s = 60 / (engine.bpm * engine.steps_per_beat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.2 + steps * step_s)
+    note = engine.drums[0].note
+    times = []
+    for t, data in zip(s.midi.times, s.midi.writes):
+        data = bytes(b for b in data if b < 0xF8)
+        for i in range(0, len(data) - 2, 3):
+            if data[i] & 0xF0 == 0x90 and data[i + 1] == note and data[i + 2]:
+                times.append(t / 1e6)
+    s.close()
+    log.set_level(log.INFO)
+    # the first step waits for the clock task to wake, so skip it
+    return [round(b - a) for a, b in zip(times[1:], times[2:])]
+
+
+def main(steps=100_000):
+    for bpm in (97, 120, 173):
+        for max_latency in (1, 3):
+            drift, clock = run_clock(bpm, steps, max_latency, seed=bpm)
+            old_drift = run_old(bpm, steps, max_latency, seed=bpm)
+            print(
+                f"bpm {bpm:3} latency<={max_latency}ms: "
+                f"clock drift {drift} ms "
+                f"(late mean {clock.late_mean():.2f} max {clock.late_max}, "
+                f"resyncs {clock.resyncs}); "
+                f"old drift {old_drift:.0f} ms"
+            )
+            assert drift == 0
+    for bpm, swing in ((97, 33), (120, 50), (173, 99)):
+        off, unordered, clock = run_swing(bpm, swing, steps // 10, 3, seed=bpm)
+        print(
+            f"bpm {bpm:3} swing {swing:2}% at 24 ppqn: {off} steps off the swing,"
+            f" {unordered} pulses out of order, resyncs {clock.resyncs}"
+        )
+        assert off == 0 and unordered == 0 and clock.resyncs == 0
+    # at 120 bpm a step is 125 ms and 50% swing delays odd steps 62 ms:
+    # 187 ms up to an odd step, 63 ms on to the next even one
+    gaps = firmware_swing(50)
+    expected = [63 if n % 2 == 0 else 187 for n in range(len(gaps))]
+    swung = all(abs(g - e) <= 1 for g, e in zip(gaps, expected))
+    print(
+        f"firmware at 120 bpm, swing 50%: {len(gaps)} gaps between notes"
+        f" {'swing' if swung else 'DIFFER'} (first {gaps[:4]} ms)"
+    )
+    assert swung and len(gaps) > 16
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Host-side benchmark: the segment display. Spins the tempo knob fast
+# while playing, with each display write taking as long as 17 bytes
+# do on a 100 kHz I2C bus, and reports the display's I2C bytes per
+# second, the time the loop spent stalled in display writes and how
+# late the steps were: first the way it used to be drawn (fill() then
+# print(), each writing the whole display), then through the display
+# service.
+#
+# run from the repo root with:
+#   python benchmarks/bench_display.py [seconds] [cpu_scale]
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+
+# 17 bytes of 9 bits, plus start and stop, at 100 kHz
+write_s = (17 * 9 + 2) / 100_000
+
+
+def direct(engine):
+    """the tempo drawn straight onto the display, as it used to be"""
+
+    async def display_task():
+        device = engine.display.device
+        device.auto_write = True
+        shown_bpm = None
+        while True:
+            if engine.bpm != shown_bpm:
+                shown_bpm = engine.bpm
+                device.fill(0)
+                device.print(shown_bpm)
+            await asyncio.sleep(engine.display_poll_ms / 1000)
+
+    return display_task
+
+
+def spin(seconds, cpu_scale, service):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(cpu_scale=cpu_scale)
+    s.record(False)
+    engine = s.engine
+    engine.splash_text = ()
+    if not service:
+        engine.display_task = direct(engine)
+    counts = {}
+
+    def slow_display():
+        s.display.device.write_delay = write_s
+        engine.clock.reset_stats()
+        engine.profile.reset()
+        counts["shows"] = s.display.device.shows
+        counts["bytes"] = s.display.device.bytes
+
+    s.press_key(0, at=0.1)
+    s.start(at=0.2)
+    s.at(0.9, slow_display)
+    # a detent every 10 ms, the knob swinging back and forth
+    t = 1.0
+    n = 0
+    while t < 1.0 + seconds:
+        s.turn("rotary_seesaw", 0, 1 if n % 100 < 50 else -1, at=t)
+        t += 0.01
+        n += 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(1.0 + seconds)
+    device = s.display.device
+    shows = device.shows - counts["shows"]
+    spent = seconds + 0.1
+    result = (
+        (device.bytes - counts["bytes"]) / spent,
+        shows / spent,
+        shows * write_s * 1000 / spent,
+        engine.clock.late_max,
+        engine.profile.loop.max,
+    )
+    s.close()
+    return result
+
+
+def main(seconds=4, cpu_scale=50):
+    log.set_level(log.WARNING)
+    print(f"tempo knob spun for {seconds} s, cpu_scale {cpu_scale}")
+    for label, service in (("fill + print", False), ("display service", True)):
+        per_s, shows, stall, late, loop = spin(seconds, cpu_scale, service)
+        print(
+            f"  {label:16} {per_s:6.0f} I2C bytes/s {shows:5.1f} writes/s"
+            f" stalled {stall:5.1f} ms/s, step late max {late} ms,"
+            f" loop period max {loop} ms"
+        )
+    log.set_level(log.INFO)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
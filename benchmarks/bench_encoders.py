@@ -0,0 +1,93 @@
+# Host-side benchmark: I2C transactions per second spent on the three
+# encoders, counted by the stand-in seesaw over simulated time. Compares
+# the original "read every position on every loop pass" polling with the
+# rate-limited encoder_service, with and without an INT pin.
+#
+# run from the repo root with:
+#   python benchmarks/bench_encoders.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from adafruit_seesaw import rotaryio, seesaw  # noqa: E402
+from adafruit_ticks import ticks_add  # noqa: E402
+from encoders import encoder_service  # noqa: E402
+
+
+class fake_ticks:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class int_pin:
+    """an active-low INT line driven by whether any knob moved"""
+
+    def __init__(self, device):
+        self.device = device
+
+    @property
+    def value(self):
+        return self.device.positions == self.device._reported
+
+
+def devices():
+    return seesaw.Seesaw(None, addr=0x36), seesaw.Seesaw(None, addr=0x49)
+
+
+def turn_now_and_then(ms, knob, quad):
+    # a knob moves once every half second
+    if ms % 500 == 0:
+        knob.turn(0, 1)
+        quad.turn(3, -1)
+
+
+def original(seconds, loop_ms):
+    knob, quad = devices()
+    encoders = (
+        rotaryio.IncrementalEncoder(knob),
+        rotaryio.IncrementalEncoder(quad, 1),
+        rotaryio.IncrementalEncoder(quad, 3),
+    )
+    for ms in range(0, seconds * 1000, loop_ms):
+        turn_now_and_then(ms, knob, quad)
+        for encoder in encoders:
+            encoder.position
+    return (knob.transactions + quad.transactions) / seconds
+
+
+def service(seconds, loop_ms, poll_ms, interrupts):
+    knob, quad = devices()
+    ticks = fake_ticks()
+    encoders = encoder_service(poll_ms=poll_ms, ticks=ticks)
+    encoders.add(knob, interrupt=int_pin(knob) if interrupts else None)
+    encoders.add(quad, 1, interrupt=int_pin(quad) if interrupts else None)
+    encoders.add(quad, 3, interrupt=int_pin(quad) if interrupts else None)
+    for ms in range(0, seconds * 1000, loop_ms):
+        ticks.now = ticks_add(0, ms)
+        turn_now_and_then(ms, knob, quad)
+        if encoders.due():
+            encoders.poll()
+    return (knob.transactions + quad.transactions) / seconds
+
+
+def main(seconds=60, loop_ms=1):
+    print(f"{seconds} s simulated, loop pass every {loop_ms} ms")
+    print(f"  original           {original(seconds, loop_ms):7.1f} transactions/s")
+    for poll_ms in (10, 20, 50):
+        rate = service(seconds, loop_ms, poll_ms, False)
+        print(f"  service {poll_ms:2} ms      {rate:7.1f} transactions/s")
+    rate = service(seconds, loop_ms, 20, True)
+    print(f"  service 20 ms + INT {rate:6.1f} transactions/s")
+
+
+if __name__ == "__main__":
+    main()
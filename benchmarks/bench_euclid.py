@@ -0,0 +1,117 @@
+# Host-side benchmark: the Euclidean rhythm generator. Checks every
+# rhythm of a 16 step table (k hits per cycle, evenly spread, rotated),
+# compares filling a sequence from the table with laying a rhythm out,
+# then turns the quad encoders in generator mode in the simulator and
+# checks the voice got the rhythm dialled in, without the regeneration
+# running any allocating bytecode.
+#
+# run from the repo root with:
+#   python benchmarks/bench_euclid.py
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from sim.runner import simulation  # noqa: E402
+from bitarray import bitarray  # noqa: E402
+from euclid import euclid, vary  # noqa: E402
+import log  # noqa: E402
+
+repeats = 20000
+
+
+def even(bits, k, n, rotation):
+    """True if bits repeats a cycle of k hits over n, evenly spread"""
+    cycle = [bits[(i + rotation) % n] for i in range(n)]
+    if sum(cycle) != k or (k and not cycle[0]):
+        return False
+    for i in range(n, len(bits)):
+        if bits[i] != bits[i - n]:
+            return False
+    if k == 0:
+        return True
+    hits = [i for i in range(n) if cycle[i]]
+    gaps = [(hits[(j + 1) % k] - hits[j]) % n or n for j in range(k)]
+    return max(gaps) - min(gaps) <= 1
+
+
+def check(steps=16):
+    table = euclid(steps, slots=16)
+    bits = bitarray(steps)
+    bad = 0
+    count = 0
+    for n in range(1, steps + 1):
+        for k in range(n + 1):
+            for rotation in range(n):
+                table.fill(bits, k, n, rotation)
+                count += 1
+                if not even(bits, k, n, rotation):
+                    bad += 1
+    return count, bad
+
+
+def per_fill_us(table, bits, vary_key):
+    start = time.perf_counter_ns()
+    for i in range(repeats):
+        table.fill(bits, 5, 16, i % 16 if vary_key else 3)
+    return (time.perf_counter_ns() - start) / repeats / 1000
+
+
+def main():
+    log.set_level(log.WARNING)
+    count, bad = check()
+    ok = bad == 0
+    print(f"euclid: {count} rhythms of 16 steps {'ok' if ok else f'{bad} UNEVEN'}")
+
+    bits = bitarray(16)
+    cached = per_fill_us(euclid(16), bits, False)
+    # two slots and sixteen rotations in turn: every fill lays one out
+    laid_out = per_fill_us(euclid(16, slots=2), bits, True)
+    print(f"  fill from table  {cached:5.2f} us, laid out {laid_out:5.2f} us")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    engine = s.engine
+    found = s.probe_bytecode(engine, "adjust_rhythm")
+    s.at(0.05, lambda: engine.set_generating(True))
+    # voice 2, 3 hits over a cycle of 7, rotated 1
+    s.turn("rotary_seesaw2", 0, 2, at=0.7)
+    s.turn("rotary_seesaw2", 1, 3, at=0.75)
+    s.turn("rotary_seesaw2", 2, -1, at=0.8)
+    s.turn("rotary_seesaw2", 3, 1, at=0.85)
+    s.push_seesaw("rotary_seesaw", 24, at=0.9)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(1.2)
+    # and the knob button rolled variation 1 of it
+    expected = bitarray(engine.num_steps)
+    euclid(engine.num_steps).fill(expected, 3, 7, 1)
+    engine.variation_dice.seed(1)
+    vary(expected, engine.variation_dice, engine.variation_percent)
+    sequence = engine.drums[2].sequence
+    got = [sequence[i] for i in range(engine.num_steps)]
+    want = [expected[i] for i in range(engine.num_steps)]
+    dialled = got == want and engine.variations[2] == 1
+    ok = ok and dialled and not found
+    print(
+        f"  encoders         {'ok' if dialled else 'DIFFERS'}"
+        f" (voice 2: {''.join('x' if b else '.' for b in got)}),"
+        f" {engine.rhythms.misses} laid out"
+    )
+    print(f"  allocating bytecodes {sum(found.values())}")
+    for where, count in sorted(found.items()):
+        print(f"    {where} x{count}")
+    s.close()
+    log.set_level(log.INFO)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,95 @@
+# Host-side benchmark: the step tick, LED refresh and key path across
+# pattern geometries, from the board's 5 voices x 8 steps up to 16 x 64
+# paged onto the 5 x 8 grid. play_step should cost in proportion to the
+# voices which fire, not to the size of the pattern; show_pattern and a
+# key press only to the size of the grid.
+#
+# run from the repo root with:
+#   python benchmarks/bench_geometry.py
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import load_firmware  # noqa: E402
+import log  # noqa: E402
+
+# (voices, steps, rows, columns, patterns)
+shapes = (
+    (5, 8, 5, 8, 16),
+    (8, 16, 5, 8, 16),
+    (16, 32, 5, 8, 16),
+    (16, 64, 5, 8, 8),
+    (16, 64, 8, 16, 8),
+)
+
+repeats = 2000
+
+
+def per_call_ns(call, *args):
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        call(*args)
+    return (time.perf_counter_ns() - start) / repeats
+
+
+def play_step_ns(engine, active, rng):
+    """ns per play_step with active voices on every step"""
+    shape = engine.geometry
+    for step in range(shape.steps):
+        on = rng.sample(range(shape.voices), active)
+        for voice in range(shape.voices):
+            engine.drums[voice].sequence[step] = voice in on
+    engine.midi.record = False
+    now = 0
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        engine.play_step(now)
+        engine.note_offs.release_all()
+        engine.midi_events.flush()
+    return (time.perf_counter_ns() - start) / repeats
+
+
+def measure(firmware, geometry, shape):
+    rng = random.Random(1)
+    g = geometry(*shape)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = firmware.sequencer(g)
+    engine.leds.spi.record = False
+    print(
+        f"{g.voices:2} voices x {g.steps:2} steps on {g.rows} x {g.columns},"
+        f" {g.pages} pages: bank {engine.patterns.size()} bytes"
+        f" of {engine.state_store.capacity},"
+        f" tables {len(g.cell_leds) * 2 + len(g.key_rows) * 2} bytes"
+    )
+    counts = sorted({1, 2, g.voices // 2, g.voices})
+    line = "  play_step  "
+    for active in counts:
+        line += f"  {active:2} on {play_step_ns(engine, active, rng) / 1000:6.1f} us"
+    print(line)
+    engine.set_page(g.pages - 1)
+    print(
+        f"  show_pattern {per_call_ns(engine.show_pattern) / 1000:6.1f} us"
+        f"  key press {per_call_ns(engine.key_pressed, 0) / 1000:5.1f} us"
+        f"  set_page {per_call_ns(engine.set_page, 1) / 1000:5.1f} us"
+    )
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        firmware = load_firmware()
+    # the firmware's own module, so the engine and geometry agree
+    geometry = sys.modules["geometry"].geometry
+    # set_page logs at info
+    log.set_level(log.WARNING)
+    for shape in shapes:
+        measure(firmware, geometry, shape)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Host-side benchmark: bursts of key presses. Plays while a chord of
+# step keys goes down all at once, over and over, and reports how many
+# LED driver shifts each burst took and how long until the last of
+# them was out (latency from the keys going down), as the spread over
+# the bursts.
+#
+# By default no host CPU time is charged to the simulation (cpu_scale
+# 0), so the figures are the same on every run, and it exits with
+# status 1 unless every burst went out in one shift. With cpu_scale
+# (e.g. 50, roughly an RP2040) they depend on the host too; runs gives
+# the number of runs to report, to show how much.
+#
+# run from the repo root with:
+#   python benchmarks/bench_input.py [bursts] [keys] [cpu_scale] [runs]
+
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+
+burst_s = 0.25
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+
+
+def take(bursts, keys, cpu_scale):
+    """LED shifts and ms to the last of them, per burst"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(cpu_scale=cpu_scale)
+    engine = s.engine
+    count = engine.geometry.cells
+    times = []
+
+    def burst(n):
+        def press():
+            times.append(s.now())
+            for k in range(keys):
+                engine.switches.press((n * 7 + k * 5) % count)
+
+        return press
+
+    s.start(at=0.1)
+    # each burst at another point of the input task's poll
+    phase = engine.input_poll_ms / 1000 / bursts
+    for n in range(bursts):
+        s.at(0.5 + n * (burst_s + phase), burst(n))
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.5 + bursts * (burst_s + phase))
+    frames = [t / 1e9 for t, _ in s.leds.frames]
+    shifts = []
+    latency = []
+    # a burst's shifts are the ones before the next burst went down (a
+    # host stall charged to the clock can hold a press up)
+    ends = times[1:] + [times[-1] + burst_s]
+    for start, end in zip(times, ends):
+        out = [t for t in frames if start <= t < end]
+        shifts.append(len(out))
+        if out:
+            latency.append((out[-1] - start) * 1000)
+    s.close()
+    return shifts, latency
+
+
+def main(bursts=16, keys=8, cpu_scale=0, runs=None):
+    log.set_level(log.WARNING)
+    if runs is None:
+        runs = 1 if cpu_scale == 0 else 5
+    print(f"{bursts} bursts of {keys} keys while playing, cpu_scale {cpu_scale}")
+    ok = True
+    for run in range(runs):
+        shifts, latency = take(bursts, keys, cpu_scale)
+        spread = {n: shifts.count(n) for n in sorted(set(shifts))}
+        print(f"  LED shifts per burst  {spread} (shifts: bursts)")
+        if latency:
+            print(
+                f"  latency to last shift median {percentile(latency, 50):.1f} ms"
+                f" p90 {percentile(latency, 90):.1f} ms max {max(latency):.1f} ms"
+            )
+        ok = ok and shifts == [1] * bursts
+    log.set_level(log.INFO)
+    return ok or cpu_scale != 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(a) for a in sys.argv[1:])) else 1)
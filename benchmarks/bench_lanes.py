@@ -0,0 +1,119 @@
+# Host-side benchmark: the per-step lanes (velocity, probability,
+# ratchet, micro-timing). Plays a pattern with lanes on some of its
+# steps in the simulator and reports where the hits landed, what the
+# step tick costs with and without lanes, and the NVM bytes each state
+# takes; then checks a late ratchet plays all its hits and the lanes
+# survive a save and load. Exits with status 1 if either fails.
+#
+# run from the repo root with:
+#   python benchmarks/bench_lanes.py
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import lanes  # noqa: E402
+
+repeats = 2000
+
+
+def play_step_us(engine):
+    engine.midi.record = False
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        for pulse in range(engine.pulses_per_step):
+            engine.pulse(0)
+        engine.note_offs.release_all()
+        engine.midi_events.flush()
+    engine.midi.record = True
+    return (time.perf_counter_ns() - start) / repeats / 1000
+
+
+def hits(s, start_ns):
+    """(ms after start, note, velocity) of every note-on"""
+    found = []
+    for data, t in zip(s.midi.writes, s.midi.times):
+        # clock bytes share writes with the notes
+        data = bytes(b for b in data if b < 0xF8)
+        for i in range(0, len(data) - 2, 3):
+            if data[i] & 0xF0 == 0x90:
+                found.append(((t - start_ns) / 1e6, data[i + 1], data[i + 2]))
+    return found
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    engine = s.engine
+    # bass on every step, snare on 2 and 6, hats (voice 4) on the odd steps
+    for step in range(8):
+        engine.drums[0].sequence[step] = 1
+    for step in (2, 6):
+        engine.drums[1].sequence[step] = 1
+    for step in range(1, 8, 2):
+        engine.drums[4].sequence[step] = 1
+    plain_us = play_step_us(engine)
+    engine.save_state()
+    plain_bytes = len(engine.state_store.load())
+
+    for step in range(8):
+        engine.set_lane(lanes.VELOCITY, 0, step, 40 + 10 * step)
+    engine.set_lane(lanes.RATCHET, 1, 6, 3)
+    engine.set_lane(lanes.OFFSET, 1, 2, 2)
+    # a ratchet starting late: both hits in the pulses the offset leaves
+    engine.drums[2].sequence[4] = 1
+    engine.set_lane(lanes.RATCHET, 2, 4, 2)
+    engine.set_lane(lanes.OFFSET, 2, 4, 3)
+    for step in range(1, 8, 2):
+        engine.set_lane(lanes.PROBABILITY, 4, step, 50)
+    lanes_us = play_step_us(engine)
+
+    s.start(at=0.1)
+    step_ms = 60_000 / (engine.bpm * engine.steps_per_beat)
+    run_start = s.clock.monotonic_ns()
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.1 + 8 * 8 * step_ms / 1000)
+    played = hits(s, run_start)
+    first = played[0][0]
+    print(f"8 bars at {engine.bpm} bpm, step {step_ms:.1f} ms")
+    bass = [v for t, n, v in played if n == 36][:8]
+    print(f"  bass velocities   {bass}")
+    snare = [round((t - first) % (8 * step_ms) / step_ms, 2) for t, n, v in played if n == 38]
+    print(f"  snare at steps    {sorted(set(snare))}")
+    # the late ratchet's hits, in pulses after the bass on their step
+    note = engine.drums[2].note
+    pulse_ms = step_ms / engine.pulses_per_step
+    late = []
+    bass_ms = 0
+    for t, n, v in played:
+        if n == 36:
+            bass_ms = t
+        elif n == note:
+            late.append(round((t - bass_ms) / pulse_ms))
+    ratchet = sorted(set(late)) == [3, 4] and len(late) == 2 * 8
+    print(f"  late ratchet      pulses {sorted(set(late))}, {len(late)} of 16 hits")
+    hat = sum(1 for t, n, v in played if n == 56)
+    print(f"  hats played       {hat} of 32 at 50%")
+    print(f"  a step's pulses  {plain_us:.1f} us plain, {lanes_us:.1f} us with lanes")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.stop_playing()
+    engine.save_state()
+    lanes_bytes = len(engine.state_store.load())
+    print(f"  NVM payload       {plain_bytes} bytes plain, {lanes_bytes} with lanes")
+    saved = [bytes(v) if v else None for v in engine.patterns.lanes[0].values]
+    engine.patterns.clear_lanes()
+    engine.load_state()
+    loaded = [bytes(v) if v else None for v in engine.patterns.lanes[0].values]
+    print(f"  lanes reloaded    {'ok' if saved == loaded else 'DIFFER'}")
+    s.close()
+    return saved == loaded and ratchet
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,61 @@
+# Host-side benchmark: LED flushes per keypress, counting pin toggles on
+# the stand-in digitalio. Compares the original full 40-bit shift on
+# every press with the dirty-tracked TLC5916.write.
+#
+# run from the repo root with:
+#   python benchmarks/bench_leds.py
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+import digitalio  # noqa: E402
+from TLC5916 import TLC5916  # noqa: E402
+
+
+class original_TLC5916(TLC5916):
+    def write(self):
+        for i in range(8 * len(self.ba)):
+            self.sdi.value = self[i]
+            self.clk.value = True
+            self.clk.value = False
+        self.latch()
+
+
+def presses(count, seed=1):
+    rng = random.Random(seed)
+    # a few keys repeatedly set the state they already had, as happens
+    # when the same frame is redrawn
+    return [(rng.randrange(40), rng.random() < 0.5) for _ in range(count)]
+
+
+def run(label, cls, events):
+    leds = cls(clk_pin="D2", le_pin="D4", sdi_pin="D3", oe_pin="D5", n=5)
+    digitalio.reset_toggles()
+    start = time.perf_counter()
+    for key, state in events:
+        leds[key] = state
+        leds.write()
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {label:9} {elapsed * 1e6 / len(events):7.1f} us/press"
+        f" {digitalio.toggles / len(events):7.1f} pin toggles/press"
+    )
+
+
+def main(count=20_000):
+    events = presses(count)
+    print(f"{count} key presses, 5 x TLC5916")
+    run("original", original_TLC5916, events)
+    run("dirty", TLC5916, events)
+
+
+if __name__ == "__main__":
+    main()
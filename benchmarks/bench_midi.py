@@ -0,0 +1,58 @@
+# Host-side benchmark: per-voice MIDI writes vs. one batched write per step.
+#
+# run from the repo root with:
+#   python benchmarks/bench_midi.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from midi_out import midi_out  # noqa: E402
+from sim import usb_midi  # noqa: E402
+
+notes = [36, 38, 41, 44, 56]
+channel = 10
+
+
+def per_voice_step(port):
+    # the original play_drum, once per voice
+    for note in notes:
+        port.write(bytearray([0x90 | (channel - 1), note, 120]))
+        port.write(bytearray([0x80 | (channel - 1), note, 0]))
+
+
+def batched_step(out):
+    for note in notes:
+        out.note_on(channel, note, 120)
+        out.note_off(channel, note)
+    out.flush()
+
+
+def run(label, step, target, port, steps):
+    port.clear()
+    start = time.perf_counter()
+    for _ in range(steps):
+        step(target)
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {label:18} {elapsed * 1e9 / steps:7.0f} ns/step"
+        f" {len(port.writes) / steps:5.1f} writes/step"
+        f" {port.bytes_written() / steps:5.1f} bytes/step"
+        f" {port.buffer_allocations():6} buffers"
+    )
+
+
+def main(steps=20_000):
+    print(f"{len(notes)} voices per step, {steps} steps")
+    port = usb_midi.PortOut()
+    run("per voice", per_voice_step, port, port, steps)
+    out = midi_out(port, max_events=2 * len(notes), running_status=False)
+    run("batched", batched_step, out, port, steps)
+    out = midi_out(port, max_events=2 * len(notes))
+    run("batched+running", batched_step, out, port, steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Host-side benchmark: following an external MIDI clock.
+#
+# First feeds midi_clock_in recorded-style clock streams -- pulses with
+# timing jitter, delivered in bursts, mixed with notes, active sensing
+# and a song position -- and reports the pulses and messages seen, the
+# tempo it settles on and the parse cost. Then slaves the whole
+# firmware to a jittery clock in the simulator and reports how close
+# the steps land to the beat and what polling allocates.
+#
+# run from the repo root with:
+#   python benchmarks/bench_midi_clock.py
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from midi_clock import (  # noqa: E402
+    midi_clock_in,
+    CLOCK,
+    START,
+    STOP,
+    SONG_POSITION,
+)
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+from sim.usb_midi import PortIn  # noqa: E402
+
+
+class fake_ticks:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def clock_stream(bpm, beats, jitter_ms, burst_ms, rng):
+    """
+    (arrival ms, bytes) chunks: start, a song position, then the pulses
+    with jitter, each arrival rounded up to the next burst
+    """
+    pulse_ms = 60_000 / (bpm * 24)
+    chunks = [(0, bytes((SONG_POSITION, 0x10, 0x00, START)))]
+    for n in range(beats * 24):
+        t = 1 + n * pulse_ms + rng.uniform(-jitter_ms, jitter_ms)
+        t = (int(max(t, 1)) // burst_ms + 1) * burst_ms
+        data = bytes((CLOCK,))
+        if n % 7 == 0:
+            # a note, split by a clock pulse as the spec allows
+            data = bytes((0x99, 36, CLOCK, 100))
+        elif n % 11 == 0:
+            data = bytes((0xFE, CLOCK))
+        chunks.append((t, data))
+    chunks.append((chunks[-1][0] + 1, bytes((STOP,))))
+    chunks.sort(key=lambda c: c[0])
+    return chunks
+
+
+def follow(bpm, jitter_ms, burst_ms, poll_ms=2, beats=32):
+    rng = random.Random(bpm)
+    chunks = clock_stream(bpm, beats, jitter_ms, burst_ms, rng)
+    port = PortIn()
+    ticks = fake_ticks()
+    seen = {}
+
+    def listener(message, value):
+        seen[message] = seen.get(message, 0) + 1
+        if message == SONG_POSITION:
+            seen["position"] = value
+
+    clock_in = midi_clock_in(port, listener, ticks=ticks)
+    i = 0
+    polls = 0
+    parse_ns = 0
+    while i < len(chunks):
+        ticks.now += poll_ms
+        while i < len(chunks) and chunks[i][0] <= ticks.now:
+            port.feed(chunks[i][1])
+            i += 1
+        start = time.perf_counter_ns()
+        clock_in.poll()
+        parse_ns += time.perf_counter_ns() - start
+        polls += 1
+    sent = sum(c[1].count(CLOCK) for c in chunks)
+    print(
+        f"  {bpm:3} bpm  jitter +-{jitter_ms} ms  bursts {burst_ms:2} ms:"
+        f"  pulses {seen.get(CLOCK, 0)}/{sent}"
+        f"  start {seen.get(START, 0)} stop {seen.get(STOP, 0)}"
+        f" position {seen.get('position')}"
+        f"  tempo {clock_in.bpm()} bpm"
+        f"  {parse_ns / clock_in.bytes_read:.0f} ns/byte"
+    )
+
+
+def slaved(bpm, jitter_ms, bars=4):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    engine = s.engine
+    port = engine.midi_in
+    rng = random.Random(1)
+    # the bass drum on every step
+    for key in range(8):
+        s.press_key(key, at=0.1)
+    pulse_s = 60 / (bpm * 24)
+    start = 0.5
+    s.at(start, lambda: port.feed(bytes((START,))))
+    pulses = bars * 16 * 6
+    for n in range(pulses):
+        t = start + 0.001 + n * pulse_s + rng.uniform(0, jitter_ms / 1000)
+        s.at(t, lambda: port.feed(bytes((CLOCK,))))
+    end = start + 0.002 + pulses * pulse_s
+    s.at(end, lambda: port.feed(bytes((STOP,))))
+    # the stand-in port copies what it hands out, so look at the
+    # firmware's bytecodes rather than the heap
+    found = s.probe_bytecode(engine.clock_in, "poll")
+    # start/stop are logged at info, which builds what it prints
+    log.set_level(log.WARNING)
+    run_start = s.clock.monotonic_ns()
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(end + 0.1)
+    # step n should sound on pulse 6n
+    offsets = []
+    for data, t in zip(s.midi.writes, s.midi.times):
+        if data[0] & 0xF0 == 0x90:
+            ideal = (start + 0.001 + 6 * len(offsets) * pulse_s) * 1e9
+            offsets.append((t - run_start - ideal) / 1e6)
+    steps = len(offsets)
+    print(
+        f"  {bpm:3} bpm  jitter 0..{jitter_ms} ms: {steps}/{bars * 16} steps,"
+        f" late mean {sum(offsets) / max(steps, 1):.2f} ms"
+        f" max {max(offsets, default=0):.2f} ms,"
+        f" tempo shown {engine.bpm},"
+        f" allocating bytecodes {sum(found.values())}"
+    )
+    for where, count in sorted(found.items()):
+        print(f"    {where} x{count}")
+    s.close()
+    log.set_level(log.INFO)
+
+
+def main():
+    print("midi_clock_in, 32 beats")
+    follow(120, 0, 1)
+    follow(120, 3, 8)
+    follow(174, 3, 8)
+    follow(90, 5, 16)
+    print("firmware following the clock")
+    slaved(120, 0)
+    slaved(120, 3)
+    slaved(174, 3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Host-side check of the NVM persistence on the stand-in NVM: writes
+# and bytes written per save compared with rewriting the whole state
+# (each write is a sector erase on the RP2040, so a save must be one
+# write), and recovery from writes torn by a simulated power loss.
+#
+# run from the repo root with:
+#   python benchmarks/bench_nvm.py
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from microcontroller import NVM, PowerLoss  # noqa: E402
+from persistence import nvm_store  # noqa: E402
+
+
+def states(count, size, seed=1):
+    # each stop of the transport changes a bit or two, or nothing
+    rng = random.Random(seed)
+    state = bytearray(rng.randrange(256) for _ in range(size))
+    for _ in range(count):
+        for _ in range(rng.choice((0, 0, 1, 2))):
+            state[rng.randrange(size)] ^= 1 << rng.randrange(8)
+        yield bytes(state)
+
+
+def compare(count, size):
+    whole = NVM(4096)
+    for state in states(count, size):
+        whole[0 : len(state)] = state
+    nvm = NVM(4096)
+    store = nvm_store(nvm)
+    saves = 0
+    for state in states(count, size):
+        saves += store.save(state)
+    assert nvm.writes == saves, "a save took more than one write"
+    print(f"{count} saves of a {size} byte state")
+    print(f"  whole state  {whole.writes:5} writes {whole.bytes_written:7} bytes")
+    print(
+        f"  nvm_store    {nvm.writes:5} writes {nvm.bytes_written:7} bytes"
+        f" ({store.saves_skipped} skipped)"
+    )
+
+
+def torn_writes(size, trials=2000, seed=2):
+    rng = random.Random(seed)
+    recovered = 0
+    for _ in range(trials):
+        nvm = NVM(4096)
+        store = nvm_store(nvm)
+        history = []
+        for state in states(rng.randrange(1, 6), size, seed=rng.randrange(1000)):
+            if store.save(state) or not history:
+                history.append(state)
+        new = bytes(rng.randrange(256) for _ in range(size))
+        nvm.tear_after = rng.randrange(size + 8)
+        try:
+            store.save(new)
+            history.append(new)
+        except PowerLoss:
+            pass
+        loaded = nvm_store(nvm).load()
+        # a torn save may complete or not, but never corrupts the state
+        assert loaded in (history[-1], new), "torn write lost the state"
+        recovered += 1
+    print(f"torn writes: {recovered}/{trials} loads returned a valid state")
+
+
+def main():
+    # the state code.py saves: 4 byte header plus 5 one-byte patterns
+    compare(1000, 9)
+    compare(1000, 256)
+    torn_writes(9)
+    torn_writes(256)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Host-side benchmark: per-drum bitarray scan vs. per-step voice masks.
+#
+# run from the repo root with:
+#   python benchmarks/bench_pattern.py
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bitarray import bitarray  # noqa: E402
+from pattern import pattern  # noqa: E402
+
+
+def make_sequences(voices, steps, density, seed=1):
+    rng = random.Random(seed)
+    return [
+        bitarray([rng.random() < density for _ in range(steps)])
+        for _ in range(voices)
+    ]
+
+
+def scan_tick(sequences, step, hits):
+    for voice in range(len(sequences)):
+        if sequences[voice][step]:
+            hits.append(voice)
+
+
+def mask_tick(p, step, hits):
+    voices = p.step_mask(step)
+    voice = 0
+    while voices:
+        if voices & 1:
+            hits.append(voice)
+        voices >>= 1
+        voice += 1
+
+
+def run(label, tick, target, steps, ticks):
+    hits = []
+    start = time.perf_counter()
+    for i in range(ticks):
+        tick(target, i % steps, hits)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:6} {elapsed * 1e9 / ticks:8.0f} ns/tick ({len(hits)} hits)")
+
+
+def main(ticks=100_000):
+    # up to the most voices a pattern takes
+    for voices, steps in ((5, 8), (8, 16), (16, 64), (pattern.max_voices, 64)):
+        for density in (0.1, 0.5):
+            sequences = make_sequences(voices, steps, density)
+            p = pattern(sequences)
+            print(f"{voices} voices x {steps} steps, density {density}")
+            run("scan", scan_tick, sequences, steps, ticks)
+            run("mask", mask_tick, p, steps, ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Host-side benchmark: the firmware's own profiler. Plays a few bars in
+# the simulator -- idle, then with a flood of key presses and encoder
+# turns over slow I2C -- and dumps the histograms the firmware recorded,
+# the way button 1 + button 3 does on the board. Also gives what
+# recording costs per timed call.
+#
+# run from the repo root with:
+#   python benchmarks/bench_profile.py [bars] [cpu_scale]
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from sim.runner import simulation  # noqa: E402
+from profiler import histogram  # noqa: E402
+
+
+def busy(s, seconds, i2c_delay):
+    def slow_i2c():
+        s.engine.rotary_seesaw.read_delay = i2c_delay
+        s.engine.rotary_seesaw2.read_delay = i2c_delay
+
+    s.at(0.55, slow_i2c)
+    t = 0.6
+    n = 0
+    while t < seconds:
+        s.press_key((7 * n) % 40, at=t)
+        s.turn("rotary_seesaw", 0, 1 if n % 4 < 2 else -1, at=t + 0.02)
+        t += 0.05
+        n += 1
+
+
+def scenario(label, bars, cpu_scale, i2c_delay=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(cpu_scale=cpu_scale)
+    s.record(False)
+    engine = s.engine
+    seconds = 0.5 + bars * 16 * 60 / (engine.bpm * 4)
+    for key in (0, 4, 10, 14, 16, 18, 20, 22):
+        s.press_key(key, at=0.1)
+    s.start(at=0.5)
+    if i2c_delay is not None:
+        busy(s, seconds, i2c_delay)
+    # stop at the end so the state is saved
+    s.start(at=seconds)
+    # and dump with the button combo once the save has happened
+    s.push("button1_in", at=seconds + 0.2, hold=0.1)
+    s.push("button3_in", at=seconds + 0.25)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        s.run(seconds + 0.4)
+    s.close()
+    print(f"{label}: {bars} bars, cpu_scale {cpu_scale}")
+    for line in out.getvalue().splitlines():
+        if line.startswith("profile") or line[:12].rstrip() in (
+            "step late",
+            "loop period",
+            "midi write",
+            "led write",
+            "i2c read",
+            "display",
+            "nvm save",
+        ):
+            print("  " + line)
+
+
+def overhead(repeats=100_000):
+    h = histogram("x")
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        h.start()
+        h.stop()
+    print(f"start/stop: {(time.perf_counter_ns() - start) / repeats:.0f} ns per call on the host")
+
+
+def main(bars=4, cpu_scale=50):
+    scenario("idle", bars, cpu_scale)
+    scenario("busy input, 2 ms I2C", bars, cpu_scale, 0.002)
+    overhead()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
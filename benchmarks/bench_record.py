@@ -0,0 +1,143 @@
+# Host-side benchmark: live recording. A simulated drummer plays a
+# random pattern of 16ths at 300 bpm into the MIDI input, each hit up
+# to 20% of a step early or late, with hi-hat notes the kit doesn't
+# have mixed in; checks the pattern recorded is the one played, and
+# compares the step lateness with and without the input. Each hit is
+# expected on the step played nearest the time it arrived, from the
+# times the firmware actually played its steps. Then records again in
+# song mode, with a chain of two patterns other than the active one,
+# and checks each hit went into the pattern the chain was playing.
+#
+# What's recorded is checked without host CPU time charged to the
+# simulation (cpu_scale 0), so it's the same on every run; with it, a
+# hit near half a step can be read after the firmware has moved on.
+# The lateness is measured at cpu_scale.
+#
+# run from the repo root with:
+#   python benchmarks/bench_record.py [bars] [cpu_scale]
+
+import contextlib
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+
+
+def nearest(steps_played, t):
+    """
+    the (pattern, step) played nearest time t (ms), ties going to the
+    earlier
+    """
+    for i in range(1, len(steps_played)):
+        if steps_played[i][0] > t:
+            before, after = steps_played[i - 1], steps_played[i]
+            return before[1] if t - before[0] <= after[0] - t else after[1]
+    return steps_played[-1][1]
+
+
+def take(bars, cpu_scale, drummer, chain=()):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(cpu_scale=cpu_scale)
+    s.record(False)
+    engine = s.engine
+    engine.set_bpm(300)
+    engine.set_recording(True)
+    for number in chain:
+        engine.append_chain(number)
+    if chain:
+        engine.set_song_mode(True)
+    rng = random.Random(3)
+    steps = engine.num_steps
+    played = [[rng.random() < 0.4 for _ in range(steps)] for _ in engine.drums]
+    pulse_ms = 60_000 / (engine.bpm * 24)
+    step_ms = pulse_ms * engine.pulses_per_step
+    # (ms, voice) for every hit, and (ms, (pattern, step)) for every
+    # step played
+    hits = []
+    steps_played = []
+    play_step = engine.play_step
+
+    def timed_step(now):
+        song = engine.song
+        if engine.song_mode:
+            where = (song.patterns[song.entry], song.steps[song.position])
+        else:
+            where = (engine.patterns.active, engine.stepper.current_step)
+        steps_played.append((s.now() * 1000, where))
+        play_step(now)
+
+    engine.play_step = timed_step
+
+    def feed(data):
+        engine.midi_in.feed(data)
+        if engine.note_voices[data[1]] != 0xFF:
+            hits.append((s.now() * 1000, engine.note_voices[data[1]]))
+
+    def uncharged_feed(data):
+        s.clock.uncharged(feed, data)
+
+    def schedule():
+        # the grid of steps from the clock, now that it's running; the
+        # lateness counted from here on, past the start-up
+        clock = engine.clock
+        clock.reset_stats()
+        first = clock.ms_until_due() - clock.step * pulse_ms
+        for n in range(bars * 16):
+            for voice, drum in enumerate(engine.drums):
+                if not played[voice][n % steps]:
+                    continue
+                t = first + n * step_ms + rng.uniform(-0.2, 0.2) * step_ms
+                # steps already gone come round again in the next bar
+                if t > 0:
+                    s.loop.call_later(
+                        t / 1000, uncharged_feed, bytes((0x99, drum.note, 100))
+                    )
+            # and a closed hat on the off-beats, which the kit hasn't got
+            t = first + (n + 0.5) * step_ms
+            if t > 0:
+                s.loop.call_later(t / 1000, uncharged_feed, bytes((0x99, 42, 60)))
+
+    s.start(at=0.1)
+    s.at(1.0, schedule if drummer else engine.clock.reset_stats)
+    seconds = 1.0 + (bars * 16 + 1) * step_ms / 1000
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(seconds)
+    count = engine.patterns.count
+    recorded = [
+        [[bool(seq[i]) for i in range(steps)] for seq in engine.patterns.get(n).sequences]
+        for n in range(count)
+    ]
+    expected = [[[False] * steps for _ in engine.drums] for _ in range(count)]
+    for t, voice in hits:
+        number, step = nearest(steps_played, t)
+        expected[number][voice][step] = True
+    clock = engine.clock
+    result = (recorded == expected, len(hits), clock.late_mean(), clock.late_max)
+    s.close()
+    return result
+
+
+def main(bars=4, cpu_scale=50):
+    log.set_level(log.WARNING)
+    print(f"recording at 300 bpm, {bars} bars, cpu_scale {cpu_scale}")
+    quiet = take(bars, cpu_scale, drummer=False)
+    busy = take(bars, cpu_scale, drummer=True)
+    exact = take(bars, 0, drummer=True)
+    song = take(bars, 0, drummer=True, chain=(1, 2))
+    print(f"  recorded as played  {'ok' if exact[0] else 'DIFFERS'} ({exact[1]} notes in)")
+    print(
+        f"  song mode (1, 2)    {'ok' if song[0] else 'DIFFERS'} ({song[1]} notes in)"
+    )
+    print(f"  pulse late, quiet   mean {quiet[2]:.2f} ms max {quiet[3]} ms")
+    print(f"  pulse late, playing mean {busy[2]:.2f} ms max {busy[3]} ms")
+    log.set_level(log.INFO)
+    return exact[0] and song[0]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(a) for a in sys.argv[1:])) else 1)
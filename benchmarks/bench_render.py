@@ -0,0 +1,165 @@
+# Host-side benchmark: rendering saved states to MIDI files. Saves a
+# pattern with lanes (probability, ratchets, late hits), and a song
+# chaining it with another, plays each in the simulator and renders
+# the saved state with sim.render; checks the file holds the notes the
+# simulator played, on the same pulses and at the same velocities. The
+# same state is rendered from an image of the whole NVM, as dumped from
+# the device, and to a file which can't seek, and must come out the
+# same. Then gives how fast states render.
+#
+# run from the repo root with:
+#   python benchmarks/bench_render.py [bars] [renders]
+
+import contextlib
+import io
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+from sim.render import division, payload_of, renderer, shape_of  # noqa: E402
+import lanes  # noqa: E402
+import log  # noqa: E402
+
+
+def messages(data):
+    """(status, note, velocity) of each channel message in data"""
+    data = bytes(b for b in data if b < 0xF8)
+    for i in range(0, len(data) - 2, 3):
+        yield data[i] & 0xF0, data[i + 1], data[i + 2]
+
+
+def played(s, started_ms, pulse_ms):
+    """(pulse, note, velocity) of the notes the simulator sent"""
+    notes = []
+    for t, data in zip(s.midi.times, s.midi.writes):
+        for status, note, velocity in messages(data):
+            if status == 0x90 and velocity:
+                pulse = round((t / 1e6 - started_ms) / pulse_ms)
+                notes.append((pulse, note, velocity))
+    return notes
+
+
+def rendered(midi):
+    """(pulse, note, velocity) of the note-ons in a rendered file"""
+    per_pulse = division // 24
+    (length,) = struct.unpack_from(">L", midi, 18)
+    i = 22
+    end = i + length
+    tick = 0
+    notes = []
+    while i < end:
+        delta = 0
+        while True:
+            byte = midi[i]
+            i += 1
+            delta = delta << 7 | byte & 0x7F
+            if byte < 0x80:
+                break
+        tick += delta
+        if midi[i] == 0xFF:
+            i += 3 + midi[i + 2]
+            continue
+        status, note, velocity = midi[i] & 0xF0, midi[i + 1], midi[i + 2]
+        i += 3
+        if status == 0x90 and velocity:
+            notes.append((tick // per_pulse, note, velocity))
+    return notes
+
+
+class unseekable(io.BytesIO):
+    """a file like a pipe, which can only be written to the end"""
+
+    def seekable(self):
+        return False
+
+
+def setup(engine, song):
+    for key in (0, 2, 4, 6, 8, 11, 13, 17, 19, 24, 30, 33):
+        engine.key_pressed(key)
+    for step in range(0, 8, 2):
+        engine.set_lane(lanes.VELOCITY, 0, step, 40 + 10 * step)
+        engine.set_lane(lanes.PROBABILITY, 1, step, 50)
+        engine.set_lane(lanes.RATCHET, 2, step, 3)
+        engine.set_lane(lanes.OFFSET, 3, step, 2)
+    if song:
+        other = engine.patterns.get(1)
+        for step in range(0, 8, 3):
+            other.sequences[4][step] = 1
+        engine.append_chain(0, 2)
+        engine.append_chain(1, 1)
+        engine.set_song_mode(True)
+
+
+def compare(bars, song):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    engine = s.engine
+    setup(engine, song)
+    engine.save_state()
+    payload = bytes(engine.state_store.load())
+    image = bytes(engine.state_store.nvm[:])
+    steps = bars * 16
+    step_s = 60 / (engine.bpm * engine.steps_per_beat)
+    # the pulses are counted from the clock's start, in whole ms; the
+    # first one may go out a little after it
+    started = []
+    start_playing = engine.start_playing
+
+    def timed_start(send=True):
+        started.append(s.clock.monotonic_ns() // 1_000_000)
+        start_playing(send)
+
+    engine.start_playing = timed_start
+    s.start(at=0.1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.1 + (steps - 0.5) * step_s)
+    expected = played(s, started[0], step_s * 1000 / engine.pulses_per_step)
+    s.close()
+
+    out = io.BytesIO()
+    renderer(shape_of(payload)).render(payload, out, bars)
+    notes = rendered(out.getvalue())
+    # from the NVM image, and into a pipe
+    from_image = io.BytesIO()
+    found = payload_of(image)
+    renderer(shape_of(found)).render(found, from_image, bars)
+    piped = unseekable()
+    renderer(shape_of(payload)).render(payload, piped, bars)
+    same = from_image.getvalue() == out.getvalue() == piped.getvalue()
+    return notes == expected, same, len(expected), payload
+
+
+def speed(payload, bars, renders):
+    r = renderer(shape_of(payload))
+    out = io.BytesIO()
+    start = time.perf_counter()
+    for _ in range(renders):
+        out.seek(0)
+        out.truncate()
+        r.render(payload, out, bars)
+    return renders / (time.perf_counter() - start), len(out.getvalue())
+
+
+def main(bars=4, renders=200):
+    ok = True
+    log.set_level(log.WARNING)
+    print(f"rendering {bars} bars")
+    for label, song in (("pattern", False), ("song", True)):
+        matches, same, count, payload = compare(bars, song)
+        ok = ok and matches and same
+        per_s, size = speed(payload, bars, renders)
+        print(
+            f"  {label:8} as played {'ok' if matches else 'DIFFERS'} ({count} notes),"
+            f" from NVM image and to a pipe {'ok' if same else 'DIFFER'},"
+            f" {per_s:6.0f} renders/s, {size} byte files"
+        )
+    log.set_level(log.INFO)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(a) for a in sys.argv[1:])) else 1)
@@ -0,0 +1,107 @@
+# Host-side benchmark suite: boots code.py in the simulator, plays N bars
+# under virtual time for a few input scenarios and reports event loop
+# passes, per-step lateness histograms, allocations per step and the
+# MIDI / LED / neopixel traffic.
+#
+# run from the repo root with:
+#   python benchmarks/bench_sim.py [bars] [cpu_scale]
+#
+# cpu_scale 0 makes the firmware's own code free, so lateness comes only
+# from scheduling and blocking I/O; e.g. 50 charges host CPU time x50 to
+# the virtual clock to approximate an RP2040.
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+
+bins = (0, 1, 2, 3, 5, 10, 20)
+
+
+def histogram(values):
+    counts = [0] * len(bins)
+    for v in values:
+        for i in range(len(bins) - 1, -1, -1):
+            if v >= bins[i]:
+                counts[i] += 1
+                break
+    return "  ".join(
+        f"{'>=' if i == len(bins) - 1 else ''}{bins[i]}ms:{counts[i]}"
+        for i in range(len(bins))
+    )
+
+
+def slow_i2c(s, i2c_delay):
+    # the seesaws only exist once the engine has brought them up
+    s.engine.rotary_seesaw.read_delay = i2c_delay
+    s.engine.rotary_seesaw2.read_delay = i2c_delay
+
+
+def busy_input(s, seconds, i2c_delay):
+    s.at(0.55, lambda: slow_i2c(s, i2c_delay))
+    t = 0.6
+    n = 0
+    while t < seconds:
+        s.press_key((7 * n) % 40, at=t)
+        s.turn("rotary_seesaw2", 3, 1 if n % 2 else -1, at=t + 0.01)
+        s.turn("rotary_seesaw", 0, 1 if n % 4 < 2 else -1, at=t + 0.02)
+        t += 0.05
+        n += 1
+
+
+def scenario(label, bars, cpu_scale, setup):
+    wall = time.perf_counter()
+    # the firmware prints; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(cpu_scale=cpu_scale)
+        bpm = s.engine.bpm
+        seconds = 0.5 + bars * 16 * 60 / (bpm * 4)
+        # a simple beat so every step has something to send
+        for key in (0, 4, 10, 14, 16, 18, 20, 22):
+            s.press_key(key, at=0.1)
+        s.start(at=0.5)
+        setup(s, seconds)
+        lateness, allocated = s.probe_steps(allocations=True)
+        iterations = s.loop.iterations()
+        s.run(seconds)
+        iterations = s.loop.iterations() - iterations
+    wall = time.perf_counter() - wall
+    steps = len(lateness)
+    print(f"{label}: {bars} bars at {bpm} bpm, {steps} steps")
+    print(f"  boot              {s.boot_ns / 1e9:.2f} s virtual")
+    print(
+        f"  event loop        {iterations / seconds:.0f} passes/s virtual,"
+        f" {iterations / wall:.0f} passes/s wall"
+    )
+    print(f"  step lateness     {histogram(lateness)}")
+    if steps:
+        print(
+            f"  allocations       {sum(allocated) / steps:.0f} bytes/step"
+            f" (max {max(allocated)})"
+        )
+        print(
+            f"  midi              {len(s.midi.writes) / steps:.2f} writes/step"
+            f" {sum(len(w) for w in s.midi.writes) / steps:.1f} bytes/step"
+        )
+        print(
+            f"  leds              {len(s.leds.frames)} frames,"
+            f" neopixel {s.pixels.shows / steps:.1f} pushes/step"
+        )
+    s.close()
+
+
+def main(bars=8, cpu_scale=0):
+    scenario("idle", bars, cpu_scale, lambda s, seconds: None)
+    scenario("busy input", bars, cpu_scale, lambda s, t: busy_input(s, t, 0))
+    scenario(
+        "busy input, 2 ms I2C", bars, cpu_scale, lambda s, t: busy_input(s, t, 0.002)
+    )
+
+
+if __name__ == "__main__":
+    main(*(float(a) if "." in a else int(a) for a in sys.argv[1:]))
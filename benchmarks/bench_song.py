@@ -0,0 +1,114 @@
+# Host-side benchmark: song mode. Chains three patterns with repeats,
+# the way it's done on the device (the knob button cues each pattern and
+# typing a on the serial console adds it, again for each repeat), plays
+# the song in the simulator and checks every step played the
+# pattern the chain says it should; then compares the step tick in song
+# and pattern mode, checks the song tick allocates nothing and that the
+# chain survives a save and load.
+#
+# run from the repo root with:
+#   python benchmarks/bench_song.py
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import log  # noqa: E402
+
+repeats = 5000
+# (pattern, repeats); pattern n has only voice n on every step
+chain = ((0, 2), (1, 1), (2, 3))
+
+
+def step_us(engine):
+    engine.midi.record = False
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        engine.play_step(0)
+        engine.note_offs.release_all()
+        engine.midi_events.flush()
+    engine.midi.record = True
+    return (time.perf_counter_ns() - start) / repeats / 1000
+
+
+def notes(s):
+    found = []
+    for data in s.midi.writes:
+        data = bytes(b for b in data if b < 0xF8)
+        for i in range(0, len(data) - 2, 3):
+            if data[i] & 0xF0 == 0x90:
+                found.append(data[i + 1])
+    return found
+
+
+def main():
+    ok = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    log.set_level(log.WARNING)
+    engine = s.engine
+    for number, times in chain:
+        sequence = engine.patterns.get(number).sequences[number]
+        for step in range(engine.num_steps):
+            sequence[step] = 1
+        while engine.patterns.active != number:
+            engine.cue_next_pattern()
+        for _ in range(times):
+            engine.serial_command("a")
+    chained = [
+        (engine.song.patterns[i], engine.song.repeats[i])
+        for i in range(engine.song.length)
+    ]
+    ok = chained == list(chain)
+    pattern_us = step_us(engine)
+    engine.set_song_mode(True)
+    song_us = step_us(engine)
+    found = s.probe_bytecode(engine, "play_song_step")
+
+    expected = []
+    for number, times in chain:
+        expected += [engine.drums[number].note] * (times * engine.num_steps)
+    s.midi.clear()
+    s.start(at=0.1)
+    steps = len(expected)
+    step_s = 60 / (engine.bpm * engine.steps_per_beat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.1 + (steps - 0.5) * step_s)
+    played = notes(s)
+    matches = played == expected
+    ok = ok and matches and not found
+    print(f"song of {len(chain)} patterns, {steps} steps")
+    print(f"  chained by serial  {'ok' if chained == list(chain) else chained}")
+    print(f"  played as chained  {'ok' if matches else 'DIFFERS'} ({len(played)} notes)")
+    print(f"  step tick          {pattern_us:.1f} us pattern, {song_us:.1f} us song")
+    print(f"  allocating bytecodes {sum(found.values())}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.stop_playing()
+    engine.save_state()
+    saved = bytes(engine.song.patterns[: engine.song.length])
+    engine.serial_command("x")
+    cleared = engine.song.length == 0 and not engine.song_mode
+    engine.load_state()
+    lazy = engine.song.length == 0 and engine.song_data is not None
+    engine.set_song_mode(True)
+    loaded = bytes(engine.song.patterns[: engine.song.length])
+    reloaded = saved == loaded and lazy and cleared
+    ok = ok and reloaded
+    print(
+        f"  NVM payload        {len(engine.state_store.load())} bytes,"
+        f" chain reloaded {'ok' if reloaded else 'DIFFERS'}"
+        f" ({'decoded on first use' if lazy else 'decoded on load'})"
+    )
+    s.close()
+    log.set_level(log.INFO)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
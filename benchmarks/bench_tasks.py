@@ -0,0 +1,71 @@
+# Host-side benchmark: lateness of the step task while the other tasks
+# are loaded with simulated input (slow I2C encoder reads, a flood of key
+# presses and encoder turns). Runs code.py against the sim stand-ins in
+# real time; see bench_sim.py for the virtual time suite.
+#
+# run from the repo root with:
+#   python benchmarks/bench_tasks.py
+
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import load_firmware  # noqa: E402
+
+
+async def stress(engine, i2c_delay, press_every_ms, rng):
+    # the seesaws come up half a second after the engine starts
+    while engine.i2c_ready_ticks is None:
+        await asyncio.sleep(0.01)
+    engine.rotary_seesaw.read_delay = i2c_delay
+    engine.rotary_seesaw2.read_delay = i2c_delay
+    while True:
+        if press_every_ms:
+            engine.switches.press(rng.randrange(40))
+            engine.rotary_seesaw2.turn(1, rng.choice((-1, 1)))
+            await asyncio.sleep(press_every_ms / 1000)
+        else:
+            await asyncio.sleep(1)
+
+
+async def scenario(firmware, label, seconds, i2c_delay, press_every_ms):
+    rng = random.Random(1)
+    # a fresh engine each time, as start() sets up the I2C devices
+    engine = firmware.sequencer()
+    engine.set_bpm(300)
+    engine.playing = True
+    engine.clock.start()
+    engine.clock.reset_stats()
+    tasks = [
+        asyncio.create_task(engine.start()),
+        asyncio.create_task(stress(engine, i2c_delay, press_every_ms, rng)),
+    ]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    engine.playing = False
+    clock = engine.clock
+    print(
+        f"  {label:28} {clock.late_count:4} pulses"
+        f"  late mean {clock.late_mean():5.2f} ms  max {clock.late_max:3} ms"
+        f"  resyncs {clock.resyncs}"
+    )
+
+
+async def run(firmware, seconds):
+    print(f"300 bpm, {seconds} s per scenario")
+    await scenario(firmware, "idle", seconds, 0, 0)
+    await scenario(firmware, "keys + encoders", seconds, 0, 2)
+    await scenario(firmware, "keys + 3 ms I2C reads", seconds, 0.003, 2)
+
+
+def main(seconds=3):
+    firmware = load_firmware()
+    asyncio.run(run(firmware, seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Host-side check: the playback hot path (step tick -> MIDI -> LEDs ->
+# neopixels), the step switches and pattern changes allocate nothing.
+# Runs code.py in the simulator with a busy pattern, some of it with
+# per-step lanes, counting what the firmware runs which allocates on
+# CircuitPython: the allocating bytecodes, classes called and
+# allocating built-ins (see sim.runner.simulation.probe_bytecode).
+# Exits with status 1 if it finds any.
+#
+# run from the repo root with:
+#   python benchmarks/check_allocations.py [bars]
+#
+# (tracemalloc isn't used to check: CPython boxes every int above 256,
+# which CircuitPython keeps in the object word up to 2**30, so a call
+# allocating nothing on the board still shows some bytes here.)
+
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sim.runner import simulation  # noqa: E402
+import lanes  # noqa: E402
+
+# (label, attribute path of the object from the engine, method)
+probes = (
+    ("play_step", "", "play_step"),
+    ("play_later", "", "play_later"),
+    ("note-off drain", "note_offs", "drain"),
+    ("midi flush", "midi_events", "flush"),
+    # the switch events drained and their steps toggled
+    ("read_switches", "", "read_switches"),
+    ("show_pattern", "", "show_pattern"),
+    ("neopixel show", "stepper", "show"),
+)
+
+
+def simulate(bars, probe):
+    """plays bars of a busy pattern; probe(s, target, name) wraps a method"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation()
+    # the stand-ins only count, so what's measured is the firmware
+    s.record(False)
+    engine = s.engine
+    # with every lane on some of the steps
+    for step in range(0, 8, 2):
+        engine.set_lane(lanes.VELOCITY, 0, step, 64)
+        engine.set_lane(lanes.PROBABILITY, 1, step, 50)
+        engine.set_lane(lanes.RATCHET, 2, step, 3)
+        engine.set_lane(lanes.OFFSET, 3, step, 2)
+    seconds = 0.5 + bars * 16 * 60 / (engine.bpm * 4)
+    # every voice on some steps, then steps toggled while playing
+    for key in range(0, 40, 3):
+        s.press_key(key, at=0.1)
+    s.start(at=0.5)
+    t = 0.5 + 60 / engine.bpm * 4
+    n = 0
+    while t < seconds:
+        s.press_key((5 * n) % 40, at=t)
+        t += 0.1
+        n += 1
+    # and the next pattern cued twice a bar with the knob button
+    t = 1.0
+    while t < seconds:
+        s.push_seesaw("rotary_seesaw", 24, at=t)
+        t += 60 / engine.bpm * 2
+    results = []
+    for label, path, name in probes:
+        target = engine
+        if path:
+            target = getattr(engine, path)
+        results.append(probe(s, target, name))
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(seconds)
+    s.close()
+    return results
+
+
+def main(bars=8):
+    ok = True
+    found = simulate(
+        bars, lambda s, target, name: s.probe_bytecode(target, name)
+    )
+    print(f"allocating bytecodes ({bars} bars)")
+    for (label, path, name), ops in zip(probes, found):
+        print(f"  {label:16} {'ok' if not ops else 'ALLOCATES'}")
+        for where, count in sorted(ops.items()):
+            print(f"    {where} x{count}")
+        ok = ok and not ops
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(a) for a in sys.argv[1:])) else 1)
@@ -0,0 +1,80 @@
+# Host-side check of the pattern bank: edits more patterns than the
+# cache holds, so the least recently used are packed back as they are
+# evicted, and checks every edit survives save() and load() into a new
+# bank. Then checks a saved bank with a bad offset is turned away
+# without changing the bank it was loaded into. Exits with status 1 if
+# anything differs.
+#
+# run from the repo root with:
+#   python benchmarks/check_bank.py
+
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bank import pattern_bank  # noqa: E402
+
+# count, voices and steps come before the index
+header = 3
+
+
+def contents(bank):
+    """every pattern's steps, as lists of bits per voice"""
+    return [
+        [[seq[step] for step in range(bank.steps)] for seq in bank.get(n).sequences]
+        for n in range(bank.count)
+    ]
+
+
+def edit(bank, rng, edits):
+    """toggles random steps of random patterns, giving what they hold"""
+    for _ in range(edits):
+        number = rng.randrange(bank.count)
+        bank.get(number).sequences[rng.randrange(bank.voices)].toggle(
+            rng.randrange(bank.steps)
+        )
+    return contents(bank)
+
+
+def main(count=16, voices=5, steps=16, cache_size=4, seed=1):
+    ok = True
+    rng = random.Random(seed)
+    bank = pattern_bank(count, voices, steps, cache_size)
+    bank.active = 1
+    bank.queue(2)
+    expected = edit(bank, rng, 500)
+    data = bytearray(bank.size())
+    bank.save(data)
+    loaded = pattern_bank(count, voices, steps, cache_size)
+    kept = loaded.load(data) and contents(loaded) == expected
+    # and once more after the first bank's cache has turned over again
+    expected = edit(bank, rng, 500)
+    bank.save(data)
+    kept = kept and loaded.load(data) and contents(loaded) == expected
+    ok = ok and kept
+    print(
+        f"bank: {count} patterns through a cache of {cache_size},"
+        f" edits {'kept' if kept else 'LOST'} through save and load"
+    )
+
+    index = list(loaded.index)
+    bad = bytearray(data)
+    # patterns 0 and 1 swapped, and the last one's offset past the end
+    # of the data
+    struct.pack_into("<HH", bad, header, index[1], index[0])
+    struct.pack_into("<H", bad, header + 2 * (count - 1), len(loaded.data))
+    refused = not loaded.load(bad)
+    alone = list(loaded.index) == index and contents(loaded) == expected
+    ok = ok and refused and alone
+    print(
+        f"  bad offset       {'refused' if refused else 'TAKEN'},"
+        f" bank {'left alone' if alone else 'CHANGED'}"
+    )
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
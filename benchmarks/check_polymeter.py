@@ -0,0 +1,237 @@
+# Host-side check: polymeter. Gives 5 voices of a 16 step pattern
+# ranges of coprime lengths (one of them played backwards), plays the
+# whole cycle until they all line up again -- the LCM of the lengths --
+# in the simulator, and checks every voice played the steps of its own
+# range on time: each note on the step it was due, within a millisecond
+# of the clock's grid, with none missing or extra, every playhead back
+# at its start when the cycle is done, the LED frame a few steps in
+# showing every voice's playhead inverted, and no allocating bytecode in
+# the step tick. Then sets a range from the buttons and encoders in
+# range mode, saves and loads it, and clears it with the knob button.
+# Exits with status 1 if anything differs. (The first step goes out
+# when the clock task next wakes after the start button, up to
+# idle_poll_ms late, so it's reported on its own.)
+#
+# run from the repo root with:
+#   python benchmarks/check_polymeter.py [bpm]
+
+import contextlib
+import io
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sim  # noqa: E402
+
+sim.install()
+
+from sim.runner import simulation  # noqa: E402
+from geometry import geometry  # noqa: E402
+import log  # noqa: E402
+
+# steps played before the LED frame is checked
+frame_step = 6
+
+# (first, last, forward, steps with a hit) per voice
+ranges = (
+    (0, 2, True, (0, 2)),
+    (4, 7, False, (7, 5)),
+    (3, 7, True, (3, 4, 6)),
+    (8, 14, True, (8, 11, 13)),
+    (5, 15, True, (5, 9, 10, 15)),
+)
+
+
+def expected_notes(engine, cycle):
+    """(step, note) of every hit due in cycle steps"""
+    notes = set()
+    for voice, (first, last, forward, hits) in enumerate(ranges):
+        length = last - first + 1
+        note = engine.drums[voice].note
+        for t in range(cycle):
+            step = first + t % length if forward else last - t % length
+            if step in hits:
+                notes.add((t, note))
+    return notes
+
+
+def frame_cells(engine, frame):
+    """what the latched LED frame shows on page 0, per voice and column"""
+    shape = engine.geometry
+    cells = []
+    for voice in range(len(engine.drums)):
+        row = []
+        for column in range(shape.columns):
+            bit = shape.cell_leds[voice * shape.columns + column]
+            # the SPI bytes go out bit-reversed (see TLC5916.write)
+            row.append(frame[bit >> 3] >> (7 - (bit & 7)) & 1)
+        cells.append(row)
+    return cells
+
+
+def expected_cells(engine, played):
+    """the pattern on page 0, with each voice's step played inverted"""
+    cells = []
+    for voice in range(len(engine.drums)):
+        sequence = engine.drums[voice].sequence
+        cells.append(
+            [
+                int(bool(sequence[column]) != (column == played[voice]))
+                for column in range(engine.geometry.columns)
+            ]
+        )
+    return cells
+
+
+def check_controls():
+    """
+    range mode from the device: button 2 pushed with button 3 held, the
+    quad encoders giving voice 1 the steps 3..7 backwards, then a
+    save and load, and the knob button clearing the ranges
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(shape=geometry(voices=5, steps=16))
+    s.record(False)
+    engine = s.engine
+    s.push("button3_in", at=0.05, hold=0.2)
+    s.push("button2_in", at=0.1)
+    # voice 1, 5 steps long, moved on by 3 and turned backwards
+    s.turn("rotary_seesaw2", 0, 1, at=0.7)
+    s.turn("rotary_seesaw2", 1, -11, at=0.75)
+    s.turn("rotary_seesaw2", 3, 3, at=0.8)
+    s.turn("rotary_seesaw2", 2, -1, at=0.85)
+    found = {}
+
+    def reload():
+        meter = engine.meter
+        found["set"] = (bytes(meter.first), bytes(meter.last), bytes(meter.forward))
+        found["ranging"] = engine.ranging and engine.polymeter
+        engine.save_state()
+        engine.meter.clear()
+        engine.load_state()
+        found["loaded"] = (
+            (bytes(meter.first), bytes(meter.last), bytes(meter.forward))
+            == found["set"]
+            and engine.polymeter
+            and engine.song_data is None
+        )
+
+    s.at(1.0, reload)
+    s.push_seesaw("rotary_seesaw", 24, at=1.1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(1.3)
+    ranges = (bytes([0, 3, 0, 0, 0]), bytes([15, 7, 15, 15, 15]), bytes([1, 0, 1, 1, 1]))
+    set_ok = found.get("set") == ranges and found.get("ranging")
+    loaded = found.get("loaded", False)
+    cleared = not engine.polymeter and bytes(engine.meter.first) == bytes(5)
+    print(f"  range mode       {'ok' if set_ok else found.get('set')}")
+    print(f"  saved and loaded {'ok' if loaded else 'DIFFERS'}")
+    print(f"  knob clears      {'ok' if cleared else 'NO'}")
+    s.close()
+    return set_ok and loaded and cleared
+
+
+def main(bpm=300):
+    log.set_level(log.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = simulation(shape=geometry(voices=5, steps=16))
+    s.record(True)
+    engine = s.engine
+    engine.set_bpm(bpm)
+    lengths = [last - first + 1 for first, last, _, _ in ranges]
+    cycle = math.lcm(*lengths)
+    for voice, (first, last, forward, hits) in enumerate(ranges):
+        for step in hits:
+            engine.drums[voice].sequence[step] = 1
+        engine.set_voice_range(voice, first, last, forward)
+    found = s.probe_bytecode(engine, "play_meter_step")
+    # where the playheads are once the whole cycle has played
+    steps = [0]
+    back = []
+    # the last LED frame before step frame_step, the steps each voice
+    # had played, and when the step before it was played
+    frame = []
+    stepped = [0]
+    play_step = engine.play_step
+
+    def counted_step(now):
+        if steps[0] == cycle:
+            back.append(bytes(engine.meter.position))
+        if steps[0] == frame_step:
+            frame.append((s.leds.frames[-1], bytes(engine.meter.played), stepped[0]))
+        stepped[0] = s.clock.monotonic_ns()
+        steps[0] += 1
+        play_step(now)
+
+    engine.play_step = counted_step
+
+    started = []
+    start_playing = engine.start_playing
+
+    def timed_start(send=True):
+        started.append(s.clock.monotonic_ns() / 1e6)
+        start_playing(send)
+
+    engine.start_playing = timed_start
+    step_ms = 60_000 / (bpm * engine.steps_per_beat)
+    s.start(at=0.1)
+    # a step past the cycle, and time to press start
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run(0.2 + (cycle + 1) * step_ms / 1000)
+
+    played = set()
+    first_ms = 0
+    worst = 0
+    extra = 0
+    for t, data in zip(s.midi.times, s.midi.writes):
+        data = bytes(b for b in data if b < 0xF8)
+        for i in range(0, len(data) - 2, 3):
+            if data[i] & 0xF0 != 0x90 or not data[i + 2]:
+                continue
+            since = t / 1e6 - int(started[0])
+            step = round(since / step_ms)
+            if step >= cycle:
+                continue
+            off = abs(since - step * step_ms)
+            if step == 0:
+                first_ms = max(first_ms, off)
+            else:
+                worst = max(worst, off)
+            if (step, data[i + 1]) in played:
+                extra += 1
+            played.add((step, data[i + 1]))
+    expected = expected_notes(engine, cycle)
+    missing = len(expected - played)
+    extra += len(played - expected)
+    starts = bytes(first if forward else last for first, last, forward, _ in ranges)
+    back = back == [starts]
+    (written, shown), played_steps, stepped_ns = frame[0]
+    leds = (
+        written >= stepped_ns
+        and frame_cells(engine, shown) == expected_cells(engine, played_steps)
+    )
+    ok = not missing and not extra and worst <= 1 and back and leds and not found
+    print(f"polymeter: lengths {lengths}, cycle {cycle} steps at {bpm} bpm")
+    print(
+        f"  notes            {len(played)} played, {len(expected)} due,"
+        f" {missing} missing, {extra} extra"
+    )
+    print(
+        f"  timing           worst {worst:.2f} ms off the grid"
+        f" (first step {first_ms:.2f} ms after start)"
+    )
+    print(f"  playheads back   {'ok' if back else 'NO'}")
+    print(f"  LED playheads    {'ok' if leds else 'DIFFER'} (after {frame_step} steps)")
+    print(f"  allocating bytecodes {sum(found.values())}")
+    for where, count in sorted(found.items()):
+        print(f"    {where} x{count}")
+    s.close()
+    ok = check_controls() and ok
+    log.set_level(log.INFO)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(a) for a in sys.argv[1:])) else 1)
@@ -1,7 +1,32 @@
+def _popcount(b):
+    n = 0
+    while b:
+        b &= b - 1
+        n += 1
+    return n
+
+
+def _reverse(b):
+    r = 0
+    for i in range(8):
+        if b & (1 << i):
+            r |= 0x80 >> i
+    return r
+
+
+# per-byte lookup tables for the bulk operations
+_bitcounts = bytes(_popcount(b) for b in range(256))
+_reversed = bytes(_reverse(b) for b in range(256))
+
+
 class bitarray(object):
     """
     A bitarray is logically an array of bool values stored
     as a bytearray
+
+    Bit i lives in byte i // 8 under mask 1 << (i % 8). Bits past
+    the end of the array in the last byte are always kept clear, so
+    the bulk operations can work on whole bytes.
     """
 
     def __init__(self, data):
@@ -10,44 +35,43 @@ class bitarray(object):
             bytecount = (data - 1) // 8 + 1
             self._bytes = bytearray(bytecount)
             self._bitscount = data
+            # optional callable(index, value) invoked whenever a
+            # single bit is changed; used to keep derived indexes
+            # (like the per-step voice masks) in sync. Bulk
+            # operations call it once with index None.
+            self.listener = None
         else:
-            # recursively call __init__
-            # to set up something with
-            # the right number of
-            # bits
+            # set up something with the right number of bits,
+            # then set the bits from the data
             self.__init__(len(data))
+            bytes = self._bytes
+            i = 0
+            for value in data:
+                if value:
+                    bytes[i >> 3] |= 1 << (i & 7)
+                i += 1
 
-            dataiter = iter(data)
-            # unroll to decode a byte at
-            # a time. When we get to the end of
-            # the enumeration, we'll skip the
-            # rest with the StopIteration exception
-            for byteindex in range(len(self._bytes)):
-                byte = 0
-                try:
-                    if next(dataiter):
-                        byte |= 0b0000_0001
-                    if next(dataiter):
-                        byte |= 0b0000_0010
-                    if next(dataiter):
-                        byte |= 0b0000_0100
-                    if next(dataiter):
-                        byte |= 0b0000_1000
-                    if next(dataiter):
-                        byte |= 0b0001_0000
-                    if next(dataiter):
-                        byte |= 0b0010_0000
-                    if next(dataiter):
-                        byte |= 0b0100_0000
-                    if next(dataiter):
-                        byte |= 0b1000_0000
-                except StopIteration:
-                    break
-                finally:
-                    # actaully assign the byte whether
-                    # we are breaking out of the loop or
-                    # not
-                    self._bytes[byteindex] = byte
+    @classmethod
+    def from_bytes(cls, data, nbits=None):
+        """
+        creates a bitarray from bytes in the save() layout; nbits
+        defaults to every bit of data
+        """
+        if nbits is None:
+            nbits = 8 * len(data)
+        result = cls(nbits)
+        result.load(data)
+        return result
+
+    @classmethod
+    def from_int(cls, value: int, nbits: int):
+        """creates a bitarray whose bit i is bit i of value"""
+        result = cls(nbits)
+        bytes = result._bytes
+        for i in range(len(bytes)):
+            bytes[i] = (value >> (8 * i)) & 0xFF
+        result._clear_tail()
+        return result
 
     def __len__(self) -> int:
         """returns the number of bools in the bitarray"""
@@ -55,47 +79,202 @@ class bitarray(object):
 
     def __repr__(self) -> str:
         """gives code which will create an equivalent bitarray"""
-        return f"bitarray(({','.join(['1' if self[i] else '0' for i in range(len(self))])}))"
+        bits = []
+        for byteindex in range(len(self._bytes)):
+            byte = self._bytes[byteindex]
+            for bit in range(min(8, self._bitscount - 8 * byteindex)):
+                bits.append("1" if byte & (1 << bit) else "0")
+        return f"bitarray(({','.join(bits)}))"
 
-    def __getindexandmask(self, index):
+    def __checkindex(self, index):
         """
-        helper function to get the index of the byte in
-        the bytearray for a given bit. It also gives the
-        bitmask to select the bit within that byte
+        helper function to check that a bit index is in range.
+        Bit index lives in byte index >> 3 under mask
+        1 << (index & 7); callers work those out themselves
+        rather than have a tuple built for every bit
         """
-        if index < 0:
-            print(f"index={index} too small")
-            raise IndexError()
-        if index >= self._bitscount:
-            print(f"index={index} too big")
-            raise IndexError()
-        byteindex = index // 8
-        bitmask = 1 << (index % 8)
-        return (byteindex, bitmask)
+        if index < 0 or index >= self._bitscount:
+            raise IndexError(index)
 
     def __getitem__(self, index: int) -> bool:
         """supports the self[index] syntax to read a bit
 
         Returns True if the bit is set; False otherwise
         """
-        byteindex, bitmask = self.__getindexandmask(index)
-        return self._bytes[byteindex] & bitmask != 0
+        self.__checkindex(index)
+        return self._bytes[index >> 3] & (1 << (index & 7)) != 0
 
     def __setitem__(self, index: int, value: bool) -> None:
         """supports the self[index] syntax to set a bit
 
         Sets the bit if the value is True; clears it otherwise.
         """
-        byteindex, bitmask = self.__getindexandmask(index)
+        self.__checkindex(index)
+        byteindex = index >> 3
+        bitmask = 1 << (index & 7)
         if value:
             self._bytes[byteindex] |= bitmask
         else:
             self._bytes[byteindex] &= ~bitmask
+        if self.listener is not None:
+            self.listener(index, bool(value))
 
     def toggle(self, index: int) -> None:
         """toggles the given bit in the array"""
-        byteindex, bitmask = self.__getindexandmask(index)
+        self.__checkindex(index)
+        byteindex = index >> 3
+        bitmask = 1 << (index & 7)
         self._bytes[byteindex] ^= bitmask
+        if self.listener is not None:
+            self.listener(index, self._bytes[byteindex] & bitmask != 0)
+
+    def _changed(self):
+        """tells the listener that any number of bits changed"""
+        if self.listener is not None:
+            self.listener(None, None)
+
+    def _clear_tail(self):
+        """clears the unused bits of the last byte"""
+        extra = 8 * len(self._bytes) - self._bitscount
+        if extra:
+            self._bytes[-1] &= 0xFF >> extra
+
+    def count(self) -> int:
+        """gives the number of bits which are set"""
+        n = 0
+        for byte in self._bytes:
+            n += _bitcounts[byte]
+        return n
+
+    def any(self) -> bool:
+        """True if any bit is set"""
+        for byte in self._bytes:
+            if byte:
+                return True
+        return False
+
+    def set_indices(self):
+        """iterates over the indexes of the bits which are set"""
+        bytes = self._bytes
+        for byteindex in range(len(bytes)):
+            byte = bytes[byteindex]
+            index = 8 * byteindex
+            while byte:
+                if byte & 1:
+                    yield index
+                byte >>= 1
+                index += 1
+
+    def clear(self) -> None:
+        """clears every bit"""
+        bytes = self._bytes
+        for i in range(len(bytes)):
+            bytes[i] = 0
+        self._changed()
+
+    def shift(self, count: int) -> None:
+        """
+        moves every bit count places towards the end (or towards
+        the start if count is negative); bits moved off the end are
+        lost and the vacated bits are cleared
+        """
+        bytes = self._bytes
+        if count >= 8 * len(bytes) or -count >= 8 * len(bytes):
+            for i in range(len(bytes)):
+                bytes[i] = 0
+        elif count > 0:
+            byteshift = count >> 3
+            bitshift = count & 7
+            for i in range(len(bytes) - 1, -1, -1):
+                j = i - byteshift
+                byte = 0
+                if j >= 0:
+                    byte = (bytes[j] << bitshift) & 0xFF
+                    if bitshift and j > 0:
+                        byte |= bytes[j - 1] >> (8 - bitshift)
+                bytes[i] = byte
+            self._clear_tail()
+        elif count < 0:
+            byteshift = -count >> 3
+            bitshift = -count & 7
+            for i in range(len(bytes)):
+                j = i + byteshift
+                byte = 0
+                if j < len(bytes):
+                    byte = bytes[j] >> bitshift
+                    if bitshift and j + 1 < len(bytes):
+                        byte |= (bytes[j + 1] << (8 - bitshift)) & 0xFF
+                bytes[i] = byte
+        self._changed()
+
+    def rotate(self, count: int) -> None:
+        """
+        moves every bit count places towards the end (or towards
+        the start if count is negative), wrapping around
+        """
+        if self._bitscount == 0:
+            return
+        count %= self._bitscount
+        if count == 0:
+            return
+        listener = self.listener
+        self.listener = None
+        wrapped = bitarray(self._bitscount)
+        wrapped._bytes[:] = self._bytes
+        wrapped.shift(count - self._bitscount)
+        self.shift(count)
+        self.__ior__(wrapped)
+        self.listener = listener
+        self._changed()
+
+    def reverse(self) -> None:
+        """reverses the order of the bits"""
+        bytes = self._bytes
+        i = 0
+        j = len(bytes) - 1
+        while i < j:
+            bytes[i], bytes[j] = _reversed[bytes[j]], _reversed[bytes[i]]
+            i += 1
+            j -= 1
+        if i == j:
+            bytes[i] = _reversed[bytes[i]]
+        # the unused bits are now at the start
+        listener = self.listener
+        self.listener = None
+        self.shift(self._bitscount - 8 * len(bytes))
+        self.listener = listener
+        self._changed()
+
+    def _check_other(self, other):
+        if not isinstance(other, bitarray) or other._bitscount != self._bitscount:
+            raise ValueError()
+
+    def __ior__(self, other):
+        """supports self |= other for a bitarray of the same length"""
+        self._check_other(other)
+        bytes = self._bytes
+        for i in range(len(bytes)):
+            bytes[i] |= other._bytes[i]
+        self._changed()
+        return self
+
+    def __iand__(self, other):
+        """supports self &= other for a bitarray of the same length"""
+        self._check_other(other)
+        bytes = self._bytes
+        for i in range(len(bytes)):
+            bytes[i] &= other._bytes[i]
+        self._changed()
+        return self
+
+    def __ixor__(self, other):
+        """supports self ^= other for a bitarray of the same length"""
+        self._check_other(other)
+        bytes = self._bytes
+        for i in range(len(bytes)):
+            bytes[i] ^= other._bytes[i]
+        self._changed()
+        return self
 
     def bytelen(self) -> int:
         """gives the number of bytes needed to store the bitarray"""
@@ -119,4 +298,9 @@ class bitarray(object):
         """
         if start + self.bytelen() > len(data):
             raise IndexError()
-        self._bytes = data[start : start + self.bytelen()]
+        # copy in place so loading doesn't allocate
+        bytes = self._bytes
+        for i in range(len(bytes)):
+            bytes[i] = data[start + i]
+        self._clear_tail()
+        self._changed()
@@ -0,0 +1,140 @@
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+
+class step_clock:
+    """
+    Tells the sequencer when each step is due.
+
+    Deadlines are absolute: the step period is kept as a whole number
+    of milliseconds plus a remainder in units of 1/(bpm * steps_per_beat)
+    ms, and the deadline of step N+1 is the deadline of step N plus the
+    period with the remainder carried. Being late for one step never
+    moves the following ones, so the clock doesn't drift however long
+    it runs, and everything stays in small ints.
+
+    swing delays every odd step by that percentage of a step. When the
+    clock ticks swing_steps pulses per (musical) step, as at MIDI clock
+    rate, it's the odd groups of swing_steps pulses which swing: the
+    first pulse of the group is delayed by that percentage of the group,
+    and the delay shrinks over the group's pulses so they keep their
+    order and the next group starts on time.
+
+    After a stall, steps which are overdue are due back to back, as
+    long as fewer than max_behind of them are; beyond that the clock
+    starts counting again from now instead of firing a burst.
+
+    ticks is the tick source (ticks_ms by default) so the clock can be
+    driven by simulated time on a host.
+    """
+
+    def __init__(
+        self,
+        bpm,
+        steps_per_beat=4,
+        swing=0,
+        ticks=ticks_ms,
+        max_behind=1,
+        swing_steps=1,
+    ):
+        self.ticks = ticks
+        self.steps_per_beat = steps_per_beat
+        self.swing_steps = swing_steps
+        self.max_behind = max_behind
+        self.swing = swing
+        self.step = 0
+        self._base = ticks()
+        self._remainder = 0
+        self.set_bpm(bpm)
+        self.reset_stats()
+        self.start()
+
+    def set_bpm(self, bpm: int) -> None:
+        """changes tempo from the next step on"""
+        self.bpm = bpm
+        self._divisor = bpm * self.steps_per_beat
+        self.period_ms = 60_000 // self._divisor
+        self._fraction = 60_000 % self._divisor
+        self._remainder = 0
+        self._set_swing_ms()
+        self._set_deadline()
+
+    def set_swing(self, swing: int) -> None:
+        """sets the delay of odd steps, in percent of a step (0-99)"""
+        self.swing = min(max(swing, 0), 99)
+        self._set_swing_ms()
+        self._set_deadline()
+
+    def _set_swing_ms(self):
+        # a percentage of the whole group of swing_steps
+        swing = 60_000 * self.swing_steps * self.swing
+        self._swing_ms = swing // (100 * self._divisor)
+
+    def start(self) -> None:
+        """restarts counting at step 0, due right away"""
+        self.step = 0
+        self._base = self.ticks()
+        self._remainder = 0
+        self._set_deadline()
+
+    def due(self) -> bool:
+        """
+        returns True (once) when the next step's deadline has passed,
+        recording how late the call was
+        """
+        now = self.ticks()
+        late = ticks_diff(now, self.deadline)
+        if late < 0:
+            return False
+
+        self.last_late = late
+        self.late_count += 1
+        self.late_total += late
+        if late > self.late_max:
+            self.late_max = late
+
+        previous = self.deadline
+        self.step += 1
+        self._base = ticks_add(self._base, self.period_ms)
+        self._remainder += self._fraction
+        if self._remainder >= self._divisor:
+            self._remainder -= self._divisor
+            self._base = ticks_add(self._base, 1)
+        self._set_deadline()
+        if ticks_diff(self.deadline, previous) < 0:
+            # near full swing the shrinking delay can round a pulse to
+            # a ms before the one it follows
+            self.deadline = previous
+        if ticks_diff(now, self.deadline) >= (self.max_behind - 1) * self.period_ms:
+            # stalled for more than max_behind steps; start counting
+            # again from now rather than firing a burst of catch-up steps
+            self._base = ticks_add(now, self.period_ms)
+            self._remainder = 0
+            self.resyncs += 1
+            self._set_deadline()
+        return True
+
+    def ms_until_due(self) -> int:
+        """gives the time until the next step is due (0 if overdue)"""
+        return max(ticks_diff(self.deadline, self.ticks()), 0)
+
+    def reset_stats(self) -> None:
+        # lateness of the most recent step, in ms
+        self.last_late = 0
+        self.late_count = 0
+        self.late_total = 0
+        self.late_max = 0
+        self.resyncs = 0
+
+    def late_mean(self) -> float:
+        """mean lateness of the steps so far, in ms"""
+        if self.late_count == 0:
+            return 0
+        return self.late_total / self.late_count
+
+    def _set_deadline(self):
+        steps = self.swing_steps
+        if (self.step // steps) & 1:
+            left = steps - self.step % steps
+            self.deadline = ticks_add(self._base, self._swing_ms * left // steps)
+        else:
+            self.deadline = self._base
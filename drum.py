@@ -0,0 +1,10 @@
+class drum:
+    def __init__(self, name, note, sequence, gate_ms=50):
+        self.name = name
+        self.note = note
+        self.sequence = sequence
+        # time between note-on and note-off; 0 sends them together
+        self.gate_ms = gate_ms
+
+    def __repr__(self):
+        return f"drum({repr(self.name)},{repr(self.note)},{repr(self.sequence)},{repr(self.gate_ms)})"
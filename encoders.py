@@ -0,0 +1,99 @@
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+
+class encoder_service:
+    """
+    Polls seesaw rotary encoders at a fixed rate and accumulates their
+    movement, so the rest of the firmware reads deltas from memory
+    instead of doing I2C reads of its own.
+
+    Each poll reads the seesaw delta register (one transaction per
+    encoder, and it resets the count so no position bookkeeping is
+    needed). Encoders are grouped by seesaw so a device's reads go out
+    back to back. When a device's INT pin is wired up, pass it as
+    interrupt: the device is only read while it asserts the pin (low),
+    so idle knobs cost no bus time at all.
+
+    Every read is counted; transactions_per_second() reports the rate.
+    Give it a profiler histogram as timing and each device's reads are
+    timed as well.
+    """
+
+    def __init__(self, poll_ms=20, ticks=ticks_ms):
+        self.poll_ms = poll_ms
+        self.ticks = ticks
+        self.devices = []
+        self.interrupts = []
+        # per device: list of (encoder number, index into deltas)
+        self.encoders = []
+        self.deltas = []
+        self.transactions = 0
+        self._next_poll = ticks()
+        self._window_start = self._next_poll
+        self._window_transactions = 0
+        self.timing = None
+
+    def add(self, seesaw, encoder=0, interrupt=None) -> int:
+        """
+        starts polling an encoder of a seesaw; returns the index to
+        pass to take()
+        """
+        if seesaw in self.devices:
+            device = self.devices.index(seesaw)
+        else:
+            device = len(self.devices)
+            self.devices.append(seesaw)
+            self.interrupts.append(interrupt)
+            self.encoders.append([])
+        if interrupt is not None:
+            seesaw.enable_encoder_interrupt(encoder)
+            self.transactions += 1
+        index = len(self.deltas)
+        self.deltas.append(0)
+        self.encoders[device].append((encoder, index))
+        return index
+
+    def due(self) -> bool:
+        """True once per poll period"""
+        now = self.ticks()
+        if ticks_diff(now, self._next_poll) < 0:
+            return False
+        self._next_poll = ticks_add(now, self.poll_ms)
+        return True
+
+    def poll_device(self, device: int) -> None:
+        """reads the deltas of one seesaw's encoders"""
+        interrupt = self.interrupts[device]
+        if interrupt is not None and interrupt.value:
+            return
+        seesaw = self.devices[device]
+        timing = self.timing
+        if timing is not None:
+            timing.start()
+        for encoder, index in self.encoders[device]:
+            self.deltas[index] += seesaw.encoder_delta(encoder)
+            self.transactions += 1
+        if timing is not None:
+            timing.stop()
+
+    def poll(self) -> None:
+        """reads every device"""
+        for device in range(len(self.devices)):
+            self.poll_device(device)
+
+    def take(self, index: int) -> int:
+        """gives the movement since the last take() and clears it"""
+        delta = self.deltas[index]
+        self.deltas[index] = 0
+        return delta
+
+    def transactions_per_second(self) -> float:
+        """I2C reads per second since the last call"""
+        now = self.ticks()
+        elapsed = ticks_diff(now, self._window_start)
+        count = self.transactions - self._window_transactions
+        self._window_start = now
+        self._window_transactions = self.transactions
+        if elapsed <= 0:
+            return 0
+        return count * 1000 / elapsed
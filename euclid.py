@@ -0,0 +1,67 @@
+from array import array
+
+
+class euclid:
+    """
+    Euclidean rhythms: k hits spread as evenly as they go over a cycle
+    of n steps, rotated later by rotation steps, the cycle repeating
+    over a sequence of steps steps.
+
+    Each rhythm is laid out once, in the bitarray.save() layout, in a
+    slot of one bytearray; after that fill() is a bitarray.load() from
+    the slot. Slots are found through a dict keyed by (k, n, rotation)
+    packed into one small int. Once every slot is used the oldest is
+    laid out again for the next new rhythm, so the table never grows.
+    """
+
+    def __init__(self, steps, slots=64):
+        self.steps = steps
+        self.slot_bytes = (steps - 1) // 8 + 1
+        self.slots = slots
+        self.table = bytearray(slots * self.slot_bytes)
+        # key of the rhythm held in each slot (-1 when empty)
+        self.keys = array("l", [-1] * slots)
+        self.index = {}
+        self.next_slot = 0
+        self.misses = 0
+
+    def offset(self, k: int, n: int, rotation: int) -> int:
+        """where in table the rhythm is, laying it out if it isn't"""
+        key = (n << 16) | (k << 8) | rotation
+        slot = self.index.get(key, -1)
+        if slot < 0:
+            slot = self.next_slot
+            self.next_slot = (slot + 1) % self.slots
+            old = self.keys[slot]
+            if old >= 0:
+                del self.index[old]
+            self.keys[slot] = key
+            self.index[key] = slot
+            self._lay_out(slot * self.slot_bytes, k, n, rotation)
+            self.misses += 1
+        return slot * self.slot_bytes
+
+    def _lay_out(self, start, k, n, rotation):
+        table = self.table
+        for i in range(self.slot_bytes):
+            table[start + i] = 0
+        for step in range(self.steps):
+            # step i of the cycle is a hit when i * k wraps past n
+            if ((step - rotation) % n) * k % n < k:
+                table[start + (step >> 3)] |= 1 << (step & 7)
+
+    def fill(self, sequence, k: int, n: int, rotation: int = 0) -> None:
+        """
+        sets sequence (a bitarray of steps bits) to the rhythm; n is
+        kept to 1..steps, k to 0..n and rotation to within the cycle
+        """
+        n = min(max(n, 1), self.steps)
+        k = min(max(k, 0), n)
+        sequence.load(self.table, self.offset(k, n, rotation % n))
+
+
+def vary(sequence, dice, percent: int) -> None:
+    """flips each step of sequence with the given chance"""
+    for step in range(len(sequence)):
+        if dice.chance(percent):
+            sequence.toggle(step)
@@ -0,0 +1,78 @@
+from array import array
+from pattern import pattern
+
+# the LED of each column within a group of 8 on this board: each
+# TLC5916's outputs are wired with the two halves swapped
+board_led_columns = (4, 5, 6, 7, 0, 1, 2, 3)
+
+
+class geometry:
+    """
+    The shape of the patterns and of the grid of keys and LEDs they are
+    edited on.
+
+    Patterns are voices x steps; the grid is rows x columns, voice 0 on
+    the bottom row. Patterns bigger than the grid are paged onto it:
+    page n shows the steps from (n % step_pages) * columns and the
+    voices from (n // step_pages) * rows.
+
+    The mappings between keys, LEDs and grid cells are worked out here
+    once, so the key and LED paths only look them up.
+    """
+
+    # a voice per bit of the pattern's step masks
+    max_voices = pattern.max_voices
+
+    def __init__(
+        self, voices=5, steps=8, rows=5, columns=8, patterns=16, led_columns=None
+    ):
+        if voices < 1 or voices > geometry.max_voices:
+            raise ValueError()
+        if steps < 1 or steps > 255 or patterns < 1 or patterns > 255:
+            raise ValueError()
+        self.voices = voices
+        self.steps = steps
+        self.rows = rows
+        self.columns = columns
+        self.patterns = patterns
+        self.step_pages = (steps + columns - 1) // columns
+        self.voice_pages = (voices + rows - 1) // rows
+        self.pages = self.step_pages * self.voice_pages
+        # keys and LEDs, one of each per grid cell, counted row by row
+        self.cells = rows * columns
+        # bytes of LED frame, one per TLC5916
+        self.led_bytes = (self.cells + 7) // 8
+
+        if led_columns is None:
+            led_columns = [
+                (column & ~7) + board_led_columns[column & 7]
+                if column | 7 < columns
+                else column
+                for column in range(columns)
+            ]
+        if len(led_columns) != columns:
+            raise ValueError()
+        # shift register bit of each cell's LED
+        self.cell_leds = array("H", [0] * self.cells)
+        # row and column of each key
+        self.key_rows = bytearray(self.cells)
+        self.key_columns = bytearray(self.cells)
+        for cell in range(self.cells):
+            row = cell // columns
+            column = cell % columns
+            self.cell_leds[cell] = (rows - 1 - row) * columns + led_columns[column]
+            self.key_rows[cell] = row
+            self.key_columns[cell] = column
+
+    def page_origin(self, page: int):
+        """gives the first voice and first step shown on a page"""
+        return (
+            (page // self.step_pages) * self.rows,
+            (page % self.step_pages) * self.columns,
+        )
+
+    def __repr__(self):
+        return (
+            f"geometry({self.voices},{self.steps},{self.rows},"
+            f"{self.columns},{self.patterns})"
+        )
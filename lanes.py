@@ -0,0 +1,86 @@
+import struct
+
+# the lanes; indexes into lanes.values
+VELOCITY = 0
+PROBABILITY = 1  # percent
+RATCHET = 2  # hits per step
+OFFSET = 3  # clock pulses late
+
+# format of each saved lane:
+# < -- little-endian
+# B -- pattern number
+# B -- lane
+# then a byte per voice and step, voice by voice
+_record_format = "<BB"
+_record_header_size = struct.calcsize(_record_format)
+
+
+class lanes:
+    """
+    Per-step parameters of one pattern's hits: velocity, probability,
+    ratchet count and micro-timing offset.
+
+    Each lane is a bytearray with a byte per voice and step, made the
+    first time one of its steps is given a value other than the
+    default; until then the lane is None and get() gives the default.
+    Only steps whose bit is set are ever looked up.
+    """
+
+    count = 4
+    defaults = (120, 100, 1, 0)
+
+    def __init__(self, voices, steps):
+        self.voices = voices
+        self.steps = steps
+        self.values = [None] * lanes.count
+
+    def get(self, lane: int, voice: int, step: int) -> int:
+        values = self.values[lane]
+        if values is None:
+            return lanes.defaults[lane]
+        return values[voice * self.steps + step]
+
+    def set(self, lane: int, voice: int, step: int, value: int) -> None:
+        values = self.values[lane]
+        if values is None:
+            if value == lanes.defaults[lane]:
+                return
+            values = bytearray([lanes.defaults[lane]]) * (self.voices * self.steps)
+            self.values[lane] = values
+        values[voice * self.steps + step] = value
+
+    def present(self) -> int:
+        """gives the number of lanes holding values"""
+        return sum(1 for values in self.values if values is not None)
+
+    def record_size(self) -> int:
+        """gives the bytes save() takes per lane"""
+        return _record_header_size + self.voices * self.steps
+
+    def save(self, number: int, data: bytearray, start: int = 0) -> int:
+        """stores the lanes holding values in data; returns the bytes used"""
+        size = self.voices * self.steps
+        used = 0
+        for lane in range(lanes.count):
+            values = self.values[lane]
+            if values is None:
+                continue
+            struct.pack_into(_record_format, data, start + used, number, lane)
+            used += _record_header_size
+            data[start + used : start + used + size] = values
+            used += size
+        return used
+
+    def load(self, lane: int, data: bytearray, start: int = 0) -> None:
+        """restores a lane from the values of a record (see read_record)"""
+        size = self.voices * self.steps
+        self.values[lane] = bytearray(data[start : start + size])
+
+
+def read_record(data, start=0):
+    """
+    gives the pattern number and lane of the record at start, and
+    where its values begin
+    """
+    number, lane = struct.unpack_from(_record_format, data, start)
+    return number, lane, start + _record_header_size
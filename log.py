@@ -0,0 +1,63 @@
+"""
+Logging with levels, costing nothing for levels which are off.
+
+    import log
+    log.debug("key pressed:", i)
+
+debug(), info(), warning() and error() are rebound by set_level():
+a level which is on prints its arguments, one which is off is a
+function that does nothing. Pass the values as arguments instead of
+formatting them first (no f-strings or concatenation) so a call at a
+level which is off allocates nothing, and call them as log.debug(...)
+rather than importing the functions, so set_level() takes effect.
+"""
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 50
+
+level = INFO
+
+# marks the arguments which weren't given
+_unset = object()
+
+
+def _off(message, a=_unset, b=_unset, c=_unset, d=_unset):
+    pass
+
+
+def _printer(prefix):
+    def emit(message, a=_unset, b=_unset, c=_unset, d=_unset):
+        print(prefix, message, end="")
+        for value in (a, b, c, d):
+            if value is not _unset:
+                print("", value, end="")
+        print()
+
+    return emit
+
+
+_debug = _printer("D")
+_info = _printer("I")
+_warning = _printer("W")
+_error = _printer("E")
+
+
+def set_level(new_level: int) -> None:
+    """turns on the given level and the ones above it"""
+    global level, debug, info, warning, error
+    level = new_level
+    debug = _debug if level <= DEBUG else _off
+    info = _info if level <= INFO else _off
+    warning = _warning if level <= WARNING else _off
+    error = _error if level <= ERROR else _off
+
+
+def enabled(check_level: int) -> bool:
+    """True if messages at check_level are printed"""
+    return level <= check_level
+
+
+set_level(level)
@@ -0,0 +1,95 @@
+# format of saved ranges:
+# B -- number of voices
+# then a B first step, B last step and B direction (1 forwards) per voice
+
+
+class meter:
+    """
+    Per-voice ranges and directions (polymeter): each voice loops over
+    its own first..last steps, forwards or backwards, all moved on by
+    the one step clock.
+
+    Everything is kept in bytearrays indexed by voice rather than in a
+    stepper per voice, so advance() is one pass over the voices and
+    nothing is allocated. played holds the step each voice played last,
+    for the ratchet and late hits which come after it.
+    """
+
+    def __init__(self, voices, steps):
+        self.voices = voices
+        self.steps = steps
+        self.first = bytearray(voices)
+        self.last = bytearray([steps - 1] * voices)
+        self.forward = bytearray([1] * voices)
+        self.position = bytearray(voices)
+        self.played = bytearray(voices)
+
+    def set_range(self, voice: int, first: int, last: int, forward=True) -> None:
+        """sets a voice's range; it starts again from its first step"""
+        first = min(max(first, 0), self.steps - 1)
+        last = min(max(last, first), self.steps - 1)
+        self.first[voice] = first
+        self.last[voice] = last
+        self.forward[voice] = 1 if forward else 0
+        self.position[voice] = first if forward else last
+
+    def clear(self) -> None:
+        """gives every voice the whole pattern, forwards"""
+        for voice in range(self.voices):
+            self.set_range(voice, 0, self.steps - 1)
+
+    def size(self) -> int:
+        """gives the number of bytes save() needs"""
+        return 1 + 3 * self.voices
+
+    def save(self, data: bytearray, start: int = 0) -> None:
+        if start + self.size() > len(data):
+            raise IndexError()
+        data[start] = self.voices
+        for voice in range(self.voices):
+            offset = start + 1 + 3 * voice
+            data[offset] = self.first[voice]
+            data[offset + 1] = self.last[voice]
+            data[offset + 2] = self.forward[voice]
+
+    def load(self, data, start: int = 0) -> bool:
+        """
+        restores the ranges from data; returns False (with every voice
+        given the whole pattern) if they aren't ranges of this shape
+        """
+        self.clear()
+        if start + self.size() > len(data) or data[start] != self.voices:
+            return False
+        for voice in range(self.voices):
+            offset = start + 1 + 3 * voice
+            first = data[offset]
+            last = data[offset + 1]
+            if first > last or last >= self.steps or data[offset + 2] > 1:
+                self.clear()
+                return False
+            self.set_range(voice, first, last, data[offset + 2])
+        return True
+
+    def length(self, voice: int) -> int:
+        return self.last[voice] - self.first[voice] + 1
+
+    def reset(self) -> None:
+        """puts every voice back on the step its range starts on"""
+        for voice in range(self.voices):
+            if self.forward[voice]:
+                self.position[voice] = self.first[voice]
+            else:
+                self.position[voice] = self.last[voice]
+
+    def advance(self) -> None:
+        """moves every voice on one step, each wrapping in its range"""
+        position = self.position
+        first = self.first
+        last = self.last
+        forward = self.forward
+        for voice in range(self.voices):
+            step = position[voice]
+            if forward[voice]:
+                position[voice] = step + 1 if step < last[voice] else first[voice]
+            else:
+                position[voice] = step - 1 if step > first[voice] else last[voice]
@@ -0,0 +1,146 @@
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# MIDI real-time and system common messages used for sync
+CLOCK = 0xF8
+START = 0xFA
+CONTINUE = 0xFB
+STOP = 0xFC
+SONG_POSITION = 0xF2
+# channel messages, passed on only with notes on
+NOTE_ON = 0x90
+
+# clock pulses per quarter note
+PPQN = 24
+
+
+class midi_clock_in:
+    """
+    Follows the MIDI clock arriving on an input port.
+
+    poll() reads whatever has arrived into a preallocated buffer,
+    without blocking, and passes every clock, start, continue, stop and
+    song position message to listener(message, value) in the order
+    received; value is the song position (in 16th notes) for
+    SONG_POSITION and 0 otherwise. Other messages are skipped.
+    Real-time bytes may arrive in the middle of other messages, as the
+    MIDI spec allows. Nothing is allocated after construction.
+
+    With notes set, note-ons on any channel (running status included)
+    go to the listener too, as NOTE_ON with the note in the low 7 bits
+    of value and the velocity above; a velocity of 0 is a note-off and
+    isn't passed on.
+
+    Input comes in bursts (several USB packets per read), so the time
+    of single pulses means little; the tempo is taken from how long
+    whole beats of pulses took and smoothed over the last few beats.
+    """
+
+    def __init__(
+        self, port, listener, buffer_size=64, timeout_ms=1000, ticks=ticks_ms, notes=False
+    ):
+        self.port = port
+        self.listener = listener
+        self.notes = notes
+        self.buffer = bytearray(buffer_size)
+        self.timeout_ms = timeout_ms
+        self.ticks = ticks
+        # bytes taken from the port so far
+        self.bytes_read = 0
+        # status of the message whose data bytes are arriving, and the
+        # first data byte of a song position or note
+        self._status = 0
+        self._data = -1
+        # the pulses received and when they started to be counted
+        self._window_start = 0
+        self._window_pulses = -1
+        # when the last clock or transport message arrived, or None
+        self.last_message = None
+        # smoothed ms per beat, times 16; 0 until known
+        self.beat_ms16 = 0
+
+    def poll(self) -> int:
+        """
+        handles everything which has arrived; returns the number of
+        clock pulses among it
+        """
+        buffer = self.buffer
+        listener = self.listener
+        pulses = 0
+        transport = False
+        while True:
+            count = self.port.readinto(buffer)
+            if not count:
+                break
+            self.bytes_read += count
+            for i in range(count):
+                byte = buffer[i]
+                if byte >= 0xF8:
+                    # real-time: single byte, may interrupt anything
+                    if byte == CLOCK:
+                        pulses += 1
+                        listener(CLOCK, 0)
+                    elif byte == START or byte == CONTINUE or byte == STOP:
+                        transport = True
+                        listener(byte, 0)
+                elif byte >= 0x80:
+                    self._status = byte
+                    self._data = -1
+                elif self._status == SONG_POSITION:
+                    if self._data < 0:
+                        self._data = byte
+                    else:
+                        self._status = 0
+                        listener(SONG_POSITION, self._data | (byte << 7))
+                elif self._status & 0xF0 == NOTE_ON and self.notes:
+                    if self._data < 0:
+                        self._data = byte
+                    else:
+                        # running status: the next pair needs no status
+                        if byte:
+                            listener(NOTE_ON, self._data | (byte << 7))
+                        self._data = -1
+            if count < len(buffer):
+                break
+        if pulses or transport:
+            # a start counts as following even before its first pulse
+            self.last_message = self.ticks()
+        if pulses:
+            self._count_pulses(pulses)
+        return pulses
+
+    def _count_pulses(self, pulses):
+        now = self.last_message
+        if self._window_pulses < 0:
+            # the window starts with the pulses of this poll
+            self._window_start = now
+            self._window_pulses = 0
+            return
+        self._window_pulses += pulses
+        if self._window_pulses < PPQN:
+            return
+        sample16 = ticks_diff(now, self._window_start) * PPQN * 16 // self._window_pulses
+        if self.beat_ms16 == 0:
+            self.beat_ms16 = sample16
+        else:
+            # exponential average; each beat moves it a quarter of the way
+            self.beat_ms16 += (sample16 - self.beat_ms16) // 4
+        self._window_start = now
+        self._window_pulses = 0
+
+    def following(self) -> bool:
+        """True while clock (or transport) messages keep arriving"""
+        if self.last_message is None:
+            return False
+        if ticks_diff(self.ticks(), self.last_message) < self.timeout_ms:
+            return True
+        # gone quiet: measure afresh when the clock comes back
+        self.last_message = None
+        self._window_pulses = -1
+        self.beat_ms16 = 0
+        return False
+
+    def bpm(self) -> int:
+        """the tempo of the incoming clock, or 0 if not known yet"""
+        if self.beat_ms16 <= 0:
+            return 0
+        return (60_000 * 16 + self.beat_ms16 // 2) // self.beat_ms16
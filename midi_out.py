@@ -0,0 +1,75 @@
+class midi_out:
+    """
+    Collects the MIDI messages of one step in a reusable buffer and
+    sends them to the port with a single write.
+
+    Nothing is allocated after construction: status bytes are built
+    once per channel and flush() writes through a preallocated
+    memoryview of the filled part of the buffer.
+
+    With running_status, consecutive messages with the same status
+    byte omit it and note-offs are sent as note-on with velocity 0,
+    so a step's offs and ons share one status. That saves bytes on
+    serial MIDI; USB MIDI packs every message into its own 4-byte
+    event packet, so it gains nothing there.
+    """
+
+    def __init__(self, port, max_events=16, running_status=True):
+        self.port = port
+        self.running_status = running_status
+        self.buffer = bytearray(3 * max_events)
+        self.length = 0
+        self._status = 0
+        view = memoryview(self.buffer)
+        self._views = [view[0:n] for n in range(len(self.buffer) + 1)]
+        self._note_on = bytes(0x90 | c for c in range(16))
+        self._note_off = bytes(0x80 | c for c in range(16))
+        # optional profiler histogram (see profiler) timing each write
+        self.timing = None
+
+    def _add(self, status, data1, data2):
+        if self.length + 3 > len(self.buffer):
+            self.flush()
+        buffer = self.buffer
+        i = self.length
+        if status != self._status:
+            buffer[i] = status
+            i += 1
+            if self.running_status:
+                self._status = status
+        buffer[i] = data1
+        buffer[i + 1] = data2
+        self.length = i + 2
+
+    def note_on(self, channel: int, note: int, velocity: int) -> None:
+        """queues a note-on; channel is 1-16"""
+        self._add(self._note_on[channel - 1], note, velocity)
+
+    def note_off(self, channel: int, note: int) -> None:
+        """queues a note-off; channel is 1-16"""
+        if self.running_status:
+            self._add(self._note_on[channel - 1], note, 0)
+        else:
+            self._add(self._note_off[channel - 1], note, 0)
+
+    def realtime(self, status: int) -> None:
+        """
+        queues a single-byte real-time message (e.g. 0xF8 clock);
+        these don't cancel running status
+        """
+        if self.length + 1 > len(self.buffer):
+            self.flush()
+        self.buffer[self.length] = status
+        self.length += 1
+
+    def flush(self) -> None:
+        """writes all queued messages to the port in one write"""
+        if self.length:
+            timing = self.timing
+            if timing is not None:
+                timing.start()
+            self.port.write(self._views[self.length])
+            if timing is not None:
+                timing.stop()
+            self.length = 0
+            self._status = 0
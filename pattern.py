@@ -0,0 +1,81 @@
+from array import array
+
+
+def _lowest(byte):
+    for bit in range(8):
+        if byte & (1 << bit):
+            return bit
+    return 0
+
+
+# index of the lowest set bit of each byte value; with it a step mask's
+# voices can be walked in one pass per voice that fires
+lowest_bit = bytes(_lowest(b) for b in range(256))
+
+
+class pattern:
+    """
+    A pattern is the set of per-voice bitarrays plus a column-major
+    index of them: for every step, a mask with bit v set when voice v
+    fires on that step.
+
+    The index is kept in sync through the bitarray listener hook:
+    single-bit changes (toggle/__setitem__) update one mask, bulk
+    changes (load, shift, ...) re-index that voice's column.
+    """
+
+    # a step mask has a bit per voice, and must stay a small int (30
+    # bits on CircuitPython) so the playback tick allocates nothing
+    max_voices = 30
+
+    def __init__(self, sequences):
+        if len(sequences) > pattern.max_voices:
+            raise ValueError()
+        self.sequences = sequences
+        self.num_steps = len(sequences[0]) if sequences else 0
+        self.step_masks = array("L", [0] * self.num_steps)
+        # per-step parameters (see lanes), or None while there are none
+        self.lanes = None
+        for voice in range(len(sequences)):
+            sequences[voice].listener = self._make_listener(voice)
+        self.reindex()
+
+    def _make_listener(self, voice):
+        bit = 1 << voice
+        masks = self.step_masks
+
+        def changed(step, value):
+            if step is None:
+                self._reindex_voice(voice)
+            elif value:
+                masks[step] |= bit
+            else:
+                masks[step] &= ~bit
+
+        return changed
+
+    def _reindex_voice(self, voice):
+        masks = self.step_masks
+        seq = self.sequences[voice]
+        bit = 1 << voice
+        # one indexed pass: walking set_indices() would make a generator
+        for step in range(self.num_steps):
+            if seq[step]:
+                masks[step] |= bit
+            else:
+                masks[step] &= ~bit
+
+    def reindex(self) -> None:
+        """rebuilds every step mask from the voice bitarrays"""
+        masks = self.step_masks
+        for step in range(self.num_steps):
+            masks[step] = 0
+        for voice in range(len(self.sequences)):
+            bit = 1 << voice
+            for step in self.sequences[voice].set_indices():
+                if step < self.num_steps:
+                    masks[step] |= bit
+
+    def step_mask(self, step: int) -> int:
+        """gives the mask of voices which fire on the given step"""
+        return self.step_masks[step]
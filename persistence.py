@@ -0,0 +1,109 @@
+import struct
+from binascii import crc32
+
+# format of each slot's header:
+# < -- little-endian
+# H -- sequence number; the valid slot with the newest one wins
+# H -- length of the payload which follows the header
+# I -- CRC32 of the sequence number, length and payload
+_slot_format = "<HHI"
+_slot_header_size = struct.calcsize(_slot_format)
+
+
+def _newer(a, b):
+    # sequence numbers wrap; a is newer if it is ahead by less than half
+    return 0 < (a - b) & 0xFFFF < 0x8000
+
+
+class nvm_store:
+    """
+    Keeps a byte payload in NVM in two alternating slots.
+
+    save() skips the write when the payload matches what was last
+    saved. Otherwise it writes the slot not holding the current state
+    in one write: the slot header (sequence number + CRC) and the
+    payload up to the last byte which differs from what that slot
+    already contains. A write cut short by power loss leaves that slot
+    failing its CRC, so load() falls back to the other one.
+
+    On the RP2040 all of NVM is a single flash sector, and every write
+    erases and rewrites the whole sector, so a save costs one erase
+    however few bytes it carries; hence the one write per save, and
+    none for a payload which hasn't changed.
+    """
+
+    def __init__(self, nvm, offset=0, slot_size=None):
+        if slot_size is None:
+            slot_size = (len(nvm) - offset) // 2
+        if offset + 2 * slot_size > len(nvm) or slot_size <= _slot_header_size:
+            raise ValueError()
+        self.nvm = nvm
+        self.slot_size = slot_size
+        self.capacity = slot_size - _slot_header_size
+        self._slots = (offset, offset + slot_size)
+        self._current = None
+        self._sequence = 0
+        self._saved = None
+        self.bytes_written = 0
+        self.saves_skipped = 0
+
+    def _read_slot(self, slot):
+        start = self._slots[slot]
+        header = self.nvm[start : start + _slot_header_size]
+        sequence, length, crc = struct.unpack_from(_slot_format, header)
+        if length > self.capacity:
+            return None
+        payload = self.nvm[
+            start + _slot_header_size : start + _slot_header_size + length
+        ]
+        if crc32(payload, crc32(header[0:4])) != crc:
+            return None
+        return sequence, payload
+
+    def load(self):
+        """gives the newest valid payload, or None if neither slot is valid"""
+        best = None
+        for slot in (0, 1):
+            found = self._read_slot(slot)
+            if found is not None and (best is None or _newer(found[0], best[0])):
+                best = found
+                self._current = slot
+        if best is None:
+            self._current = None
+            return None
+        self._sequence = best[0]
+        self._saved = bytes(best[1])
+        return self._saved
+
+    def save(self, payload) -> bool:
+        """
+        stores the payload unless it is unchanged; returns True if
+        anything was written
+        """
+        if len(payload) > self.capacity:
+            raise IndexError()
+        if self._saved is not None and self._saved == payload:
+            self.saves_skipped += 1
+            return False
+
+        slot = 1 if self._current == 0 else 0
+        slot_start = self._slots[slot]
+        start = slot_start + _slot_header_size
+        old = self.nvm[start : start + len(payload)]
+        last = len(payload)
+        while last > 0 and old[last - 1] == payload[last - 1]:
+            last -= 1
+
+        sequence = (self._sequence + 1) & 0xFFFF
+        data = bytearray(_slot_header_size + last)
+        struct.pack_into(_slot_format, data, 0, sequence, len(payload), 0)
+        crc = crc32(payload, crc32(data[0:4]))
+        struct.pack_into(_slot_format, data, 0, sequence, len(payload), crc)
+        data[_slot_header_size:] = payload[:last]
+        self.nvm[slot_start : start + last] = data
+        self.bytes_written += len(data)
+
+        self._current = slot
+        self._sequence = sequence
+        self._saved = bytes(payload)
+        return True
@@ -0,0 +1,28 @@
+class prng:
+    """
+    A 16 bit xorshift generator: fast, repeatable from its seed, and
+    every value it works with stays a small int, so it allocates
+    nothing on CircuitPython (unlike random, whose state is bigger).
+    """
+
+    def __init__(self, seed=0xACE1):
+        self.seed(seed)
+
+    def seed(self, seed: int) -> None:
+        # xorshift never leaves 0
+        self.state = (seed & 0xFFFF) or 0xACE1
+
+    def next(self) -> int:
+        """gives the next value, 1..65535"""
+        x = self.state
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        self.state = x
+        return x
+
+    def chance(self, percent: int) -> bool:
+        """True percent times out of 100"""
+        if percent >= 100:
+            return True
+        return (self.next() * 100) >> 16 < percent
@@ -0,0 +1,101 @@
+from array import array
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# upper bound (ms) of each bucket; the last bucket takes the rest
+_bounds = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class histogram:
+    """
+    Counts durations in ms into fixed buckets (0, 1, 2, 3-4, 5-8, ...,
+    over 64), keeping the count, total and maximum as well. Recording
+    allocates nothing.
+
+    Durations come from add(), from start()/stop() around the code
+    being timed, or from lap(), which records the time since the
+    previous lap. ticks_ms is the only timer CircuitPython has which
+    doesn't allocate, so everything is in whole ms; a sub-ms operation
+    counts in the 0 bucket, and its count still says how often it ran.
+    """
+
+    def __init__(self, name, ticks=ticks_ms):
+        self.name = name
+        self.ticks = ticks
+        self.buckets = array("L", [0] * (len(_bounds) + 1))
+        self._started = None
+        self.reset()
+
+    def reset(self) -> None:
+        for i in range(len(self.buckets)):
+            self.buckets[i] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lap = None
+
+    def add(self, ms: int) -> None:
+        bucket = 0
+        while bucket < len(_bounds) and ms > _bounds[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def start(self) -> None:
+        self._started = self.ticks()
+
+    def stop(self) -> None:
+        self.add(ticks_diff(self.ticks(), self._started))
+
+    def lap(self) -> None:
+        now = self.ticks()
+        if self._lap is not None:
+            self.add(ticks_diff(now, self._lap))
+        self._lap = now
+
+    def dump(self) -> None:
+        mean = self.total / self.count if self.count else 0
+        line = f"{self.name:12} n={self.count:6} mean {mean:6.2f} max {self.max:4} ms "
+        for i in range(len(_bounds)):
+            line += f" {_bounds[i]}:{self.buckets[i]}"
+        print(line, f">{_bounds[-1]}:{self.buckets[-1]}")
+
+
+class profiler:
+    """
+    The histograms the firmware records as it runs: how late each step
+    played, the period of the input loop (which stretches when another
+    task holds the CPU), and the time taken by MIDI writes, LED driver
+    writes, I2C encoder reads, display writes and NVM saves.
+
+    The I/O objects record into theirs through their timing attribute.
+    """
+
+    def __init__(self, ticks=ticks_ms):
+        self.lateness = histogram("step late", ticks)
+        self.loop = histogram("loop period", ticks)
+        self.midi = histogram("midi write", ticks)
+        self.leds = histogram("led write", ticks)
+        self.i2c = histogram("i2c read", ticks)
+        self.display = histogram("display", ticks)
+        self.nvm = histogram("nvm save", ticks)
+        self.histograms = (
+            self.lateness,
+            self.loop,
+            self.midi,
+            self.leds,
+            self.i2c,
+            self.display,
+            self.nvm,
+        )
+
+    def reset(self) -> None:
+        for h in self.histograms:
+            h.reset()
+
+    def dump(self) -> None:
+        print("profile (ms):")
+        for h in self.histograms:
+            h.dump()
@@ -0,0 +1,114 @@
+from array import array
+from adafruit_ticks import ticks_add, ticks_diff
+
+_EMPTY = 0xFF
+
+
+class note_scheduler:
+    """
+    Holds pending note-offs in a preallocated ring buffer and hands
+    them to a midi_out once they are due, so notes get a real gate
+    length and the offs are spread across the step interval instead
+    of being sent in the same burst as the ons.
+
+    Times are ticks_ms values. Gates of different lengths can finish
+    out of order, so drain() looks at every pending entry and the head
+    of the ring only moves past entries which have been sent.
+    Nothing is allocated after construction.
+    """
+
+    def __init__(self, out, size=32):
+        self.out = out
+        self.size = size
+        self.due = array("L", [0] * size)
+        self.channels = bytearray(size)
+        self.notes = bytearray([_EMPTY] * size)
+        self.head = 0
+        self.count = 0
+
+    def note_off_after(self, now: int, gate_ms: int, channel: int, note: int) -> None:
+        """
+        queues a note-off for gate_ms after now; a note-off still
+        pending for the same note is sent right away so it can't cut
+        the new note short
+        """
+        self._release(channel, note)
+        if gate_ms <= 0:
+            self.out.note_off(channel, note)
+            return
+        if self.count == self.size:
+            # full: end the oldest note early rather than lose it
+            self._send(self.head)
+            self._advance()
+        i = (self.head + self.count) % self.size
+        self.due[i] = ticks_add(now, gate_ms)
+        self.channels[i] = channel
+        self.notes[i] = note
+        self.count += 1
+
+    def drain(self, now: int) -> int:
+        """
+        queues every note-off which is due on the midi_out; returns
+        how many were queued. The caller flushes the midi_out.
+        """
+        sent = 0
+        i = self.head
+        for _ in range(self.count):
+            if self.notes[i] != _EMPTY and ticks_diff(now, self.due[i]) >= 0:
+                self._send(i)
+                sent += 1
+            i += 1
+            if i == self.size:
+                i = 0
+        if sent:
+            self._advance()
+        return sent
+
+    def ms_until_next(self, now: int, limit: int) -> int:
+        """
+        gives the time until the earliest pending note-off is due
+        (0 if one is overdue), or limit if that is sooner
+        """
+        i = self.head
+        for _ in range(self.count):
+            if self.notes[i] != _EMPTY:
+                limit = min(limit, max(ticks_diff(self.due[i], now), 0))
+            i += 1
+            if i == self.size:
+                i = 0
+        return limit
+
+    def release_all(self) -> None:
+        """queues every pending note-off on the midi_out right away"""
+        i = self.head
+        for _ in range(self.count):
+            if self.notes[i] != _EMPTY:
+                self._send(i)
+            i += 1
+            if i == self.size:
+                i = 0
+        self.head = 0
+        self.count = 0
+
+    def _release(self, channel, note):
+        i = self.head
+        for _ in range(self.count):
+            if self.notes[i] == note and self.channels[i] == channel:
+                self._send(i)
+                self._advance()
+                return
+            i += 1
+            if i == self.size:
+                i = 0
+
+    def _send(self, i):
+        self.out.note_off(self.channels[i], self.notes[i])
+        self.notes[i] = _EMPTY
+
+    def _advance(self):
+        # skip past entries at the head which have been sent
+        while self.count and self.notes[self.head] == _EMPTY:
+            self.head += 1
+            if self.head == self.size:
+                self.head = 0
+            self.count -= 1
@@ -0,0 +1,151 @@
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+
+class segment_display:
+    """
+    Drives a segment display (an HT16K33 Seg14x4) from an off-screen
+    frame of characters, so drawing never touches the bus.
+
+    write(), number() and push() only change the frame. update(),
+    called from the display task, writes the digits which differ from
+    what the display has and then one show(), at most once every
+    refresh_ms however often the frame changed in between; a frame put
+    back the way it was costs nothing. A marquee scrolls in one
+    character each time update() finds its delay has passed, instead
+    of blocking the way the library's marquee() does.
+
+    Every show() is counted; give it a profiler histogram as timing and
+    each one is timed as well.
+    """
+
+    def __init__(self, device, chars=4, refresh_ms=50, ticks=ticks_ms):
+        self.device = device
+        # digits are set one at a time; show() writes them out
+        device.auto_write = False
+        self.chars = chars
+        self.refresh_ms = refresh_ms
+        self.ticks = ticks
+        self.frame = bytearray(b" " * chars)
+        # what the display has; 0 matches no character, so the first
+        # update() writes every digit
+        self.shown = bytearray(chars)
+        self._next_flush = ticks()
+        self.shows = 0
+        self.timing = None
+        # the marquee: its text, the next character, ms per character
+        # and the pause after the last one
+        self.text = None
+        self.position = 0
+        self.delay_ms = 0
+        self.pause_ms = 0
+        self._next_character = self._next_flush
+
+    def write(self, text: str) -> None:
+        """shows the end of text, right aligned; stops any marquee"""
+        self.text = None
+        frame = self.frame
+        chars = self.chars
+        length = len(text)
+        for i in range(chars):
+            n = length - chars + i
+            frame[i] = ord(text[n]) if n >= 0 else 32
+
+    def number(self, value: int) -> None:
+        """shows a number, right aligned, without making a string"""
+        self.text = None
+        frame = self.frame
+        negative = value < 0
+        if negative:
+            value = -value
+        i = self.chars
+        while i:
+            i -= 1
+            frame[i] = 48 + value % 10
+            value //= 10
+            if not value:
+                break
+        if negative and i:
+            i -= 1
+            frame[i] = 45
+        while i:
+            i -= 1
+            frame[i] = 32
+
+    def push(self, character: int) -> None:
+        """scrolls the frame left one character, adding character"""
+        frame = self.frame
+        for i in range(self.chars - 1):
+            frame[i] = frame[i + 1]
+        frame[self.chars - 1] = character
+
+    def marquee(self, text: str, delay_ms: int, pause_ms: int = 0) -> None:
+        """
+        starts scrolling text in, a character every delay_ms, then
+        waits pause_ms; scrolling is True until it's done
+        """
+        self.text = text
+        self.position = 0
+        self.delay_ms = delay_ms
+        self.pause_ms = pause_ms
+        self._next_character = self.ticks()
+
+    @property
+    def scrolling(self) -> bool:
+        return self.text is not None
+
+    def animate(self, now: int) -> None:
+        """moves the marquee along if it's due"""
+        text = self.text
+        if text is None or ticks_diff(now, self._next_character) < 0:
+            return
+        if self.position == len(text):
+            # the pause is over
+            self.text = None
+            return
+        self.push(ord(text[self.position]))
+        self.position += 1
+        delay = self.delay_ms
+        if self.position == len(text):
+            delay += self.pause_ms
+        self._next_character = ticks_add(self._next_character, delay)
+
+    def flush(self) -> bool:
+        """writes the digits which changed; False if none had"""
+        frame = self.frame
+        shown = self.shown
+        device = self.device
+        changed = False
+        for i in range(self.chars):
+            if frame[i] != shown[i]:
+                shown[i] = frame[i]
+                device[i] = chr(frame[i])
+                changed = True
+        if not changed:
+            return False
+        timing = self.timing
+        if timing is not None:
+            timing.start()
+        device.show()
+        if timing is not None:
+            timing.stop()
+        self.shows += 1
+        return True
+
+    def update(self) -> None:
+        """runs the marquee, and flushes if the refresh period is up"""
+        now = self.ticks()
+        self.animate(now)
+        if ticks_diff(now, self._next_flush) < 0:
+            return
+        if self.flush():
+            self._next_flush = ticks_add(now, self.refresh_ms)
+
+    def ms_until_due(self) -> int:
+        """how long update() can wait before there's something to do"""
+        now = self.ticks()
+        wait = self.refresh_ms
+        if self.text is not None:
+            wait = min(wait, ticks_diff(self._next_character, now))
+        if self.frame != self.shown:
+            wait = min(wait, ticks_diff(self._next_flush, now))
+        return max(wait, 0)
@@ -0,0 +1,1296 @@
+# Uses General MIDI drum notes on channel 10
+# Range is note 35/B0 - 81/A4, but classic 808 set is defined here
+
+import asyncio
+import struct
+import sys
+from adafruit_ticks import ticks_ms, ticks_diff
+import board
+import bitbangio
+from digitalio import DigitalInOut, Pull
+import keypad
+import usb_midi
+import microcontroller
+import supervisor
+import log
+from adafruit_seesaw import seesaw, digitalio
+from adafruit_debouncer import Debouncer, Button
+from adafruit_ht16k33 import segments
+from bitarray import bitarray
+from bank import pattern_bank
+from clock import step_clock
+from drum import drum
+from encoders import encoder_service
+from euclid import euclid, vary
+from geometry import geometry
+from lanes import VELOCITY, PROBABILITY, RATCHET, OFFSET
+from meter import meter
+from midi_clock import (
+    midi_clock_in,
+    PPQN,
+    CLOCK,
+    START,
+    CONTINUE,
+    STOP,
+    SONG_POSITION,
+    NOTE_ON,
+)
+from midi_out import midi_out
+from pattern import lowest_bit
+from persistence import nvm_store
+from prng import prng
+from profiler import profiler
+from scheduler import note_scheduler
+from segment_display import segment_display
+from song import song
+from stepper import stepper
+from TLC5916 import TLC5916
+
+# format of the header in NVM for save_state/load_state:
+# < -- little-endian; lower bits are more significant
+# B -- magic number; says which of the formats below follows
+# B -- number of steps (unsigned byte: 0 - 255)
+# H -- BPM beats per minute (unsigned short: 0 - 65536)
+# followed by the pattern bank (see pattern_bank.save), with
+# lanes_magic_number by the lanes (see pattern_bank.save_lanes), with
+# song_magic_number by the lanes (maybe none) and the chain (see song.save),
+# and with meter_magic_number by the lanes and the chain (either maybe
+# none) and the voice ranges (see meter.save)
+
+# this number should change if load/save logic changes in
+# and incompatible way
+magic_number = 0x03
+# the same, followed by the per-step lanes; only used when some
+# pattern has lanes, so a plain state keeps the smaller format
+lanes_magic_number = 0x04
+# and followed by the song's chain as well, when there is one
+song_magic_number = 0x05
+# and followed by the voice ranges, when voices have ranges of their own
+meter_magic_number = 0x06
+
+
+class nvm_header:
+    format = b"<BBH"
+    size = struct.calcsize(format)
+
+    def pack_into(buffer, offset, *v):
+        struct.pack_into(nvm_header.format, buffer, offset, *v)
+
+    def unpack_from(buffer, offset=0):
+        return struct.unpack_from(nvm_header.format, buffer, offset)
+
+
+class sequencer:
+    """
+    The drum sequencer: the pattern state, the peripherals, and the
+    asyncio tasks which run them.
+
+    Constructing it sets up only what playing needs -- MIDI, the
+    switches, buttons and LEDs -- and loads the saved state. start()
+    runs the tasks: playback and input begin right away, while the
+    I2C display and encoders are brought up alongside them and the
+    splash scrolls by without holding anything up.
+
+    shape is the geometry of the patterns and the key/LED grid; it
+    defaults to this board's 5 voices x 8 steps on a 5 x 8 grid.
+    """
+
+    steps_per_beat = 4  # subdivide beats down to to 16th notes
+
+    # name and note of each voice; General MIDI drums
+    drum_kit = (
+        ("Bass", 36),
+        ("Snar", 38),
+        ("LTom", 41),
+        ("MTom", 44),
+        ("HTom", 56),
+        ("CHat", 42),
+        ("OHat", 46),
+        ("Clap", 39),
+        ("Rim", 37),
+        ("Crsh", 49),
+        ("Ride", 51),
+        ("Tamb", 54),
+        ("HCng", 63),
+        ("LCng", 64),
+        ("Clav", 75),
+        ("Mrcs", 70),
+    )
+
+    # how often the lower priority tasks run
+    input_poll_ms = 5
+    display_poll_ms = 50
+    # with nothing due sooner, the clock task sleeps at most this long
+    # so it notices the transport starting
+    idle_poll_ms = 10
+
+    # follow MIDI clock arriving on the USB MIDI input (slave); without
+    # it coming in, play on the internal clock and send it out (master)
+    follow_midi_clock = True
+    send_midi_clock = True
+    # while following, how often the clock task reads the MIDI input
+    midi_poll_ms = 2
+
+    # recorded hits set the velocity lane too (see set_lane)
+    record_velocity = False
+
+    # the serial console's w steps the swing by this much, up to max_swing
+    swing_step = 10
+    max_swing = 50
+
+    # in generator mode, the share of a rhythm's steps a variation flips
+    variation_percent = 12
+
+    # timing histograms (see profiler) are recorded as it runs, and
+    # dumped by typing p on the serial console or pushing button 3
+    # while holding button 1; profiling times the MIDI, LED and I2C
+    # I/O as well, at a ticks_ms pair per write or read
+    profiling = True
+
+    # text, delay per character (s), pause afterwards (s)
+    splash_text = (
+        ("Drum", 0.05, 0.5),
+        ("Trigger", 0.075, 0.5),
+        ("2040", 0.05, 1),
+        ("BPM", 0.05, 0.75),
+    )
+
+    def __init__(self, shape=None):
+        self.boot_ticks = ticks_ms()
+        if shape is None:
+            shape = geometry()
+        self.geometry = shape
+        self.num_steps = shape.steps
+        # the voices and steps the grid shows; see set_page()
+        self.page = 0
+        self.first_voice = 0
+        self.first_step = 0
+        # ticks when the tasks started / the I2C devices came up
+        self.ready_ticks = None
+        self.i2c_ready_ticks = None
+
+        # Beat timing assumes 4/4 time signature,
+        # e.g. 4 beats per measure, 1/4 note gets the beat
+        self.bpm = 120
+        # the clock ticks at MIDI clock rate, and every pulses_per_step-th
+        # pulse plays a step; pulse_count is the pulse within the step
+        # pulses late after a stall are caught up, up to a step's worth;
+        # swing delays every other step's pulses, not every other pulse
+        self.pulses_per_step = PPQN // self.steps_per_beat
+        self.clock = step_clock(
+            self.bpm,
+            PPQN,
+            max_behind=self.pulses_per_step,
+            swing_steps=self.pulses_per_step,
+        )
+        self.pulse_count = 0
+        # voices with ratchet or late hits still to play in lane_step,
+        # the step just played, and the lanes it played with
+        self.later = 0
+        self.lane_step = 0
+        self.later_lanes = None
+        # rolls the dice for the probability lane; seeded on every start
+        # so a take plays the same way each time
+        self.dice = prng()
+
+        # Number of steps and GPIO pin for step LED
+        # one neopixel per column
+        self.stepper = stepper(self.num_steps, board.D7, num_pixels=shape.columns)
+
+        self.playing = False
+        self.channel = 1
+        # set when the channel buttons held down were pushed together for
+        # a mode; none of them then sets the channel when let go
+        self.buttons_chorded = False
+        # set when the transport stops; the persistence task saves the state
+        self.save_pending = False
+
+        # Setup button
+        self.start_button_in = DigitalInOut(board.A2)
+        self.start_button_in.pull = Pull.UP
+        self.start_button = Debouncer(self.start_button_in)
+
+        # Reverse button
+        self.reverse_button_in = DigitalInOut(board.A1)
+        self.reverse_button_in.pull = Pull.UP
+        self.reverse_button = Debouncer(self.reverse_button_in)
+
+        # channel 1 button
+        self.button1_in = DigitalInOut(board.D9)
+        self.button1_in.pull = Pull.UP
+        self.button1 = Button(self.button1_in, value_when_pressed=False)
+
+        # channel 2 button
+        self.button2_in = DigitalInOut(board.D8)
+        self.button2_in.pull = Pull.UP
+        self.button2 = Button(self.button2_in, value_when_pressed=False)
+
+        # channel 3 button
+        self.button3_in = DigitalInOut(board.A3)
+        self.button3_in.pull = Pull.UP
+        self.button3 = Button(self.button3_in, value_when_pressed=False)
+
+        # Setup switches
+        # Input shift register
+        self.switches = keypad.ShiftRegisterKeys(
+            data=board.SCK,
+            latch=board.MOSI,
+            clock=board.MISO,
+            key_count=shape.cells,
+            value_when_pressed=True,
+            value_to_latch=True,
+        )
+        # the switches' events are read into this one, so reading
+        # them allocates nothing
+        self.switch_event = keypad.Event()
+
+        # Setup LEDs
+        # Output shift register
+        self.leds = TLC5916(
+            oe_pin=board.D5,
+            sdi_pin=board.D3,
+            clk_pin=board.D2,
+            le_pin=board.D4,
+            n=shape.led_bytes,
+        )
+        self.leds.write_config(0)
+        # shift whole bytes from here on; write_config needs the pins bit-banged
+        self.leds.use_spi(bitbangio.SPI)
+
+        # the I2C devices are set up by start()
+        self.display = None
+        self.rotary_seesaw = None
+        self.rotary_seesaw2 = None
+        self.knobbutton = None
+        # all encoder reads go through the service, which rate-limits them
+        self.encoders = encoder_service(poll_ms=20)
+
+        # MIDI setup
+        self.midi_in = usb_midi.ports[0]
+        self.midi = usb_midi.ports[1]
+
+        # default starting sequence
+        self.drums = []
+        for voice in range(shape.voices):
+            if voice < len(self.drum_kit):
+                name, note = self.drum_kit[voice]
+            else:
+                name, note = "V" + str(voice), 35 + voice
+            self.drums.append(drum(name, note, bitarray(self.num_steps)))
+
+        # patterns selectable with the tempo knob's button; the drums play
+        # the sequences of the active one
+        self.patterns = pattern_bank(shape.patterns, len(self.drums), self.num_steps)
+        self.leds_stale = False
+        self.use_pattern(self.patterns.get(0))
+        # the chain of patterns song mode plays; a saved one is decoded
+        # from song_data when first needed (see load_song)
+        self.song = song()
+        self.song_mode = False
+        self.song_data = None
+        self.song_offset = 0
+        # the pattern of the song step last played
+        self.song_pattern = 0
+        # each voice's own range and direction (see meter); the shared
+        # range plays until a voice is given one
+        self.meter = meter(len(self.drums), self.num_steps)
+        self.polymeter = False
+
+        # one note-on and one note-off per voice, and a clock pulse, fit in a
+        # single step's batch; USB MIDI gains nothing from running status
+        # (see midi_out)
+        self.midi_events = midi_out(
+            self.midi, max_events=2 * len(self.drums) + 1, running_status=False
+        )
+        # note-offs wait here until the drum's gate time has passed; room
+        # for two steps of every voice
+        self.note_offs = note_scheduler(
+            self.midi_events, size=max(32, 2 * len(self.drums))
+        )
+
+        # where the time goes; see profiler
+        self.profile = profiler()
+        if self.profiling:
+            self.midi_events.timing = self.profile.midi
+            self.leds.timing = self.profile.leds
+            self.encoders.timing = self.profile.i2c
+
+        # incoming MIDI clock; True while it's arriving and being followed
+        self.clock_in = midi_clock_in(self.midi_in, self.midi_clock_message)
+        self.following = False
+
+        # while recording, incoming note-ons set steps; note_voices maps
+        # each note to the voice playing it (0xFF for none)
+        self.recording = False
+        self.note_voices = bytearray(b"\xff" * 128)
+        for voice in range(len(self.drums) - 1, -1, -1):
+            self.note_voices[self.drums[voice].note] = voice
+
+        # generator mode: the quad encoders make Euclidean rhythms for
+        # one voice at a time; each voice keeps its hits, cycle length,
+        # rotation and variation (0 for none)
+        self.generating = False
+        self.rhythms = euclid(self.num_steps)
+        self.generated_voice = 0
+        voices = len(self.drums)
+        self.hits = bytearray(voices)
+        self.cycles = bytearray([self.num_steps] * voices)
+        self.rotations = bytearray(voices)
+        self.variations = bytearray(voices)
+        self.variation_dice = prng()
+
+        # range mode: the quad encoders set one voice's range at a time
+        # (see adjust_voice_range)
+        self.ranging = False
+        self.ranged_voice = 0
+
+        # the state is kept double-buffered in two NVM slots
+        self.state_store = nvm_store(microcontroller.nvm)
+        # a bank too big to save is a geometry this board can't keep
+        if nvm_header.size + self.patterns.size() > self.state_store.capacity:
+            raise ValueError()
+        # try to load the state (no-op if NVM not valid)
+        self.load_state()
+
+        # light up initial LEDs
+        self.show_pattern()
+
+    def set_bpm(self, newbpm: int):
+        self.bpm = newbpm
+        self.clock.set_bpm(newbpm)
+
+    def set_swing(self, swing: int) -> None:
+        """delays every odd step by swing percent of a step (0-99)"""
+        self.clock.set_swing(swing)
+        log.info("swing", self.clock.swing)
+
+    def use_pattern(self, p):
+        # reference swaps only: this runs inside the playback tick
+        self.active_pattern = p
+        for drum_index in range(len(self.drums)):
+            self.drums[drum_index].sequence = p.sequences[drum_index]
+        self.leds_stale = True
+
+    def play_drum(self, drum, now, velocity=120):
+        # queued; sent by midi_events.flush() once the step is complete
+        self.midi_events.note_on(self.channel, drum.note, velocity)
+        self.note_offs.note_off_after(now, drum.gate_ms, self.channel, drum.note)
+
+    def light_steps(self, drum, step, state):
+        # nothing to light if the step isn't on the page shown
+        shape = self.geometry
+        row = drum - self.first_voice
+        column = step - self.first_step
+        if 0 <= row < shape.rows and 0 <= column < shape.columns:
+            self.leds[shape.cell_leds[row * shape.columns + column]] = state
+
+    def show_pattern(self):
+        self.leds_stale = False
+        shape = self.geometry
+        cell_leds = shape.cell_leds
+        leds = self.leds
+        cell = 0
+        for row in range(shape.rows):
+            voice = self.first_voice + row
+            sequence = None
+            if voice < len(self.drums):
+                sequence = self.drums[voice].sequence
+            for column in range(shape.columns):
+                step = self.first_step + column
+                leds[cell_leds[cell]] = (
+                    sequence is not None and step < self.num_steps and sequence[step]
+                )
+                cell += 1
+        leds.write()
+
+    def set_page(self, page):
+        """shows the given page of the pattern on the grid"""
+        self.page = page % self.geometry.pages
+        self.first_voice, self.first_step = self.geometry.page_origin(self.page)
+        self.stepper.show_steps(self.first_step)
+        self.leds_stale = True
+        log.info("page", self.page)
+
+    def key_pressed(self, key):
+        """toggles the step under a key, on the page shown"""
+        shape = self.geometry
+        voice = self.first_voice + shape.key_rows[key]
+        step = self.first_step + shape.key_columns[key]
+        if voice < len(self.drums) and step < self.num_steps:
+            self.toggle_step(voice, step)
+
+    def toggle_step(self, drum_index, step_index):
+        drum = self.drums[drum_index]
+        drum.sequence.toggle(step_index)  # toggle step
+        self.song.stale = True
+        self.light_steps(
+            drum_index, step_index, drum.sequence[step_index]
+        )  # toggle light; the input task writes the LEDs out
+
+    def set_lane(self, lane, drum_index, step_index, value, number=None):
+        """
+        sets a per-step parameter of the active pattern (or of pattern
+        number): VELOCITY 1-127, PROBABILITY 0-100 (percent), RATCHET 1
+        up to a hit per pulse, or OFFSET, the pulses late within the step;
+        a ratchet is spread over the pulses the offset leaves, and plays
+        no more hits than there are of them
+        """
+        if lane == VELOCITY:
+            value = min(max(value, 1), 127)
+        elif lane == PROBABILITY:
+            value = min(max(value, 0), 100)
+        elif lane == RATCHET:
+            value = min(max(value, 1), self.pulses_per_step)
+        else:
+            value = min(max(value, 0), self.pulses_per_step - 1)
+        if number is None:
+            number = self.patterns.active
+        self.patterns.lanes_for(number).set(lane, drum_index, step_index, value)
+
+    def print_sequence(self):
+        print("drums = [ ")
+        for drum in self.drums:
+            print(" " + repr(drum) + ",")
+        print("]")
+
+    def save_state(self) -> None:
+        self.load_song()
+        size = nvm_header.size + self.patterns.size()
+        lanes_size = self.patterns.lanes_size()
+        song_size = self.song.size() if self.song.length else 0
+        meter_size = self.meter.size() if self.polymeter else 0
+        if size + lanes_size + song_size + meter_size > self.state_store.capacity:
+            log.warning("lanes don't fit in NVM; saving without them")
+            lanes_size = 0
+        if meter_size:
+            version = meter_magic_number
+        elif song_size:
+            version = song_magic_number
+        elif lanes_size:
+            version = lanes_magic_number
+        else:
+            version = magic_number
+        # with a chain or ranges after them, no lanes (or no chain) is an
+        # empty section: a 0 count
+        lanes_section = lanes_size or (1 if song_size or meter_size else 0)
+        song_section = song_size or (1 if meter_size else 0)
+        bytes = bytearray(size + lanes_section + song_section + meter_size)
+        nvm_header.pack_into(bytes, 0, version, self.num_steps, self.bpm)
+        self.patterns.save(bytes, nvm_header.size)
+        if lanes_size:
+            self.patterns.save_lanes(bytes, size)
+        if song_size:
+            self.song.save(bytes, size + lanes_section)
+        if meter_size:
+            self.meter.save(bytes, size + lanes_section + song_section)
+        # writes only what changed, and nothing if the state is unchanged
+        self.profile.nvm.start()
+        self.state_store.save(bytes)
+        self.profile.nvm.stop()
+
+    def load_state(self) -> None:
+        self.load_payload(self.state_store.load())
+
+    def load_payload(self, payload) -> bool:
+        """
+        restores a state save_state() packed; False (and nothing
+        restored) if it isn't one, or is one of another geometry
+        """
+        if payload is None or len(payload) < nvm_header.size:
+            return False
+        header = nvm_header.unpack_from(payload)
+        version = header[0]
+        if version not in (
+            magic_number,
+            lanes_magic_number,
+            song_magic_number,
+            meter_magic_number,
+        ):
+            return False
+        if header[1] != self.num_steps or header[2] == 0:
+            return False
+        # fails if the bank saved has another geometry
+        if not self.patterns.load(payload, nvm_header.size):
+            return False
+        end = nvm_header.size + self.patterns.size()
+        if version == magic_number:
+            self.patterns.clear_lanes()
+        else:
+            end = self.patterns.load_lanes(payload, end)
+        self.song.clear()
+        self.song_data = None
+        self.meter.clear()
+        self.polymeter = False
+        if version >= song_magic_number and 0 <= end < len(payload):
+            # an empty chain is one there's no need to decode
+            if payload[end]:
+                self.song_data = payload
+                self.song_offset = end
+            if version == meter_magic_number:
+                self.polymeter = self.meter.load(payload, end + 1 + 2 * payload[end])
+        self.leds_stale = True
+        self.set_bpm(header[2])
+        return True
+
+    def load_song(self) -> None:
+        """decodes the saved chain, the first time it's needed"""
+        if self.song_data is not None:
+            self.song.load(self.song_data, self.song_offset, self.patterns.count)
+            self.song_data = None
+
+    def append_chain(self, number, repeats=1):
+        """adds a pattern, played repeats times, to the end of the chain"""
+        self.load_song()
+        if not self.song.append(number, repeats):
+            log.warning("chain full")
+
+    def clear_chain(self):
+        self.load_song()
+        self.song.clear()
+        self.set_song_mode(False)
+        self.save_pending = True
+        log.info("chain cleared")
+
+    def chain_active_pattern(self):
+        """
+        adds the active pattern to the end of the chain; when it's there
+        already, the last entry plays once more instead
+        """
+        self.load_song()
+        song = self.song
+        number = self.patterns.active
+        last = song.length - 1
+        if last >= 0 and song.patterns[last] == number and song.repeats[last] < 255:
+            song.repeats[last] += 1
+            song.stale = True
+        else:
+            self.append_chain(number)
+        self.save_pending = True
+        log.info("chain", song.length, "pattern", number)
+
+    def compile_song(self):
+        stepper = self.stepper
+        self.song.compile(
+            self.patterns, stepper.first_step, stepper.last_step, stepper.stepping_forward
+        )
+
+    def set_song_mode(self, on):
+        """plays the chain, from its start, instead of the active pattern"""
+        self.load_song()
+        if on and self.song.length == 0:
+            log.warning("no chain to play")
+            on = False
+        if on:
+            self.compile_song()
+            self.song.rewind()
+        self.song_mode = on
+        self.later = 0
+        log.info("song", on)
+
+    def play_step(self, now):
+        """plays the current step and advances to the next one"""
+        if self.song_mode:
+            self.play_song_step(now)
+            return
+        stepper = self.stepper
+        patterns = self.patterns
+        if patterns.pending is not None and stepper.current_step == stepper.range_start():
+            self.use_pattern(patterns.take_pending())
+        if self.polymeter:
+            self.play_meter_step(now)
+        else:
+            # one lookup gives every voice on this step
+            step = stepper.current_step
+            self.play_voices(
+                self.active_pattern.step_mask(step), self.active_pattern.lanes, step, now
+            )
+        # TODO: how to display the current step? Separate LED?
+        # (in polymeter, the shared range goes on counting the loop the
+        # neopixels show and cued patterns wait for)
+        stepper.advance_step()
+
+    def play_meter_step(self, now):
+        """
+        plays each voice's own step, one pass over the voices, and
+        moves the playheads on the grid: the step playing is shown
+        inverted
+        """
+        meter = self.meter
+        position = meter.position
+        played = meter.played
+        masks = self.active_pattern.step_masks
+        step_lanes = self.active_pattern.lanes
+        drums = self.drums
+        self.later = 0
+        self.later_lanes = step_lanes
+        bit = 1
+        for voice in range(len(drums)):
+            step = position[voice]
+            # the cell the playhead leaves shows its step again
+            last = played[voice]
+            self.light_steps(voice, last, masks[last] & bit)
+            played[voice] = step
+            if masks[step] & bit:
+                self.light_steps(voice, step, False)
+                if step_lanes is None:
+                    self.play_drum(drums[voice], now)
+                else:
+                    self.play_hit(step_lanes, voice, bit, step, now)
+            else:
+                self.light_steps(voice, step, True)
+            bit <<= 1
+        meter.advance()
+        self.midi_events.flush()
+
+    def set_voice_range(self, voice, first, last, forward=True):
+        """
+        gives a voice its own loop, first..last, played forwards or
+        backwards; from then on each voice plays its own range
+        """
+        self.meter.set_range(voice, first, last, forward)
+        self.polymeter = True
+        self.leds_stale = True
+        self.save_pending = True
+
+    def clear_voice_ranges(self):
+        """goes back to every voice playing the shared range"""
+        self.meter.clear()
+        self.polymeter = False
+        self.leds_stale = True
+        self.save_pending = True
+        log.info("ranges cleared")
+
+    def set_ranging(self, on):
+        """
+        turns range mode on or off: while it's on the quad encoders
+        pick a voice and move its range and direction, and the knob
+        button gives every voice the shared range again
+        """
+        self.ranging = on
+        if on:
+            self.generating = False
+        log.info("ranges", on)
+
+    def adjust_voice_range(self, voice=0, length=0, direction=0, start=0):
+        """
+        moves a voice's range by encoder deltas: voice picks the voice
+        edited, length moves its last step, start moves the whole range
+        and direction plays it forwards (up) or backwards (down)
+        """
+        voices = len(self.drums)
+        self.ranged_voice = (self.ranged_voice + voice) % voices
+        v = self.ranged_voice
+        if not (length or direction or start):
+            log.info("voice", v)
+            return
+        meter = self.meter
+        if not self.polymeter:
+            # every voice starts out on the shared range, where it is
+            stepper = self.stepper
+            step = stepper.current_step
+            for other in range(voices):
+                meter.set_range(
+                    other, stepper.first_step, stepper.last_step, stepper.stepping_forward
+                )
+                if stepper.first_step <= step <= stepper.last_step:
+                    meter.position[other] = step
+        n = min(max(meter.length(v) + length, 1), self.num_steps)
+        first = min(max(meter.first[v] + start, 0), self.num_steps - n)
+        forward = direction > 0 if direction else meter.forward[v]
+        self.set_voice_range(v, first, first + n - 1, forward)
+        log.info("range", v, first, first + n - 1)
+
+    def play_song_step(self, now):
+        """plays the song's current step and moves along the chain"""
+        song = self.song
+        i = song.position
+        step = song.steps[i]
+        self.song_pattern = song.patterns[song.entry]
+        step_lanes = self.patterns.lanes[self.song_pattern]
+        self.play_voices(song.masks[i], step_lanes, step, now)
+        self.stepper.show_step(step)
+        song.advance()
+
+    def play_voices(self, voices, step_lanes, step, now):
+        """plays the voices of a step mask; one pass per voice which fires"""
+        drums = self.drums
+        self.later = 0
+        self.lane_step = step
+        self.later_lanes = step_lanes
+        while voices:
+            rest = voices & (voices - 1)
+            bit = voices ^ rest
+            voices = rest
+            if bit < 0x100:
+                voice = lowest_bit[bit]
+            elif bit < 0x10000:
+                voice = 8 + lowest_bit[bit >> 8]
+            elif bit < 0x1000000:
+                voice = 16 + lowest_bit[bit >> 16]
+            else:
+                voice = 24 + lowest_bit[bit >> 24]
+            if step_lanes is None:
+                self.play_drum(drums[voice], now)
+            else:
+                self.play_hit(step_lanes, voice, bit, step, now)
+        self.midi_events.flush()
+
+    def play_hit(self, step_lanes, voice, bit, step, now):
+        # a hit with lanes: rolled for once, then played now unless it's
+        # late, and left to play_later() if more of it is to come
+        if not self.dice.chance(step_lanes.get(PROBABILITY, voice, step)):
+            return
+        if step_lanes.get(OFFSET, voice, step) == 0:
+            self.play_drum(
+                self.drums[voice], now, step_lanes.get(VELOCITY, voice, step)
+            )
+            if step_lanes.get(RATCHET, voice, step) > 1:
+                self.later |= bit
+        else:
+            self.later |= bit
+
+    def play_later(self, now):
+        """plays the ratchet and late hits of lane_step due on this pulse"""
+        step_lanes = self.later_lanes
+        if step_lanes is None:
+            self.later = 0
+            return
+        step = self.lane_step
+        # in polymeter each voice played a step of its own
+        played = self.meter.played if self.polymeter else None
+        pulse = self.pulse_count
+        voices = self.later
+        voice = 0
+        while voices:
+            if voices & 1:
+                if played is not None:
+                    step = played[voice]
+                offset = step_lanes.get(OFFSET, voice, step)
+                late = pulse - offset
+                ratchet = step_lanes.get(RATCHET, voice, step)
+                # the hits are spread over the pulses left after the
+                # offset, at most one a pulse
+                spacing = (self.pulses_per_step - offset) // ratchet
+                if spacing == 0:
+                    spacing = 1
+                if late >= 0 and late % spacing == 0 and late // spacing < ratchet:
+                    self.play_drum(
+                        self.drums[voice], now, step_lanes.get(VELOCITY, voice, step)
+                    )
+            voices >>= 1
+            voice += 1
+        self.midi_events.flush()
+
+    def pulse(self, now):
+        """
+        one MIDI clock pulse; the first of each step plays it, and the
+        others any ratchet or late hits left from it
+        """
+        if self.pulse_count == 0:
+            self.play_step(now)
+        elif self.later:
+            self.play_later(now)
+        self.pulse_count += 1
+        if self.pulse_count == self.pulses_per_step:
+            self.pulse_count = 0
+
+    def start_playing(self, send=True):
+        """starts the transport from the top of the range"""
+        self.playing = True
+        self.stepper.reset()
+        self.meter.reset()
+        self.pulse_count = 0
+        self.later = 0
+        self.song.rewind()
+        self.dice.seed(1)
+        self.clock.start()
+        if send and self.send_midi_clock:
+            self.midi_events.realtime(START)
+            self.midi_events.flush()
+        log.info("play:", self.playing)
+
+    def stop_playing(self, send=True):
+        """stops the transport, ending the notes still sounding"""
+        self.note_offs.release_all()
+        if send and self.send_midi_clock:
+            self.midi_events.realtime(STOP)
+        self.midi_events.flush()
+        self.save_pending = True
+        self.playing = False
+        self.later = 0
+        self.stepper.reset()
+        self.meter.reset()
+        # and the playheads come off the grid
+        self.leds_stale = True
+        log.info("play:", self.playing)
+
+    def set_generating(self, on):
+        """
+        turns generator mode on or off: while it's on the quad encoders
+        pick the voice, its hits, its cycle length and the rotation,
+        and the knob button rolls another variation
+        """
+        self.generating = on
+        if on:
+            self.ranging = False
+        log.info("generate", on)
+
+    def generate(self, voice):
+        """fills the voice's sequence with its rhythm (and variation)"""
+        sequence = self.drums[voice].sequence
+        self.rhythms.fill(
+            sequence, self.hits[voice], self.cycles[voice], self.rotations[voice]
+        )
+        variation = self.variations[voice]
+        if variation:
+            self.variation_dice.seed(variation)
+            vary(sequence, self.variation_dice, self.variation_percent)
+        self.song.stale = True
+        self.leds_stale = True
+
+    def adjust_rhythm(self, voice=0, hits=0, cycle=0, rotation=0):
+        """
+        moves the generator settings by encoder deltas: voice picks the
+        voice edited, the others change its rhythm, which is regenerated
+        """
+        voices = len(self.drums)
+        self.generated_voice = (self.generated_voice + voice) % voices
+        v = self.generated_voice
+        if not (hits or cycle or rotation):
+            log.info("voice", v)
+            return
+        n = min(max(self.cycles[v] + cycle, 1), self.num_steps)
+        self.cycles[v] = n
+        self.hits[v] = min(max(self.hits[v] + hits, 0), n)
+        self.rotations[v] = (self.rotations[v] + rotation) % n
+        self.generate(v)
+
+    def next_variation(self):
+        """rolls another variation of the voice's rhythm"""
+        v = self.generated_voice
+        self.variations[v] = (self.variations[v] + 1) & 0xFF
+        self.generate(v)
+
+    def set_recording(self, on):
+        """records note-ons from the MIDI input into the active pattern"""
+        self.recording = on
+        self.clock_in.notes = on
+        log.info("record", on)
+
+    def record_note(self, note, velocity):
+        """
+        sets the step nearest to now for the voice playing note: the
+        step just played if it's less than half a step ago, else the
+        next one; when stopped, the current step. In song mode it's set
+        in the pattern the chain plays there. Only the LED bit is set
+        here; the input task writes the LEDs out.
+        """
+        voice = self.note_voices[note]
+        if voice == 0xFF:
+            return
+        just_played = (
+            self.playing
+            and self.pulse_count != 0
+            and 2 * self.pulse_count <= self.pulses_per_step
+        )
+        if self.polymeter and not self.song_mode:
+            if just_played:
+                step = self.meter.played[voice]
+            else:
+                step = self.meter.position[voice]
+        elif not self.playing:
+            step = self.stepper.current_step
+        elif just_played:
+            step = self.lane_step
+        elif self.song_mode:
+            step = self.song.steps[self.song.position]
+        else:
+            step = self.stepper.current_step
+        number = self.patterns.active
+        if self.song_mode:
+            if just_played:
+                number = self.song_pattern
+            else:
+                number = self.song.patterns[self.song.entry]
+        sequence = self.patterns.get(number).sequences[voice]
+        if not sequence[step]:
+            sequence[step] = 1
+            if number == self.patterns.active:
+                self.light_steps(voice, step, True)
+            self.song.stale = True
+        if self.record_velocity:
+            self.set_lane(VELOCITY, voice, step, velocity, number)
+
+    def midi_clock_message(self, message, value):
+        """
+        the clock_in listener: follows the incoming transport, and
+        records notes
+        """
+        if message == NOTE_ON:
+            if self.recording:
+                self.record_note(value & 0x7F, value >> 7)
+            return
+        if not self.follow_midi_clock:
+            return
+        if message == CLOCK:
+            if self.playing:
+                self.pulse(ticks_ms())
+        elif message == START:
+            self.start_playing(send=False)
+        elif message == CONTINUE:
+            self.playing = True
+        elif message == STOP:
+            if self.playing:
+                self.stop_playing(send=False)
+        elif message == SONG_POSITION:
+            # value is in 16th notes, 6 pulses each
+            pulses = value * (PPQN // 4)
+            self.stepper.seek(pulses // self.pulses_per_step)
+            self.song.seek(pulses // self.pulses_per_step)
+            self.pulse_count = pulses % self.pulses_per_step
+            self.later = 0
+
+    async def clock_task(self):
+        """
+        plays the steps, on the internal clock or following the MIDI
+        clock; sleeps until the next pulse or note-off is due so the
+        other tasks only run while there is nothing to play
+        """
+        clock = self.clock
+        clock_in = self.clock_in
+        note_offs = self.note_offs
+        midi_events = self.midi_events
+        while True:
+            wait = self.idle_poll_ms
+            if self.follow_midi_clock or self.recording:
+                # pulses which arrived play their steps from in here, and
+                # notes which arrived are recorded
+                clock_in.poll()
+            if self.follow_midi_clock:
+                following = clock_in.following()
+                if following:
+                    tempo = clock_in.bpm()
+                    if tempo and tempo != self.bpm:
+                        self.set_bpm(tempo)
+                    wait = self.midi_poll_ms
+                elif self.following:
+                    # the clock went away; carry on at its tempo
+                    clock.start()
+                self.following = following
+            if self.playing:
+                now = ticks_ms()
+                # send note-offs which came due since the last pass
+                if note_offs.drain(now):
+                    midi_events.flush()
+                if not self.following:
+                    if clock.due():
+                        if self.pulse_count == 0:
+                            self.profile.lateness.add(clock.last_late)
+                        if self.send_midi_clock:
+                            midi_events.realtime(CLOCK)
+                        self.pulse(now)
+                        midi_events.flush()
+                    wait = clock.ms_until_due()
+                wait = note_offs.ms_until_next(ticks_ms(), wait)
+            await asyncio.sleep(wait / 1000)
+
+    def read_buttons(self):
+        """updates every button and debouncer, then acts on them"""
+        self.start_button.update()
+        self.reverse_button.update()
+        self.button1.update()
+        self.button2.update()
+        self.button3.update()
+        knobbutton = self.knobbutton
+        if knobbutton is not None:
+            knobbutton.update()
+
+        if self.start_button.fell:  # pushed encoder button plays/stops transport
+            if self.playing is True:
+                self.stop_playing()
+            else:
+                self.start_playing()
+
+        if self.reverse_button.fell:
+            self.stepper.reverse()
+            self.song.stale = True
+
+        # the channel buttons pushed together switch modes; pushed on
+        # its own, one sets the channel when it's let go
+        if self.button2.pressed:
+            if not self.button1.value:
+                # with button 1 held
+                self.set_recording(not self.recording)
+                self.buttons_chorded = True
+            elif not self.button3.value:
+                # with button 3 held
+                self.set_ranging(not self.ranging)
+                self.buttons_chorded = True
+
+        if self.button3.pressed:
+            if not self.button1.value:
+                # with button 1 held
+                self.profile.dump()
+                self.buttons_chorded = True
+            elif not self.button2.value:
+                # with button 2 held
+                self.set_generating(not self.generating)
+                self.buttons_chorded = True
+
+        if not self.buttons_chorded:
+            if self.button1.released:
+                self.channel = 1
+            if self.button2.released:
+                self.channel = 2
+            if self.button3.released:
+                self.channel = 3
+        elif self.button1.value and self.button2.value and self.button3.value:
+            # all let go
+            self.buttons_chorded = False
+
+        if knobbutton is not None and knobbutton.fell:
+            if self.generating:
+                self.next_variation()
+            elif self.ranging:
+                self.clear_voice_ranges()
+            else:
+                self.cue_next_pattern()
+
+    def read_switches(self):
+        """
+        takes every event the step switches have queued, toggling the
+        steps pressed; the LEDs are written once afterwards
+        """
+        event = self.switch_event
+        events = self.switches.events
+        while events.get_into(event):
+            if event.pressed:
+                log.debug("key pressed:", event.key_number)
+                self.key_pressed(event.key_number)
+
+    async def input_task(self):
+        """
+        buttons and the step switches: each pass reads all of them, then
+        writes the LEDs once for whatever they changed
+        """
+        while True:
+            self.profile.loop.lap()
+            self.read_buttons()
+
+            if supervisor.runtime.serial_bytes_available:
+                self.serial_command(sys.stdin.read(1))
+
+            # switches add or remove steps
+            self.read_switches()
+
+            if self.leds_stale:
+                self.show_pattern()
+            # the step LEDs which the switches or recording changed
+            # (no-op when none did)
+            self.leds.write()
+
+            # edits and range changes reach the song between steps
+            if self.song_mode and self.song.stale:
+                self.compile_song()
+
+            # the step neopixels, rate-limited by the stepper
+            self.stepper.show()
+
+            await asyncio.sleep(self.input_poll_ms / 1000)
+
+    def serial_command(self, command):
+        """
+        p prints the profile, r resets it, s turns song mode on/off, c
+        recording on/off, g generator mode on/off, m range mode on/off
+        and w steps the swing up by swing_step percent, back to none
+        past the most; a adds the active pattern to the song's chain
+        and x clears the chain
+        """
+        if command == "p":
+            self.profile.dump()
+        elif command == "r":
+            self.profile.reset()
+        elif command == "s":
+            self.set_song_mode(not self.song_mode)
+        elif command == "c":
+            self.set_recording(not self.recording)
+        elif command == "g":
+            self.set_generating(not self.generating)
+        elif command == "m":
+            self.set_ranging(not self.ranging)
+        elif command == "a":
+            self.chain_active_pattern()
+        elif command == "x":
+            self.clear_chain()
+        elif command == "w":
+            swing = self.clock.swing + self.swing_step
+            self.set_swing(swing if swing <= self.max_swing else 0)
+
+    def cue_next_pattern(self):
+        # cue the next pattern; it starts with the next pass through
+        # the range, or right away when stopped
+        patterns = self.patterns
+        cued = patterns.active if patterns.pending is None else patterns.pending
+        cued = (cued + 1) % patterns.count
+        patterns.queue(cued)
+        if not self.playing:
+            self.use_pattern(patterns.take_pending())
+        log.info("pattern", cued)
+
+    async def encoder_task(self):
+        """
+        the I2C encoders; yields between devices so a slow read only
+        holds up this task's next turn
+        """
+        encoders = self.encoders
+        while True:
+            if encoders.due():
+                for device in range(len(encoders.devices)):
+                    encoders.poll_device(device)
+                    await asyncio.sleep(0)
+
+                tempo_encoder_delta = encoders.take(self.tempo_encoder)
+                if tempo_encoder_delta:
+                    newbpm = self.bpm + tempo_encoder_delta  # or (encoder_delta * 5)
+                    newbpm = min(max(newbpm, 10), 400)
+                    self.set_bpm(newbpm)
+
+                pattern_length_encoder_delta = encoders.take(
+                    self.pattern_length_encoder
+                )
+                step_shift_encoder_delta = encoders.take(self.step_shift_encoder)
+                page_encoder_delta = encoders.take(self.page_encoder)
+                cycle_encoder_delta = encoders.take(self.cycle_encoder)
+
+                if self.generating:
+                    # voice, hits, rotation and cycle length
+                    if (
+                        page_encoder_delta
+                        or pattern_length_encoder_delta
+                        or step_shift_encoder_delta
+                        or cycle_encoder_delta
+                    ):
+                        self.adjust_rhythm(
+                            page_encoder_delta,
+                            pattern_length_encoder_delta,
+                            cycle_encoder_delta,
+                            step_shift_encoder_delta,
+                        )
+                elif self.ranging:
+                    # voice, last step, first step and direction
+                    if (
+                        page_encoder_delta
+                        or pattern_length_encoder_delta
+                        or step_shift_encoder_delta
+                        or cycle_encoder_delta
+                    ):
+                        self.adjust_voice_range(
+                            page_encoder_delta,
+                            pattern_length_encoder_delta,
+                            cycle_encoder_delta,
+                            step_shift_encoder_delta,
+                        )
+                else:
+                    if pattern_length_encoder_delta:
+                        self.stepper.adjust_range_length(pattern_length_encoder_delta)
+                        self.song.stale = True
+
+                    if step_shift_encoder_delta:
+                        self.stepper.adjust_range_start(step_shift_encoder_delta)
+                        self.song.stale = True
+
+                    if page_encoder_delta:
+                        self.set_page(self.page + page_encoder_delta)
+
+            await asyncio.sleep(encoders.poll_ms / 1000)
+
+    async def display_task(self):
+        """
+        shows the splash, then the tempo whenever it changes; the
+        display service writes out what changed, a refresh at a time
+        """
+        display = self.display
+        for text, delay, pause in self.splash_text:
+            display.marquee(text, int(delay * 1000), int(pause * 1000))
+            while display.scrolling:
+                display.update()
+                await asyncio.sleep(display.ms_until_due() / 1000)
+        shown_bpm = None
+        while True:
+            if self.bpm != shown_bpm:
+                shown_bpm = self.bpm
+                display.number(shown_bpm)
+            display.update()
+            await asyncio.sleep(display.ms_until_due() / 1000)
+
+    async def persistence_task(self):
+        """saves the state once the transport has stopped"""
+        while True:
+            if self.save_pending and not self.playing:
+                self.save_pending = False
+                if log.enabled(log.DEBUG):
+                    self.print_sequence()
+                self.save_state()
+            await asyncio.sleep(self.display_poll_ms / 1000)
+
+    async def start_encoders(self, i2c):
+        """brings up the seesaws, then polls them"""
+        # a seesaw waits 0.5 s after its reset; skip the blocking one in
+        # the constructor and wait for both at once without blocking
+        self.rotary_seesaw = seesaw.Seesaw(i2c, addr=0x36, reset=False)
+        self.rotary_seesaw2 = seesaw.Seesaw(i2c, addr=0x49, reset=False)
+        self.rotary_seesaw.sw_reset(post_reset_delay=0)
+        self.rotary_seesaw2.sw_reset(post_reset_delay=0)
+        await asyncio.sleep(0.5)
+
+        # STEMMA QT Rotary encoder setup
+        self.tempo_encoder = self.encoders.add(self.rotary_seesaw)
+        self.rotary_seesaw.pin_mode(
+            24, self.rotary_seesaw.INPUT_PULLUP
+        )  # setup the button pin
+        knobbutton_in = digitalio.DigitalIO(
+            self.rotary_seesaw, 24
+        )  # use seesaw digitalio
+        self.knobbutton = Debouncer(knobbutton_in)  # create debouncer object for button
+
+        # adafruit quad encoder: pattern length and step shift encoders
+        self.pattern_length_encoder = self.encoders.add(self.rotary_seesaw2, 1)
+        self.step_shift_encoder = self.encoders.add(self.rotary_seesaw2, 3)
+        # and the page of a pattern bigger than the grid
+        self.page_encoder = self.encoders.add(self.rotary_seesaw2, 0)
+        # the fourth knob only sets the cycle length in generator mode
+        # and a voice's direction in range mode
+        self.cycle_encoder = self.encoders.add(self.rotary_seesaw2, 2)
+
+        self.i2c_ready_ticks = ticks_ms()
+        await self.encoder_task()
+
+    async def start_i2c(self):
+        """brings up the display and the encoders alongside each other"""
+        # define I2C
+        i2c = board.STEMMA_I2C()
+
+        device = segments.Seg14x4(i2c, address=(0x70), auto_write=False)
+        device.brightness = 0.3
+        self.display = segment_display(device, refresh_ms=self.display_poll_ms)
+        if self.profiling:
+            self.display.timing = self.profile.display
+        await asyncio.gather(self.display_task(), self.start_encoders(i2c))
+
+    async def start(self):
+        """runs the sequencer; never returns"""
+        print("Drum Trigger 2040")
+        tasks = [
+            asyncio.create_task(self.clock_task()),
+            asyncio.create_task(self.input_task()),
+            asyncio.create_task(self.persistence_task()),
+            asyncio.create_task(self.start_i2c()),
+        ]
+        self.ready_ticks = ticks_ms()
+        await asyncio.gather(*tasks)
+
+    def boot_ms(self) -> int:
+        """time from construction until the tasks were running"""
+        if self.ready_ticks is None:
+            return None
+        return ticks_diff(self.ready_ticks, self.boot_ticks)
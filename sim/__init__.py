@@ -0,0 +1,37 @@
+"""
+Host-side stand-ins for the CircuitPython modules used by the
+sequencer, so its pieces can be exercised and measured on a PC.
+
+Call install() before importing sequencer modules; it registers the
+stand-ins under the names the firmware imports. These files are never
+copied to the board.
+"""
+
+import importlib
+import sys
+
+_modules = (
+    "adafruit_debouncer",
+    "adafruit_ht16k33",
+    "adafruit_ht16k33.segments",
+    "adafruit_seesaw",
+    "adafruit_seesaw.digitalio",
+    "adafruit_seesaw.rotaryio",
+    "adafruit_seesaw.seesaw",
+    "adafruit_ticks",
+    "bitbangio",
+    "board",
+    "digitalio",
+    "keypad",
+    "microcontroller",
+    "neopixel",
+    "supervisor",
+    "usb_midi",
+)
+
+
+def install() -> None:
+    """makes the stand-ins importable under their CircuitPython names"""
+    for name in _modules:
+        if name not in sys.modules:
+            sys.modules[name] = importlib.import_module("sim." + name)
@@ -0,0 +1,48 @@
+"""stand-in for the adafruit_debouncer library (without the debounce delay)"""
+
+
+class Debouncer:
+    def __init__(self, io, interval=0.010):
+        self._io = io
+        self._value = self._read()
+        self._last = self._value
+
+    def _read(self):
+        if callable(self._io):
+            return bool(self._io())
+        return bool(self._io.value)
+
+    def update(self) -> None:
+        self._last = self._value
+        self._value = self._read()
+
+    @property
+    def value(self) -> bool:
+        return self._value
+
+    @property
+    def rose(self) -> bool:
+        return self._value and not self._last
+
+    @property
+    def fell(self) -> bool:
+        return self._last and not self._value
+
+
+class Button(Debouncer):
+    def __init__(self, pin, short_duration_ms=200, long_duration_ms=500,
+                 value_when_pressed=False, **kwargs):
+        super().__init__(pin, **kwargs)
+        self.value_when_pressed = value_when_pressed
+
+    @property
+    def pressed(self) -> bool:
+        if self.value_when_pressed:
+            return self.rose
+        return self.fell
+
+    @property
+    def released(self) -> bool:
+        if self.value_when_pressed:
+            return self.fell
+        return self.rose
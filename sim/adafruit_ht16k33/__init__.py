@@ -0,0 +1,3 @@
+"""stand-in for the adafruit_ht16k33 library"""
+
+from . import segments  # noqa: F401
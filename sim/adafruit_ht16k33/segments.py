@@ -0,0 +1,61 @@
+"""stand-in for adafruit_ht16k33.segments"""
+
+from .. import vtime
+
+
+class Seg14x4:
+    """
+    Keeps the text on the four digits and counts the I2C traffic a
+    real HT16K33 would see: every show() writes the 16-byte display
+    buffer plus its address byte, and write_delay (seconds) makes each
+    one block like the bus would.
+    """
+
+    BUFFER_BYTES = 17
+
+    def __init__(self, i2c, address=0x70, auto_write=True, chars_per_display=4):
+        self.i2c = i2c
+        self.address = address
+        self.auto_write = auto_write
+        self.brightness = 1.0
+        self.chars = chars_per_display
+        self.text = " " * chars_per_display
+        self.write_delay = 0
+        self.shows = 0
+        self.bytes = 0
+
+    def show(self) -> None:
+        self.shows += 1
+        self.bytes += Seg14x4.BUFFER_BYTES
+        count = getattr(self.i2c, "count", None)
+        if count is not None:
+            count(Seg14x4.BUFFER_BYTES)
+        if self.write_delay:
+            vtime.sleep(self.write_delay)
+
+    def __setitem__(self, index, character) -> None:
+        self.text = self.text[:index] + character + self.text[index + 1:]
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color) -> None:
+        self.text = (" " if not color else "*") * self.chars
+        if self.auto_write:
+            self.show()
+
+    def print(self, value) -> None:
+        text = str(value)
+        self.text = (self.text + text)[-self.chars:]
+        if self.auto_write:
+            self.show()
+
+    def scroll(self, count=1) -> None:
+        self.text = self.text[count:] + " " * count
+
+    def marquee(self, text, delay=0.25, loop=True, space_between=False) -> None:
+        # the library scrolls one character at a time, blocking
+        for ch in str(text) + " " * self.chars:
+            self.text = (self.text + ch)[-self.chars:]
+            if self.auto_write:
+                self.show()
+            vtime.sleep(delay)
@@ -0,0 +1,3 @@
+"""stand-in for the adafruit_seesaw library"""
+
+from . import digitalio, rotaryio, seesaw  # noqa: F401
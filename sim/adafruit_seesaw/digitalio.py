@@ -0,0 +1,15 @@
+"""stand-in for adafruit_seesaw.digitalio"""
+
+
+class DigitalIO:
+    def __init__(self, seesaw, pin):
+        self._seesaw = seesaw
+        self._pin = pin
+
+    @property
+    def value(self) -> bool:
+        return self._seesaw.digital_read(self._pin)
+
+    @value.setter
+    def value(self, value) -> None:
+        self._seesaw.pins[self._pin] = bool(value)
@@ -0,0 +1,16 @@
+"""stand-in for adafruit_seesaw.rotaryio"""
+
+
+class IncrementalEncoder:
+    def __init__(self, seesaw, encoder=0):
+        self._seesaw = seesaw
+        self._encoder = encoder
+
+    @property
+    def position(self) -> int:
+        # the library reports the seesaw count negated
+        return -self._seesaw.encoder_position(self._encoder)
+
+    @position.setter
+    def position(self, value) -> None:
+        self._seesaw.set_encoder_position(-value, self._encoder)
@@ -0,0 +1,81 @@
+"""stand-in for adafruit_seesaw.seesaw"""
+
+from .. import vtime
+
+
+class Seesaw:
+    """
+    A seesaw with settable encoder positions and pin levels. Every
+    read is counted as one I2C transaction, and read_delay (seconds)
+    makes each one block like a slow bus would.
+    """
+
+    INPUT = 0x00
+    OUTPUT = 0x01
+    INPUT_PULLUP = 0x02
+    INPUT_PULLDOWN = 0x03
+
+    def __init__(self, i2c_bus, addr=0x49, drdy=None, reset=True):
+        self.i2c = i2c_bus
+        self.addr = addr
+        self.read_delay = 0
+        self.transactions = 0
+        self.positions = [0] * 4
+        self._reported = [0] * 4
+        self.pins = {}
+        if reset:
+            self.sw_reset()
+
+    def sw_reset(self, post_reset_delay=0.5) -> None:
+        """like the library, blocks for post_reset_delay after resetting"""
+        self._transaction(1)
+        if post_reset_delay:
+            vtime.sleep(post_reset_delay)
+
+    def _transaction(self, nbytes):
+        self.transactions += 1
+        count = getattr(self.i2c, "count", None)
+        if count is not None:
+            count(nbytes)
+        if self.read_delay:
+            vtime.sleep(self.read_delay)
+
+    def pin_mode(self, pin, mode) -> None:
+        self._transaction(4)
+        if mode == self.INPUT_PULLUP:
+            self.pins.setdefault(pin, True)
+
+    def digital_read(self, pin) -> bool:
+        self._transaction(4)
+        return self.pins.get(pin, False)
+
+    def digital_read_bulk(self, pins) -> int:
+        self._transaction(4)
+        result = 0
+        for pin, value in self.pins.items():
+            if value and pins & (1 << pin):
+                result |= 1 << pin
+        return result
+
+    def encoder_position(self, encoder=0) -> int:
+        self._transaction(4)
+        self._reported[encoder] = self.positions[encoder]
+        return self.positions[encoder]
+
+    def encoder_delta(self, encoder=0) -> int:
+        self._transaction(4)
+        delta = self.positions[encoder] - self._reported[encoder]
+        self._reported[encoder] = self.positions[encoder]
+        return delta
+
+    def set_encoder_position(self, pos, encoder=0) -> None:
+        self._transaction(4)
+        self.positions[encoder] = pos
+        self._reported[encoder] = pos
+
+    def enable_encoder_interrupt(self, encoder=0) -> None:
+        self._transaction(1)
+
+    def turn(self, encoder, detents) -> None:
+        """not in the library: moves an encoder as if the knob turned"""
+        self.positions[encoder] += detents
@@ -0,0 +1,46 @@
+"""stand-in for the CircuitPython bitbangio module"""
+
+from . import vtime
+
+
+class SPI:
+    """
+    counts the bytes written; with record set, keeps every write as
+    (time ns, bytes) in frames and the latest in last
+    """
+
+    def __init__(self, clock, MOSI=None, MISO=None):
+        self.clock = clock
+        self.writes = 0
+        self.bytes = 0
+        self.last = b""
+        self.record = False
+        self.frames = []
+        self._locked = False
+
+    def try_lock(self) -> bool:
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self) -> None:
+        self._locked = False
+
+    def configure(self, baudrate=100000, polarity=0, phase=0, bits=8):
+        self.baudrate = baudrate
+
+    def write(self, buf, start=0, end=None) -> None:
+        if end is None:
+            end = len(buf)
+        self.writes += 1
+        self.bytes += end - start
+        if self.record:
+            # copies only when recording, so an allocation check sees
+            # just the caller's allocations
+            data = bytes(buf[start:end])
+            self.last = data
+            self.frames.append((vtime.monotonic_ns(), data))
+
+    def deinit(self) -> None:
+        pass
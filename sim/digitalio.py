@@ -0,0 +1,77 @@
+"""stand-in for the CircuitPython digitalio module"""
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+# output level changes across every pin, for measuring bit-banging cost
+toggles = 0
+
+
+class DigitalInOut:
+    """
+    A pin which remembers its value. Writes which change an output's
+    level are counted, per pin in self.toggles and across all pins in
+    the module level toggles.
+    """
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.drive_mode = DriveMode.PUSH_PULL
+        self.toggles = 0
+        self._value = False
+        self._pull = None
+
+    @property
+    def pull(self):
+        return self._pull
+
+    @pull.setter
+    def pull(self, pull) -> None:
+        # an unconnected input reads as its pull
+        self._pull = pull
+        if self.direction == Direction.INPUT and pull is not None:
+            self._value = pull == Pull.UP
+
+    @property
+    def value(self) -> bool:
+        return self._value
+
+    @value.setter
+    def value(self, value) -> None:
+        global toggles
+        value = bool(value)
+        if value != self._value:
+            self.toggles += 1
+            toggles += 1
+        self._value = value
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.drive_mode = drive_mode
+        self.value = value
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def deinit(self) -> None:
+        pass
+
+
+def reset_toggles() -> None:
+    global toggles
+    toggles = 0
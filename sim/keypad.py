@@ -0,0 +1,76 @@
+"""stand-in for the CircuitPython keypad module"""
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self) -> bool:
+        return not self.pressed
+
+    def __eq__(self, other):
+        return (
+            self.key_number == other.key_number and self.pressed == other.pressed
+        )
+
+    def __repr__(self):
+        state = "pressed" if self.pressed else "released"
+        return f"<Event: key_number {self.key_number} {state}>"
+
+
+class EventQueue:
+    def __init__(self, max_events=64):
+        self.max_events = max_events
+        self.overflowed = False
+        self._events = []
+
+    def get(self):
+        if self._events:
+            return self._events.pop(0)
+        return None
+
+    def get_into(self, event) -> bool:
+        if not self._events:
+            return False
+        e = self._events.pop(0)
+        event.key_number = e.key_number
+        event.pressed = e.pressed
+        event.timestamp = e.timestamp
+        return True
+
+    def clear(self) -> None:
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self):
+        return len(self._events)
+
+    def __bool__(self):
+        return bool(self._events)
+
+    def put(self, key_number, pressed=True, timestamp=None) -> None:
+        """not in CircuitPython: queues an event as if a key changed"""
+        if len(self._events) >= self.max_events:
+            self.overflowed = True
+            return
+        self._events.append(Event(key_number, pressed, timestamp))
+
+
+class ShiftRegisterKeys:
+    def __init__(self, *, key_count, max_events=64, **kwargs):
+        self.key_count = key_count
+        self.events = EventQueue(max_events)
+
+    def press(self, key_number) -> None:
+        """not in CircuitPython: queues a press and release of a key"""
+        self.events.put(key_number, True)
+        self.events.put(key_number, False)
+
+    def reset(self) -> None:
+        self.events.clear()
+
+    def deinit(self) -> None:
+        pass
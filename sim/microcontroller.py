@@ -0,0 +1,48 @@
+"""stand-in for the CircuitPython microcontroller module"""
+
+
+class PowerLoss(Exception):
+    """raised by a write which NVM.tear_after cut short"""
+
+
+class NVM:
+    """
+    Byte storage like microcontroller.nvm, counting writes and the
+    bytes they carry. Set tear_after to n and the next write stores
+    only its first n bytes before raising PowerLoss.
+    """
+
+    def __init__(self, size):
+        self._data = bytearray(b"\xff" * size)
+        self.writes = 0
+        self.bytes_written = 0
+        self.tear_after = None
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return bytearray(self._data[index])
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            index = slice(index, index + 1)
+            value = bytes((value,))
+        start, stop, _ = index.indices(len(self._data))
+        if len(value) != stop - start:
+            raise ValueError("NVM slice assignment must not resize")
+        self.writes += 1
+        if self.tear_after is not None:
+            count = min(self.tear_after, len(value))
+            self.tear_after = None
+            self._data[start : start + count] = value[:count]
+            self.bytes_written += count
+            raise PowerLoss()
+        self._data[start:stop] = value
+        self.bytes_written += len(value)
+
+
+# same size as the RP2040 port's nvm
+nvm = NVM(4096)
@@ -0,0 +1,45 @@
+"""stand-in for the CircuitPython neopixel library"""
+
+from . import vtime
+
+
+class NeoPixel:
+    """
+    Keeps the pixel colors and counts how many times the whole strip
+    would have been pushed out (self.shows). With record set, keeps
+    every push as (time ns, colors) in frames.
+    """
+
+    def __init__(self, pin, n, *, brightness=1.0, auto_write=True, **kwargs):
+        self.pin = pin
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.shows = 0
+        self.record = False
+        self.frames = []
+        self._pixels = [(0, 0, 0)] * n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = tuple(color)
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color) -> None:
+        self._pixels = [tuple(color)] * self.n
+        if self.auto_write:
+            self.show()
+
+    def show(self) -> None:
+        self.shows += 1
+        if self.record:
+            self.frames.append((vtime.monotonic_ns(), tuple(self._pixels)))
+
+    def deinit(self) -> None:
+        pass
@@ -0,0 +1,248 @@
+"""
+Renders a saved state -- what save_state() packs into NVM -- to a
+Standard MIDI File, on the host.
+
+The state is played by the firmware's own sequencer (pulse(), the
+lanes and their dice, the song chain and the note-off gates) on a
+clock which jumps from one event to the next instead of waiting, and
+every batch of MIDI the sequencer flushes is written to the file as it
+comes, so the track is never held in memory; only its length is
+patched in at the end. (A file which can't seek, such as a pipe, gets
+the track held and written at the end instead.)
+
+    r = renderer(shape)
+    r.render(payload, file, bars=4)
+
+or, for a batch of dumps, each written next to itself as .mid:
+
+    python -m sim.render [-b bars] state.bin ...
+
+A dump is either the payload itself or an image of the NVM it's kept
+in (microcontroller.nvm, both slots), which gives its newest valid
+payload.
+
+Note-ons are placed on the pulse grid they were played on and
+note-offs at the millisecond the device sends them.
+"""
+
+import argparse
+import io
+import os
+import struct
+import sys
+
+from . import install
+
+install()
+
+import log  # noqa: E402
+from bank import read_shape  # noqa: E402
+from geometry import geometry  # noqa: E402
+from midi_clock import PPQN  # noqa: E402
+from persistence import nvm_store  # noqa: E402
+from sequencer import nvm_header, sequencer  # noqa: E402
+from adafruit_ticks import ticks_diff  # noqa: E402
+
+# ticks per quarter note
+division = 480
+_ticks_per_pulse = division // PPQN
+# note-offs still pending this long after the last pulse are dropped
+_tail_ms = 60_000
+
+
+def payload_of(data):
+    """
+    the saved state in a dump: the newest valid payload if data is an
+    image of NVM as nvm_store keeps it, else data as it is
+    """
+    try:
+        found = nvm_store(bytearray(data)).load()
+    except ValueError:
+        found = None
+    return data if found is None else bytes(found)
+
+
+def shape_of(payload):
+    """the geometry of the bank in a saved state"""
+    count, voices, steps = read_shape(payload, nvm_header.size)
+    return geometry(voices=voices, steps=steps, patterns=count)
+
+
+class renderer:
+    """
+    A sequencer of one geometry which plays saved states into MIDI
+    files; it is made once and reused for every state rendered.
+    """
+
+    def __init__(self, shape):
+        engine = self.engine = sequencer(shape)
+        engine.midi_events.port = self
+        engine.midi_events.timing = None
+        engine.clock.ticks = self.ticks
+        self.now = 0
+        self.tick = 0
+        self.out = None
+        self.length = 0
+        self.events = 0
+        self.last_tick = 0
+        self.status = 0
+        self._track = None
+        # where the track's events go: out, or a buffer when out can't seek
+        self._sink = None
+        self.chunk = bytearray()
+
+    def ticks(self) -> int:
+        """the time the sequencer's clock sees"""
+        return self.now
+
+    def render(self, payload, out, bars=4, song=None, pattern=0) -> int:
+        """
+        writes bars of the state saved in payload to out, a binary
+        file; with song (by default, when a chain was saved) the chain
+        is played, once through if bars is None. Returns the events
+        written.
+        """
+        engine = self.engine
+        if not engine.load_payload(payload):
+            raise ValueError("not a saved state of this geometry")
+        engine.use_pattern(engine.patterns.get(pattern))
+        if song is None:
+            song = engine.song_data is not None
+        engine.set_song_mode(song)
+        if bars is None:
+            steps = engine.song.duration() if engine.song_mode else engine.num_steps
+        else:
+            steps = bars * 4 * engine.steps_per_beat
+
+        pulses = steps * engine.pulses_per_step
+        self.begin(out, engine.bpm)
+        self.now = 0
+        engine.start_playing(send=False)
+        self.play(pulses)
+        engine.playing = False
+        return self.end(pulses * _ticks_per_pulse)
+
+    def play(self, pulses):
+        """plays that many pulses, then lets the last notes end"""
+        engine = self.engine
+        clock = engine.clock
+        note_offs = engine.note_offs
+        midi_events = engine.midi_events
+        while clock.step < pulses:
+            wait = note_offs.ms_until_next(self.now, ticks_diff(clock.deadline, self.now))
+            self.now += wait
+            now = self.now
+            self.tick = now * engine.bpm * division // 60_000
+            if note_offs.drain(now):
+                midi_events.flush()
+            if clock.due():
+                # step counts the pulses played, this one included
+                self.tick = (clock.step - 1) * _ticks_per_pulse
+                engine.pulse(now)
+                midi_events.flush()
+        end = self.now + _tail_ms
+        while note_offs.count and self.now < end:
+            self.now += note_offs.ms_until_next(self.now, end - self.now)
+            self.tick = self.now * engine.bpm * division // 60_000
+            if note_offs.drain(self.now):
+                midi_events.flush()
+
+    # the file
+
+    def begin(self, out, bpm) -> None:
+        """writes the header and the start of the track"""
+        self.out = out
+        out.write(struct.pack(">4sLHHH", b"MThd", 6, 0, 1, division))
+        if out.seekable():
+            out.write(b"MTrk\0\0\0\0")
+            self._track = out.tell()
+            self._sink = out
+        else:
+            self._track = None
+            self._sink = io.BytesIO()
+        self.length = 0
+        self.events = 0
+        self.last_tick = 0
+        self.status = 0
+        # the tempo, in microseconds per quarter note
+        tempo = 60_000_000 // bpm
+        self._event(0, b"\xff\x51\x03" + tempo.to_bytes(3, "big"))
+
+    def end(self, ticks) -> int:
+        """ends the track at ticks (or its last event); returns the events"""
+        self._event(max(ticks, self.last_tick), b"\xff\x2f\x00")
+        out = self.out
+        if self._track is not None:
+            here = out.tell()
+            out.seek(self._track - 4)
+            out.write(struct.pack(">L", self.length))
+            out.seek(here)
+        else:
+            out.write(struct.pack(">4sL", b"MTrk", self.length))
+            out.write(self._sink.getvalue())
+        self.out = None
+        self._sink = None
+        return self.events
+
+    def _event(self, tick, data) -> None:
+        chunk = self.chunk
+        del chunk[:]
+        delta = max(tick - self.last_tick, 0)
+        self.last_tick += delta
+        # variable-length delta time, 7 bits a byte, most significant first
+        shift = 21
+        while shift and delta >> shift == 0:
+            shift -= 7
+        while shift:
+            chunk.append(0x80 | (delta >> shift) & 0x7F)
+            shift -= 7
+        chunk.append(delta & 0x7F)
+        chunk.extend(data)
+        self._sink.write(chunk)
+        self.length += len(chunk)
+        self.events += 1
+
+    def write(self, buf) -> int:
+        """the sequencer's MIDI port: one flushed batch, at self.tick"""
+        i = 0
+        n = len(buf)
+        while i < n:
+            byte = buf[i]
+            if byte >= 0xF8:
+                # real-time clock bytes aren't kept in a file
+                i += 1
+                continue
+            if byte & 0x80:
+                self.status = byte
+                i += 1
+            self._event(self.tick, bytes((self.status, buf[i], buf[i + 1])))
+            i += 2
+        return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("states", nargs="+", help="saved states or NVM images")
+    parser.add_argument("-b", "--bars", type=int, default=4)
+    args = parser.parse_args(argv)
+    log.set_level(log.WARNING)
+    renderers = {}
+    for path in args.states:
+        with open(path, "rb") as f:
+            payload = payload_of(f.read())
+        midi = os.path.splitext(path)[0] + ".mid"
+        try:
+            shape = shape_of(payload)
+            key = (shape.voices, shape.steps, shape.patterns)
+            if key not in renderers:
+                renderers[key] = renderer(shape)
+            with open(midi, "wb") as out:
+                renderers[key].render(payload, out, args.bars)
+        except (ValueError, struct.error):
+            print(f"{path}: not a saved state", file=sys.stderr)
+            if os.path.exists(midi):
+                os.remove(midi)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Runs the firmware (code.py) on the host against the stand-ins, under
+virtual time, with scripted input and recorded output.
+
+    s = simulation()
+    s.push("start_button_in", at=0.1)
+    s.press_key(3, at=0.5)
+    s.run(seconds=4)
+    s.midi.writes, s.leds.frames, s.pixels.frames ...
+
+s.engine is the firmware's sequencer.
+"""
+
+import asyncio
+import builtins
+import dis
+import importlib.util
+import os
+import sys
+import tracemalloc
+
+from . import install, vtime
+
+root = os.path.join(os.path.dirname(__file__), "..")
+
+
+class _selector_proxy:
+    """advances virtual time instead of blocking in select()"""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+        self.iterations = 0
+
+    def select(self, timeout=None):
+        self.iterations += 1
+        if timeout is None:
+            raise RuntimeError("simulation has nothing left to run")
+        if timeout > 0:
+            self._clock.advance(timeout)
+        return self._selector.select(0)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class virtual_event_loop(asyncio.SelectorEventLoop):
+    """an asyncio loop whose time is a virtual_clock"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self._virtual_clock = clock
+        self._selector = _selector_proxy(self._selector, clock)
+
+    def time(self):
+        return self._virtual_clock.monotonic_ns() / 1_000_000_000
+
+    def iterations(self) -> int:
+        """number of passes through the event loop so far"""
+        return self._selector.iterations
+
+
+def load_firmware(path=None, name="firmware"):
+    """
+    executes code.py as a module (so its tasks don't start) with the
+    stand-ins installed and time going through sim.vtime
+    """
+    install()
+    if path is None:
+        path = os.path.join(root, "code.py")
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    real_time = sys.modules["time"]
+    sys.modules["time"] = vtime.time_module()
+    try:
+        # firmware modules imported from here on see the stand-in time
+        for module in ("TLC5916",):
+            sys.modules.pop(module, None)
+        spec = importlib.util.spec_from_file_location(name, path)
+        firmware = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(firmware)
+    finally:
+        sys.modules["time"] = real_time
+    return firmware
+
+
+def _measure(call, *args):
+    """
+    calls call; gives the bytes allocated while it ran (tracemalloc
+    peak above the start) and its result
+    """
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = call(*args)
+    return tracemalloc.get_traced_memory()[1] - before, result
+
+
+def _measure_overhead():
+    """what _measure() reports for a call which allocates nothing"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    def nothing():
+        pass
+
+    return min(_measure(nothing)[0] for _ in range(3))
+
+
+# bytecodes which allocate on CircuitPython as well; for loops over
+# range() and small ints don't, so those aren't counted
+_allocating_ops = frozenset(
+    (
+        "BUILD_TUPLE",
+        "BUILD_LIST",
+        "BUILD_MAP",
+        "BUILD_CONST_KEY_MAP",
+        "BUILD_SET",
+        "BUILD_SLICE",
+        "BUILD_STRING",
+        "FORMAT_VALUE",
+        "LIST_EXTEND",
+        "SET_UPDATE",
+        "DICT_MERGE",
+        "DICT_UPDATE",
+        "MAKE_FUNCTION",
+        "CALL_FUNCTION_EX",
+    )
+)
+_generator = 0x20
+# built-in types which calling doesn't allocate on CircuitPython: small
+# ints, and range() for a for loop
+_free_types = frozenset((int, bool, range))
+# built-in functions and methods which build a new object
+_allocating_calls = frozenset(
+    (
+        "sorted",
+        "repr",
+        "format",
+        "join",
+        "split",
+        "copy",
+        "hex",
+        "encode",
+        "decode",
+        "to_bytes",
+        "items",
+        "keys",
+        "values",
+        "append",
+        "extend",
+        "insert",
+    )
+)
+# name loaded by each LOAD_GLOBAL which pushes a NULL first (so the
+# global is about to be called), by offset, for each code object
+_called_globals = {}
+
+
+def _firmware_code(code) -> bool:
+    """True for code in the firmware (not the stand-ins or the benchmarks)"""
+    folder = os.path.dirname(os.path.abspath(code.co_filename))
+    return folder == os.path.abspath(root)
+
+
+def _global_calls(code):
+    found = _called_globals.get(code)
+    if found is None:
+        found = {
+            i.offset: i.argval
+            for i in dis.get_instructions(code)
+            if i.opname == "LOAD_GLOBAL" and i.arg & 1
+        }
+        _called_globals[code] = found
+    return found
+
+
+def _trace_bytecode(call, args, found):
+    """
+    calls call with opcode tracing, adding a count to found for every
+    allocating bytecode the firmware runs, keyed by "file:line op", and
+    for every object it makes by calling a class (keyed "new <class>")
+    or an allocating built-in function or method ("call <name>")
+    """
+    started = set()
+
+    def note(frame, what):
+        code = frame.f_code
+        where = f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {what}"
+        found[where] = found.get(where, 0) + 1
+
+    def opcode(frame, event, arg):
+        if event == "opcode":
+            code = frame.f_code
+            op = dis.opname[code.co_code[frame.f_lasti]]
+            if op in _allocating_ops:
+                note(frame, op)
+            elif op == "LOAD_GLOBAL":
+                name = _global_calls(code).get(frame.f_lasti)
+                if name is not None:
+                    value = frame.f_globals.get(name, builtins.__dict__.get(name))
+                    # classes written in Python are seen by enter()
+                    if (
+                        isinstance(value, type)
+                        and value not in _free_types
+                        and not hasattr(value.__init__, "__code__")
+                    ):
+                        note(frame, "new " + name)
+        return opcode
+
+    def enter(frame, event, arg):
+        code = frame.f_code
+        caller = frame.f_back
+        if (
+            code.co_name == "__init__"
+            and caller is not None
+            and _firmware_code(caller.f_code)
+        ):
+            note(caller, "new " + type(frame.f_locals["self"]).__name__)
+        if not _firmware_code(code):
+            return None
+        if code.co_flags & _generator and frame not in started:
+            # resuming a generator is a call event too; count it once
+            started.add(frame)
+            note(frame, "generator")
+        frame.f_trace_opcodes = True
+        return opcode
+
+    def profile(frame, event, arg):
+        if (
+            event == "c_call"
+            and arg.__name__ in _allocating_calls
+            and _firmware_code(frame.f_code)
+        ):
+            note(frame, "call " + arg.__name__)
+
+    previous = sys.gettrace()
+    previous_profile = sys.getprofile()
+    sys.settrace(enter)
+    sys.setprofile(profile)
+    try:
+        return call(*args)
+    finally:
+        sys.setprofile(previous_profile)
+        sys.settrace(previous)
+
+
+class simulation:
+    """
+    The firmware booted under virtual time. cpu_scale > 0 also charges
+    the host CPU time spent, multiplied by cpu_scale, to the virtual
+    clock (e.g. ~50 to approximate CircuitPython on an RP2040). shape,
+    a geometry, replaces code.py's engine with one of that shape.
+    """
+
+    def __init__(self, cpu_scale=0, path=None, fresh_nvm=True, shape=None):
+        install()
+        if fresh_nvm:
+            import microcontroller
+
+            microcontroller.nvm = microcontroller.NVM(len(microcontroller.nvm))
+        self.clock = vtime.virtual_clock(cpu_scale)
+        vtime.use(self.clock)
+        self.loop = virtual_event_loop(self.clock)
+        asyncio.set_event_loop(self.loop)
+        # virtual ns at power-up
+        self.boot_start = self.clock.monotonic_ns()
+        self.firmware = load_firmware(path)
+        if shape is not None:
+            self.firmware.engine = self.firmware.sequencer(shape)
+        self.boot_ns = self.clock.monotonic_ns() - self.boot_start
+        self._script = []
+
+        engine = self.engine = self.firmware.engine
+        self.midi = engine.midi
+        self.midi.clear()
+        self.leds = engine.leds.spi
+        self.pixels = engine.stepper.pixels
+        self.record(True)
+
+    def record(self, on) -> None:
+        """
+        turns keeping the MIDI, LED and neopixel output on or off; with
+        it off the stand-ins only count, so they allocate nothing
+        """
+        self.midi.record = on
+        if self.leds is not None:
+            self.leds.record = on
+        self.pixels.record = on
+
+    @property
+    def display(self):
+        """the display, once the firmware has set it up (or None)"""
+        return self.engine.display
+
+    def probe_steps(self, allocations=False):
+        """
+        wraps the firmware's play_step to record, per step, how late it
+        was (ms) and, with allocations, the bytes allocated while it ran
+        (tracemalloc peak above the starting level). Returns the two
+        lists, which fill in as the simulation runs.
+        """
+        engine = self.engine
+        play_step = engine.play_step
+        lateness = []
+        allocated = []
+        if allocations:
+            overhead = _measure_overhead()
+
+        def probed(now):
+            if allocations:
+                allocated.append(_measure(play_step, now)[0] - overhead)
+            else:
+                play_step(now)
+            lateness.append(engine.clock.last_late)
+
+        engine.play_step = probed
+        return lateness, allocated
+
+    def probe_allocations(self, target, name):
+        """
+        wraps the method name of target (e.g. the engine or one of its
+        parts) to record the bytes each call allocates (tracemalloc
+        peak above the starting level); calls into other probed methods
+        aren't measured correctly.
+        Returns the list, which fills in as the simulation runs.
+        """
+        method = getattr(target, name)
+        allocated = []
+        overhead = _measure_overhead()
+
+        def probed(*args):
+            size, result = _measure(method, *args)
+            allocated.append(size - overhead)
+            return result
+
+        setattr(target, name, probed)
+        return allocated
+
+    def probe_bytecode(self, target, name):
+        """
+        wraps the method name of target to count the bytecodes it runs
+        which allocate on CircuitPython too (building tuples, lists,
+        strings, closures, generators ...), the classes it calls and
+        the built-ins it calls which make new objects (join, copy ...).
+        This catches what tracemalloc misses on CPython (small tuples
+        come from a free list, and a temporary freed again may not
+        raise the peak) without counting the ints CPython boxes.
+        Returns a dict of counts keyed by "file:line op", which fills
+        in as the simulation runs.
+        """
+        method = getattr(target, name)
+        found = {}
+
+        def probed(*args):
+            return _trace_bytecode(method, args, found)
+
+        setattr(target, name, probed)
+        return found
+
+    def now(self) -> float:
+        """virtual seconds since the clock started"""
+        return self.clock.monotonic_ns() / 1_000_000_000
+
+    # scripted input; at is in seconds from the start of run()
+
+    def at(self, seconds, action) -> None:
+        """calls action() at the given time"""
+        self._script.append((seconds, action))
+
+    def press_key(self, key_number, at) -> None:
+        """presses (and releases) one of the step switches"""
+        self.at(at, lambda: self.engine.switches.press(key_number))
+
+    def turn(self, seesaw, encoder, detents, at) -> None:
+        """
+        turns an encoder; seesaw is the engine's attribute name, looked
+        up when the turn happens since the engine sets the seesaws up
+        after it starts
+        """
+        self.at(at, lambda: getattr(self.engine, seesaw).turn(encoder, detents))
+
+    def push(self, pin, at, hold=0.03) -> None:
+        """holds an active-low button input (by attribute name) down"""
+        io = getattr(self.engine, pin)
+
+        def down():
+            io.value = False
+
+        def up():
+            io.value = True
+
+        self.at(at, down)
+        self.at(at + hold, up)
+
+    def push_seesaw(self, seesaw, pin, at, hold=0.03) -> None:
+        """
+        holds an active-low seesaw pin down; seesaw is the engine's
+        attribute name, looked up when the push happens
+        """
+
+        def level(value):
+            getattr(self.engine, seesaw).pins[pin] = value
+
+        self.at(at, lambda: level(False))
+        self.at(at + hold, lambda: level(True))
+
+    def start(self, at=0) -> None:
+        """presses the start button"""
+        self.push("start_button_in", at)
+
+    async def _play_script(self, start):
+        for seconds, action in sorted(self._script, key=lambda e: e[0]):
+            delay = start + seconds - self.now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # the script stands in for the world outside; only the
+            # firmware's CPU time counts
+            self.clock.uncharged(action)
+
+    async def _run(self, seconds):
+        start = self.now()
+        tasks = [
+            asyncio.ensure_future(self.engine.start()),
+            asyncio.ensure_future(self._play_script(start)),
+        ]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._script = []
+
+    def run(self, seconds) -> None:
+        """runs the firmware and the script for the given virtual time"""
+        self.loop.run_until_complete(self._run(seconds))
+
+    def close(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.loop.close()
+        vtime.use(None)
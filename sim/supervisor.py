@@ -0,0 +1,10 @@
+"""stand-in for the CircuitPython supervisor module"""
+
+
+class _runtime:
+    # no serial console here: nothing is ever waiting to be read; call
+    # sequencer.serial_command() to act as if something had been typed
+    serial_bytes_available = 0
+
+
+runtime = _runtime()
@@ -0,0 +1,75 @@
+"""stand-in for the CircuitPython usb_midi module"""
+
+from . import vtime
+
+
+class PortOut:
+    """
+    records every write so tests can inspect the bytes sent, and
+    counts the distinct buffer objects handed to write() -- a caller
+    which builds a fresh buffer per message shows one per write, one
+    which reuses a buffer shows one in total
+    """
+
+    def __init__(self):
+        # with record off, writes are only counted in write_count
+        self.record = True
+        self.write_count = 0
+        self.writes = []
+        # time (ns) of each write
+        self.times = []
+        # keeps the buffers alive so their ids stay unique
+        self._buffers = {}
+
+    def write(self, buf) -> int:
+        self.write_count += 1
+        if not self.record:
+            return len(buf)
+        owner = buf.obj if isinstance(buf, memoryview) else buf
+        self._buffers[id(owner)] = owner
+        self.writes.append(bytes(buf))
+        self.times.append(vtime.monotonic_ns())
+        return len(buf)
+
+    def buffer_allocations(self) -> int:
+        return len(self._buffers)
+
+    def bytes_written(self) -> int:
+        return sum(len(w) for w in self.writes)
+
+    def clear(self) -> None:
+        self.write_count = 0
+        self.writes.clear()
+        self.times.clear()
+        self._buffers.clear()
+
+
+class PortIn:
+    """hands out bytes queued with feed()"""
+
+    def __init__(self):
+        self._pending = bytearray()
+
+    def feed(self, data) -> None:
+        self._pending.extend(data)
+
+    def read(self, nbytes: int = 0) -> bytes:
+        if nbytes <= 0 or nbytes > len(self._pending):
+            nbytes = len(self._pending)
+        data = bytes(self._pending[:nbytes])
+        del self._pending[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None) -> int:
+        if nbytes is None or nbytes > len(buf):
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(self._pending))
+        buf[:nbytes] = self._pending[:nbytes]
+        del self._pending[:nbytes]
+        return nbytes
+
+    def clear(self) -> None:
+        self._pending.clear()
+
+
+ports = (PortIn(), PortOut())
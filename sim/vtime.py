@@ -0,0 +1,87 @@
+"""
+Simulated time for the stand-ins.
+
+By default the stand-ins use the host's real clock. Once a
+virtual_clock is installed with use(), time only moves when something
+sleeps (or blocks in a stand-in I/O call), plus, if cpu_scale is set,
+the host CPU time spent multiplied by cpu_scale -- a rough way to model
+a slower board.
+"""
+
+import math
+import time
+import types
+
+_clock = None
+
+
+class virtual_clock:
+    def __init__(self, cpu_scale=0):
+        self.cpu_scale = cpu_scale
+        self._base = 0
+        self._mark = time.perf_counter_ns()
+
+    def monotonic_ns(self) -> int:
+        if self.cpu_scale:
+            spent = time.perf_counter_ns() - self._mark
+            return self._base + int(spent * self.cpu_scale)
+        return self._base
+
+    def uncharged(self, action, *args):
+        """calls action(*args) without charging its CPU time"""
+        if not self.cpu_scale:
+            return action(*args)
+        # charge what was spent up to here, then start afresh after it
+        now = time.perf_counter_ns()
+        self._base += int((now - self._mark) * self.cpu_scale)
+        self._mark = now
+        try:
+            return action(*args)
+        finally:
+            self._mark = time.perf_counter_ns()
+
+    def advance(self, seconds) -> None:
+        # rounded up: a timer a fraction of a ns away has to come due
+        self._base += math.ceil(seconds * 1_000_000_000)
+
+
+def use(clock) -> None:
+    """makes the stand-ins run on clock (None for real time)"""
+    global _clock
+    _clock = clock
+
+
+def current():
+    return _clock
+
+
+def monotonic_ns() -> int:
+    if _clock is None:
+        return time.monotonic_ns()
+    return _clock.monotonic_ns()
+
+
+def monotonic() -> float:
+    return monotonic_ns() / 1_000_000_000
+
+
+def sleep(seconds) -> None:
+    if _clock is None:
+        time.sleep(seconds)
+    elif seconds > 0:
+        _clock.advance(seconds)
+
+
+def time_module():
+    """
+    gives a stand-in for the time module whose clocks and sleep go
+    through this module, for loading firmware code under virtual time
+    """
+    module = types.ModuleType("time")
+    for name in dir(time):
+        if not name.startswith("__"):
+            setattr(module, name, getattr(time, name))
+    module.sleep = sleep
+    module.monotonic = monotonic
+    module.monotonic_ns = monotonic_ns
+    return module
@@ -0,0 +1,153 @@
+from array import array
+
+# format of a saved chain:
+# B -- number of entries
+# then a B pattern number and a B repeat count per entry
+
+
+class song:
+    """
+    A chain of patterns, each played a number of times, and the flat
+    list of steps it compiles to.
+
+    compile() lays out every entry's step masks once, in the order
+    they play (the range and direction applied), with the step each
+    came from. Playing is then a walk along that list: masks[position]
+    is the step to play and advance() only indexes arrays, an entry's
+    repeats rewinding to its start. The lists are made on the first
+    compile() and sized for the longest chain, so compiling again
+    allocates nothing.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.patterns = bytearray(max_entries)
+        self.repeats = bytearray(max_entries)
+        self.length = 0
+        # compiled: the step masks, their steps, and where each entry starts
+        self.masks = None
+        self.steps = None
+        self.starts = array("H", [0] * (max_entries + 1))
+        # set when the chain or its patterns change after compile()
+        self.stale = True
+        # where playback is: the entry, its pass, the index into masks
+        self.entry = 0
+        self.played = 0
+        self.position = 0
+
+    def append(self, number: int, repeats: int = 1) -> bool:
+        """adds a pattern to the end of the chain; False if it's full"""
+        if self.length == self.max_entries:
+            return False
+        self.patterns[self.length] = number
+        self.repeats[self.length] = min(max(repeats, 1), 255)
+        self.length += 1
+        self.stale = True
+        return True
+
+    def clear(self) -> None:
+        self.length = 0
+        self.stale = True
+        self.rewind()
+
+    def compile(self, bank, first_step, last_step, forward=True) -> None:
+        """lays out the chain's steps from the patterns in bank"""
+        # a range with no steps in it is played as one step
+        span = last_step - first_step + 1
+        if span < 1:
+            span = 1
+        if self.masks is None:
+            self.masks = array("L", [0] * (self.max_entries * bank.steps))
+            self.steps = bytearray(self.max_entries * bank.steps)
+        masks = self.masks
+        steps = self.steps
+        i = 0
+        for entry in range(self.length):
+            self.starts[entry] = i
+            step_masks = bank.get(self.patterns[entry]).step_masks
+            for n in range(span):
+                step = first_step + n if forward else last_step - n
+                masks[i] = step_masks[step]
+                steps[i] = step
+                i += 1
+        self.starts[self.length] = i
+        self.stale = False
+        # stay in the same entry, as near the same step as it still has
+        if self.entry >= self.length:
+            self.rewind()
+        elif self.position >= self.starts[self.entry + 1]:
+            self.position = self.starts[self.entry]
+
+    def rewind(self) -> None:
+        """goes back to the first pass of the first entry"""
+        self.entry = 0
+        self.played = 0
+        self.position = 0
+
+    def seek(self, steps: int) -> None:
+        """moves to the step the given number of steps into the song"""
+        self.rewind()
+        total = self.duration()
+        if total == 0:
+            return
+        steps %= total
+        for entry in range(self.length):
+            span = self.starts[entry + 1] - self.starts[entry]
+            if steps < span * self.repeats[entry]:
+                self.entry = entry
+                self.played = steps // span
+                self.position = self.starts[entry] + steps % span
+                return
+            steps -= span * self.repeats[entry]
+
+    def duration(self) -> int:
+        """gives the steps in one pass of the compiled chain"""
+        total = 0
+        for entry in range(self.length):
+            total += (self.starts[entry + 1] - self.starts[entry]) * self.repeats[entry]
+        return total
+
+    def advance(self) -> None:
+        """moves on to the next step, the next pass or the next entry"""
+        self.position += 1
+        if self.position < self.starts[self.entry + 1]:
+            return
+        self.played += 1
+        if self.played >= self.repeats[self.entry]:
+            self.played = 0
+            self.entry += 1
+            if self.entry == self.length:
+                self.entry = 0
+        self.position = self.starts[self.entry]
+
+    def size(self) -> int:
+        """gives the number of bytes save() needs"""
+        return 1 + 2 * self.length
+
+    def save(self, data: bytearray, start: int = 0) -> None:
+        if start + self.size() > len(data):
+            raise IndexError()
+        data[start] = self.length
+        for entry in range(self.length):
+            data[start + 1 + 2 * entry] = self.patterns[entry]
+            data[start + 2 + 2 * entry] = self.repeats[entry]
+
+    def load(self, data, start: int = 0, count: int = 256) -> bool:
+        """
+        restores the chain from data; returns False (with the chain
+        left empty) if it isn't a chain of at most max_entries
+        patterns numbered below count
+        """
+        self.clear()
+        if start >= len(data):
+            return False
+        length = data[start]
+        if length > self.max_entries or start + 1 + 2 * length > len(data):
+            return False
+        for entry in range(length):
+            number = data[start + 1 + 2 * entry]
+            if number >= count:
+                self.clear()
+                return False
+            self.append(number, data[start + 2 + 2 * entry])
+        return True
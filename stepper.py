@@ -0,0 +1,217 @@
+import neopixel
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+import log
+
+# what each step's pixel shows; indexes into stepper._palette
+_OFF = 0
+_ACTIVE = 1
+_CURRENT = 2
+
+
+class stepper:
+    """
+    Steps through the range first_step..last_step and shows it on the
+    neopixels: the current step, the rest of the range, and the steps
+    outside it.
+
+    The pixels are written with auto_write off. Changes only record
+    what each pixel should show; show() writes the pixels which differ
+    from the strip and pushes it once, at most every min_show_ms.
+
+    With fewer pixels than steps the strip shows num_pixels steps from
+    first_shown; see show_steps().
+    """
+
+    def __init__(
+        self, num_steps, neopixel_pin, min_show_ms=20, ticks=ticks_ms, num_pixels=None
+    ):
+        if num_pixels is None:
+            num_pixels = num_steps
+        self.num_pixels = num_pixels
+        self.first_shown = 0
+        self.current_step = 0
+        self.first_step = 0
+        self.last_step = num_steps - 1
+        self.stepping_forward = True
+        self.num_steps = num_steps
+        self.neopixel_pin = neopixel_pin
+
+        self.CURRENT_COLOR = (255, 0, 0)
+        self.ACTIVE_COLOR = (0, 255, 0)
+        self.OFF_COLOR = (0, 0, 0)
+
+        self._palette = (self.OFF_COLOR, self.ACTIVE_COLOR, self.CURRENT_COLOR)
+
+        self.pixels = neopixel.NeoPixel(
+            pin=neopixel_pin, n=num_pixels, brightness=0.1, auto_write=False
+        )
+        self.min_show_ms = min_show_ms
+        self.ticks = ticks
+        # what each pixel should show, and what the strip has (0xFF
+        # for not yet written)
+        self._wanted = bytearray(num_pixels)
+        self._shown = bytearray(b"\xff" * num_pixels)
+        # True when _wanted differs from _shown
+        self.dirty = True
+        self._last_show = ticks_add(ticks(), -min_show_ms)
+        self.color_range()
+        self.show()
+
+    def _paint(self, step):
+        pixel = step - self.first_shown
+        if pixel < 0 or pixel >= self.num_pixels:
+            return
+        if step == self.current_step:
+            wanted = _CURRENT
+        elif self.first_step <= step <= self.last_step:
+            wanted = _ACTIVE
+        else:
+            wanted = _OFF
+        if self._wanted[pixel] != wanted:
+            self._wanted[pixel] = wanted
+            self.dirty = True
+
+    def show(self) -> bool:
+        """
+        pushes the changed pixels out if at least min_show_ms passed
+        since the last push; returns True if it pushed
+        """
+        if not self.dirty:
+            return False
+        now = self.ticks()
+        if ticks_diff(now, self._last_show) < self.min_show_ms:
+            return False
+        wanted = self._wanted
+        shown = self._shown
+        for pixel in range(self.num_pixels):
+            if wanted[pixel] != shown[pixel]:
+                self.pixels[pixel] = self._palette[wanted[pixel]]
+                shown[pixel] = wanted[pixel]
+        self.pixels.show()
+        self._last_show = now
+        self.dirty = False
+        return True
+
+    def advance_step(self):
+        previous_step = self.current_step
+
+        if self.stepping_forward:
+            if self.current_step < self.last_step:
+                self.current_step = self.current_step + 1
+            else:
+                self.current_step = self.first_step
+        else:
+            if self.current_step > self.first_step:
+                self.current_step = self.current_step - 1
+            else:
+                self.current_step = self.last_step
+
+        self._paint(previous_step)
+        self._paint(self.current_step)
+
+        return self.current_step
+
+    def show_step(self, step):
+        """
+        makes step the current one without stepping through the range,
+        for playback which works out its own steps
+        """
+        previous_step = self.current_step
+        self.current_step = step
+        self._paint(previous_step)
+        self._paint(step)
+
+    def reverse(self):
+        self.stepping_forward = not self.stepping_forward
+
+    def reset(self):
+        previous_step = self.current_step
+        self.current_step = self.first_step
+        self._paint(previous_step)
+        self._paint(self.current_step)
+
+    def seek(self, steps):
+        """moves to the step the given number of steps into the range"""
+        previous_step = self.current_step
+        # a range with no steps in it is taken as one step
+        span = self.last_step - self.first_step + 1
+        if span < 1:
+            span = 1
+        steps %= span
+        if self.stepping_forward:
+            self.current_step = self.first_step + steps
+        else:
+            self.current_step = self.last_step - steps
+        self._paint(previous_step)
+        self._paint(self.current_step)
+
+    def range_start(self):
+        # the step each pass through the range starts on
+        if self.stepping_forward:
+            return self.first_step
+        return self.last_step
+
+    def color_range(self):
+        # only pixels whose color changes get written by show()
+        for step in range(self.first_shown, self.first_shown + self.num_pixels):
+            self._paint(step)
+
+    def show_steps(self, first):
+        """shows the steps from first on the pixels"""
+        self.first_shown = first
+        # steps past the end stay dark
+        for pixel in range(self.num_pixels):
+            if self._wanted[pixel] != _OFF:
+                self._wanted[pixel] = _OFF
+                self.dirty = True
+        self.color_range()
+
+    def adjust_range_start(self, adjustment):
+        # keep adjustment in the range where self.first_step >= 0 and
+        # self.last_step < self.num_steps
+        # adjustment = max(adjustment, -self.first_step)
+        # adjustment = min(adjustment, self.num_steps - 1 - self.last_step)
+
+        if (
+            self.first_step + adjustment
+        ) < self.num_steps and self.first_step + adjustment >= 0:
+            self.first_step += adjustment
+
+        if (
+            self.last_step + adjustment
+        ) < self.num_steps and self.last_step + adjustment >= 0:
+            self.last_step += adjustment
+
+        log.debug(
+            "adjust_range_start first/last/adjustment:",
+            self.first_step,
+            self.last_step,
+            adjustment,
+        )
+        # TODO: self.current_step might be out of range; leave that
+        # as is; advance_step() will move it into the right range
+        # eventually. We might want to revisit this.
+
+        self.color_range()
+
+    def adjust_range_length(self, adjustment):
+        # keep adjustment in the range where self.first_step <= self.last_step and
+        # self.last_step < self.num_steps
+        # adjustment = max(adjustment, self.first_step - self.last_step)
+        # adjustment = min(adjustment, self.last_step - 1 - self.first_step)
+        if (
+            self.last_step + adjustment
+        ) < self.num_steps and self.last_step + adjustment >= self.first_step:
+            self.last_step += adjustment
+
+        log.debug(
+            "adjust_range_length first/last/adjustment:",
+            self.first_step,
+            self.last_step,
+            adjustment,
+        )
+        # TODO: self.current_step might be out of range; leave that
+        # as is; advance_step() will move it into the right range
+        # eventually. We might want to revisit this.
+
+        self.color_range()